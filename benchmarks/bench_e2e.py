@@ -0,0 +1,384 @@
+"""
+Offline end-to-end benchmark: drives /upload and /answer against a local fake Ollama.
+
+Starts benchmarks.fake_ollama and the API (uvicorn) as subprocesses with a
+scratch ASSETS_DIR, uploads synthetic CSVs of several sizes, then fires
+questions at a fixed concurrency. Reports p50/p95/p99 latency, throughput and
+peak RSS of the API process tree (including execution workers) per stage:
+
+    upload                 POST /upload of a new file
+    upload_dedup           POST /upload of bytes already uploaded
+    answer                 POST /answer end to end, LLM path
+    answer_fast            POST /answer end to end, answered by the fast path
+    stream_first_byte      /answer/stream until the first event
+    stream_code            /answer/stream until the code event
+    stream_execution       code event until execution_finished
+    stream_first_token     execution_finished until the first answer token
+    stream_total           /answer/stream until done, LLM path
+    stream_fast            /answer/stream until done, answered by the fast path
+
+Questions the fast path answers skip the LLM (and, for profile answers, code
+execution), so they are reported apart from the LLM path stages.
+
+Usage:
+    python -m benchmarks.bench_e2e --sizes 1 10 50 --requests 40 --concurrency 8 \\
+        --output e2e.json
+
+With --backends N it starts N fake Ollama instances, lists them all in
+OLLAMA_BASE_URLS and reports how the chat requests were spread.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.insert(0, ROOT_PATH)
+
+from benchmarks.bench_load import make_synthetic_csv  # noqa: E402
+
+QUESTIONS = [
+    "How many rows are in the dataset?",
+    "What is the average amount per region?",
+    "Which region has the highest total quantity?",
+    "Show the distribution of scores",
+    "What is the trend of amount over time?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def process_tree_rss(root_pid: int) -> int:
+    """Sum of VmRSS over a process and all its descendants (Linux /proc)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+class StageRecorder:
+    """Collects latencies per stage and samples peak RSS while a stage is active"""
+
+    def __init__(self, server_pid: int):
+        self.server_pid = server_pid
+        self.samples = {}
+        self.errors = {}
+        self.windows = {}
+        self.peak_rss = {}
+        self.active_stages = set()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def error(self, stage: str) -> None:
+        self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def begin(self, *stages: str) -> None:
+        now = time.perf_counter()
+        for stage in stages:
+            self.active_stages.add(stage)
+            self.windows.setdefault(stage, [now, now])
+
+    def end(self, *stages: str) -> None:
+        now = time.perf_counter()
+        for stage in stages:
+            self.active_stages.discard(stage)
+            self.windows[stage][1] = now
+
+    async def sample_rss(self, interval: float = 0.05) -> None:
+        while True:
+            rss = await asyncio.to_thread(process_tree_rss, self.server_pid)
+            for stage in list(self.active_stages):
+                self.peak_rss[stage] = max(self.peak_rss.get(stage, 0), rss)
+            await asyncio.sleep(interval)
+
+    def report(self) -> dict:
+        report = {}
+        for stage, values in self.samples.items():
+            start, end = self.windows.get(stage, (0, 0))
+            wall = end - start
+            report[stage] = {
+                "count": len(values),
+                "errors": self.errors.get(stage, 0),
+                "p50_s": percentile(values, 50),
+                "p95_s": percentile(values, 95),
+                "p99_s": percentile(values, 99),
+                "mean_s": sum(values) / len(values),
+                "throughput_rps": len(values) / wall if wall > 0 else None,
+                "peak_rss_bytes": self.peak_rss.get(stage),
+            }
+        return report
+
+
+async def wait_until_up(url: str, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url, timeout=2)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def run_uploads(client, recorder, csv_paths: list) -> list:
+    file_ids = []
+    for stage, paths in (("upload", csv_paths), ("upload_dedup", csv_paths)):
+        recorder.begin(stage)
+        for path in paths:
+            with open(path, "rb") as f:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/upload", files={"file": (os.path.basename(path), f, "text/csv")})
+            if response.status_code != 200:
+                recorder.error(stage)
+                continue
+            recorder.record(stage, time.perf_counter() - start)
+            if stage == "upload":
+                file_ids.append(response.json()["file_id"])
+        recorder.end(stage)
+    return file_ids
+
+
+async def answer_once(client, recorder, file_id: str, question: str, use_cache: bool) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.post("/answer", json={
+            "file_id": file_id, "question": question, "bypass_cache": not use_cache})
+        if response.status_code != 200:
+            recorder.error("answer")
+            return
+    except httpx.HTTPError:
+        recorder.error("answer")
+        return
+    stage = "answer_fast" if response.json().get("path") == "fast" else "answer"
+    recorder.record(stage, time.perf_counter() - start)
+
+
+async def stream_once(client, recorder, file_id: str, question: str, use_cache: bool) -> None:
+    start = time.perf_counter()
+    marks = {}
+    event = None
+    path = None
+    try:
+        async with client.stream("POST", "/answer/stream", json={
+                "file_id": file_id, "question": question,
+                "bypass_cache": not use_cache}) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line.split(":", 1)[1].strip()
+                    now = time.perf_counter()
+                    marks.setdefault("first_byte", now)
+                    if event in ("code", "execution_finished", "done", "error"):
+                        marks.setdefault(event, now)
+                    if event == "token":
+                        marks.setdefault("first_token", now)
+                elif line.startswith("data:") and event == "done":
+                    path = json.loads(line.split(":", 1)[1]).get("path")
+    except httpx.HTTPError:
+        recorder.error("stream_total")
+        return
+
+    if "error" in marks or "done" not in marks:
+        recorder.error("stream_total")
+        return
+    recorder.record("stream_first_byte", marks["first_byte"] - start)
+    if path == "fast":
+        # Profile answers have no code or execution events
+        recorder.record("stream_fast", marks["done"] - start)
+        return
+    code_at, executed_at = marks.get("code"), marks.get("execution_finished")
+    if code_at is not None:
+        recorder.record("stream_code", code_at - start)
+        if executed_at is not None:
+            recorder.record("stream_execution", executed_at - code_at)
+    if "first_token" in marks and executed_at is not None:
+        recorder.record("stream_first_token", marks["first_token"] - executed_at)
+    recorder.record("stream_total", marks["done"] - start)
+
+
+async def run_questions(client, recorder, file_ids: list, mode: str, requests: int,
+                        concurrency: int, use_cache: bool) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    targets = [(file_ids[i % len(file_ids)], QUESTIONS[i % len(QUESTIONS)])
+               for i in range(requests)]
+
+    async def limited(func, file_id, question):
+        async with semaphore:
+            await func(client, recorder, file_id, question, use_cache)
+
+    if mode in ("answer", "both"):
+        recorder.begin("answer", "answer_fast")
+        await asyncio.gather(*[limited(answer_once, f, q) for f, q in targets])
+        recorder.end("answer", "answer_fast")
+    if mode in ("stream", "both"):
+        stages = ("stream_first_byte", "stream_code", "stream_execution",
+                  "stream_first_token", "stream_total", "stream_fast")
+        recorder.begin(*stages)
+        await asyncio.gather(*[limited(stream_once, f, q) for f, q in targets])
+        recorder.end(*stages)
+
+
+async def run_benchmark(args) -> dict:
+    workdir = args.workdir
+    data_dir = os.path.join(workdir, "data")
+    assets_dir = tempfile.mkdtemp(prefix="assets-", dir=workdir)
+    os.makedirs(data_dir, exist_ok=True)
+
+    # One fake Ollama per backend; the API balances across all of them
+    fake_urls = [f"http://127.0.0.1:{free_port()}" for _ in range(args.backends)]
+    api_port = free_port()
+    env = dict(os.environ, OLLAMA_BASE_URL=fake_urls[0], OLLAMA_BASE_URLS=",".join(fake_urls),
+               OLLAMA_MODEL="fake:latest", ASSETS_DIR=assets_dir, PYTHONPATH=ROOT_PATH)
+    fakes = []
+    for url in fake_urls:
+        fake_cmd = [sys.executable, "-m", "benchmarks.fake_ollama", "--port", url.rsplit(":", 1)[1],
+                    "--latency", str(args.llm_latency), "--token-delay", str(args.token_delay)]
+        if args.use_cache:
+            fake_cmd.append("--fixed-code")
+        fakes.append(subprocess.Popen(fake_cmd, cwd=ROOT_PATH, env=env))
+    api_cmd = [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+               "--port", str(api_port), "--log-level", "warning"]
+
+    api = subprocess.Popen(api_cmd, cwd=ROOT_PATH, env=env, stdout=subprocess.DEVNULL,
+                           stderr=None if args.verbose else subprocess.DEVNULL)
+    try:
+        for url in fake_urls:
+            await wait_until_up(f"{url}/api/tags")
+        # /ready: model warmed, workers started, data libraries imported
+        await wait_until_up(f"http://127.0.0.1:{api_port}/ready")
+
+        recorder = StageRecorder(api.pid)
+        sampler = asyncio.create_task(recorder.sample_rss())
+        results = {}
+        timeout = httpx.Timeout(600, connect=10)
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}",
+                                     timeout=timeout, limits=limits) as client:
+            for size in args.sizes:
+                csv_paths = []
+                for i in range(args.uploads):
+                    path = os.path.join(data_dir, f"synthetic_{size}mb_{i}.csv")
+                    if not os.path.exists(path):
+                        print(f"Generating {os.path.basename(path)}...")
+                        make_synthetic_csv(path, size, seed=i)
+                    csv_paths.append(path)
+
+                recorder.samples, recorder.errors = {}, {}
+                recorder.windows, recorder.peak_rss = {}, {}
+                file_ids = await run_uploads(client, recorder, csv_paths)
+                if file_ids:
+                    await run_questions(client, recorder, file_ids, args.mode,
+                                        args.requests, args.concurrency, args.use_cache)
+                results[f"{size}mb"] = recorder.report()
+                print_report(size, results[f"{size}mb"])
+            if len(fake_urls) > 1:
+                # How evenly the chat requests were spread over the backends
+                results["backend_requests"] = {
+                    url: (await client.get(f"{url}/stats")).json()["requests"] for url in fake_urls}
+                print(f"\nChat requests per backend: {results['backend_requests']}")
+        sampler.cancel()
+        return results
+    finally:
+        for process in (api, *fakes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def print_report(size: int, report: dict) -> None:
+    print(f"\n== {size} MB ==")
+    print(f"{'stage':<20}{'n':>5}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'peak MB':>10}")
+    for stage, row in report.items():
+        rps = f"{row['throughput_rps']:.2f}" if row["throughput_rps"] else "-"
+        peak = f"{row['peak_rss_bytes'] / 2 ** 20:.0f}" if row["peak_rss_bytes"] else "-"
+        print(f"{stage:<20}{row['count']:>5}{row['errors']:>5}{row['p50_s']:>9.3f}"
+              f"{row['p95_s']:>9.3f}{row['p99_s']:>9.3f}{rps:>9}{peak:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50],
+                        help="Synthetic CSV sizes in MB")
+    parser.add_argument("--uploads", type=int, default=3,
+                        help="Distinct files uploaded per size")
+    parser.add_argument("--requests", type=int, default=40,
+                        help="Questions asked per size (and per mode)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backends", type=int, default=1,
+                        help="Fake Ollama instances to balance across")
+    parser.add_argument("--mode", choices=["answer", "stream", "both"], default="both")
+    parser.add_argument("--llm-latency", type=float, default=0.5,
+                        help="Fake Ollama seconds before first token")
+    parser.add_argument("--token-delay", type=float, default=0.01,
+                        help="Fake Ollama seconds between streamed tokens")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Let code cache and memoization hit (fixed fake code)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ask-ai-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="Show API server logs")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    started = time.time()
+    results = asyncio.run(run_benchmark(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "started_at": started,
+                "config": {key: value for key, value in vars(args).items()
+                           if key not in ("output", "verbose")},
+                "results": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Coverage and latency of the rule-based fast path on a question corpus.
+
+Uploads a synthetic CSV through the API in-process (no Ollama needed), plans
+every question of the corpus and reports:
+
+    coverage       share of questions answered without the LLM
+    agreement      share of questions routed the way the corpus expects
+    plan           planner latency per question
+    answer_<path>  POST /answer latency for fast path questions, per engine
+
+Questions the corpus marks "llm" are only planned, never sent, so the run
+needs no model. Repeats after the first hit memoized results, as in production.
+The corpus is a JSON list of {"question", "expected"} objects
+with expected "fast" or "llm"; the built-in one matches the synthetic columns.
+
+Usage:
+    python -m benchmarks.bench_fast_path --size 10 --repeat 20 --output fast_path.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.insert(0, ROOT_PATH)
+
+from benchmarks.bench_load import make_synthetic_csv  # noqa: E402
+from benchmarks.bench_e2e import percentile  # noqa: E402
+
+CORPUS = [
+    {"question": "How many rows are in the dataset?", "expected": "fast"},
+    {"question": "how many records are there", "expected": "fast"},
+    {"question": "Number of rows", "expected": "fast"},
+    {"question": "What is the average amount?", "expected": "fast"},
+    {"question": "mean score", "expected": "fast"},
+    {"question": "What's the total quantity?", "expected": "fast"},
+    {"question": "sum of amount", "expected": "fast"},
+    {"question": "median amount", "expected": "fast"},
+    {"question": "What is the maximum amount?", "expected": "fast"},
+    {"question": "lowest score", "expected": "fast"},
+    {"question": "What is the latest date?", "expected": "llm"},
+    {"question": "max date", "expected": "fast"},
+    {"question": "How many unique regions?", "expected": "fast"},
+    {"question": "count of distinct id", "expected": "fast"},
+    {"question": "How many missing values in amount?", "expected": "fast"},
+    {"question": "What is the average amount per region?", "expected": "fast"},
+    {"question": "total quantity by region", "expected": "fast"},
+    {"question": "max score for each region", "expected": "fast"},
+    {"question": "median amount grouped by region", "expected": "fast"},
+    {"question": "How many rows per region?", "expected": "fast"},
+    {"question": "count by region", "expected": "fast"},
+    {"question": "Which region has the highest total quantity?", "expected": "llm"},
+    {"question": "Show the distribution of scores", "expected": "llm"},
+    {"question": "What is the trend of amount over time?", "expected": "llm"},
+    {"question": "average price", "expected": "llm"},
+    {"question": "average region", "expected": "llm"},
+    {"question": "Is amount correlated with quantity?", "expected": "llm"},
+    {"question": "Plot a histogram of amount", "expected": "llm"},
+    {"question": "What are the top 5 ids by amount?", "expected": "llm"},
+    {"question": "Compare the average amount in 2021 and 2022", "expected": "llm"},
+]
+
+
+def summarize(values: list) -> dict:
+    return {"count": len(values), "p50_s": percentile(values, 50),
+            "p95_s": percentile(values, 95), "max_s": max(values) if values else 0.0}
+
+
+def run_benchmark(args, corpus: list) -> dict:
+    from src.configs.config import Settings
+    Settings.ASSETS_DIR = tempfile.mkdtemp(prefix="assets-", dir=args.workdir)
+    Settings.EXEC_WORKERS = 1
+
+    from fastapi.testclient import TestClient
+    from src.main import app
+    from src.logic.exec_pool import execution_pool
+    from src.logic.fast_path import query_planner
+    from src.logic.profiling import read_profile
+    execution_pool.size = 1
+
+    csv_path = os.path.join(args.workdir, "data", f"synthetic_{args.size}mb_0.csv")
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    if not os.path.exists(csv_path):
+        print(f"Generating {os.path.basename(csv_path)}...")
+        make_synthetic_csv(csv_path, args.size)
+
+    with TestClient(app) as client:
+        with open(csv_path, "rb") as f:
+            response = client.post("/upload", files={"file": (os.path.basename(csv_path), f, "text/csv")})
+        response.raise_for_status()
+        file_id = response.json()["file_id"]
+        profile = read_profile(file_id)
+
+        rows, plan_seconds = [], []
+        answer_seconds = {"pandas": [], "sql": []}
+        for item in corpus:
+            started = time.perf_counter()
+            plan = query_planner.plan(item["question"], profile)
+            plan_seconds.append(time.perf_counter() - started)
+            path = "fast" if plan is not None else "llm"
+            row = {"question": item["question"], "expected": item.get("expected"), "path": path}
+            if plan is not None:
+                row["kind"] = plan.kind
+                for engine in answer_seconds:
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        response = client.post("/answer", json={
+                            "file_id": file_id, "question": item["question"], "engine": engine})
+                        answer_seconds[engine].append(time.perf_counter() - started)
+                        response.raise_for_status()
+                    row[f"answer_{engine}"] = response.json()["answer"]
+            rows.append(row)
+
+    fast = sum(1 for row in rows if row["path"] == "fast")
+    labelled = [row for row in rows if row["expected"]]
+    return {
+        "questions": len(rows),
+        "coverage": fast / len(rows),
+        "agreement": sum(1 for row in labelled if row["path"] == row["expected"]) / max(1, len(labelled)),
+        "plan": summarize(plan_seconds),
+        **{f"answer_{engine}": summarize(values) for engine, values in answer_seconds.items()},
+        "results": rows,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\ncoverage {report['coverage']:.0%} of {report['questions']} questions, "
+          f"agreement with corpus {report['agreement']:.0%}")
+    print(f"{'stage':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage in ("plan", "answer_pandas", "answer_sql"):
+        row = report[stage]
+        print(f"{stage:<16}{row['count']:>6}{row['p50_s'] * 1000:>10.2f}"
+              f"{row['p95_s'] * 1000:>10.2f}{row['max_s'] * 1000:>10.2f}")
+    for row in report["results"]:
+        if row["expected"] and row["path"] != row["expected"]:
+            print(f"  routed {row['path']}, expected {row['expected']}: {row['question']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10, help="Synthetic CSV size in MB")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Times each fast path question is answered per engine")
+    parser.add_argument("--corpus", help="JSON question corpus instead of the built-in one")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ask-ai-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = json.load(f)
+
+    report = run_benchmark(args, corpus)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
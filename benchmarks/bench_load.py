@@ -0,0 +1,166 @@
+"""
+Compare dataset load time and memory for CSV vs. the memory-mapped columnar copy,
+with and without the dtype optimization applied to the stored file at ingest
+(downcast integers, dictionary-encoded low-cardinality strings, parsed dates).
+Loaded frames get pd.read_csv dtypes either way, so the optimization shows in
+the file size and load time rather than in the frame.
+
+Rows per size:
+
+    csv_pandas     plain pd.read_csv, the baseline before ingest conversion
+    csv            Arrow parse (uploads without a columnar copy)
+    columnar_raw   columnar copy written without dtype optimization
+    columnar       columnar copy as written at ingest
+
+Usage:
+    python -m benchmarks.bench_load --sizes 10 100 1000 --output load.json
+
+Each load runs in a fresh subprocess so RSS numbers are not polluted by
+earlier runs. Synthetic CSVs are cached in the work directory between runs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.insert(0, ROOT_PATH)
+
+MB = 1024 * 1024
+
+CHILD_SCRIPT = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from src.logic.ingest import read_dataframe
+
+def memory():
+    values = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Private_Clean:", "Private_Dirty:"):
+                values[parts[0][:-1]] = int(parts[1]) * 1024
+    return values["Rss"], values["Private_Clean"] + values["Private_Dirty"]
+
+def peak_rss():
+    # VmHWM resets on exec, unlike ru_maxrss which keeps the forking parent's peak
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+rss_before, uss_before = memory()
+start = time.perf_counter()
+df = pd.read_csv({path!r}) if {plain!r} else read_dataframe({path!r})
+df.sum(numeric_only=True)  # touch the data so mapped pages are counted
+elapsed = time.perf_counter() - start
+rss_after, uss_after = memory()
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_bytes": rss_after - rss_before,
+    "private_bytes": uss_after - uss_before,
+    "peak_rss_bytes": peak_rss(),
+    "frame_bytes": int(df.memory_usage(deep=True).sum()),
+    "rows": len(df),
+}}))
+"""
+
+
+def make_synthetic_csv(path: str, target_mb: int, seed: int = 0) -> None:
+    """Write a mixed-type CSV of roughly target_mb megabytes"""
+    rng = np.random.default_rng(seed)
+    regions = np.array(["north", "south", "east", "west", "central"])
+    chunk_rows = 200_000
+    first = True
+    with open(path, "w") as f:
+        while f.tell() < target_mb * MB:
+            n = chunk_rows
+            chunk = pd.DataFrame({
+                "id": rng.integers(0, 10_000_000, n),
+                "region": regions[rng.integers(0, len(regions), n)],
+                "amount": rng.normal(100, 25, n).round(2),
+                "quantity": rng.integers(1, 50, n),
+                "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, n), unit="D"),
+                "score": rng.random(n),
+            })
+            chunk.to_csv(f, header=first, index=False)
+            first = False
+
+
+def measure(path: str, plain: bool = False) -> dict:
+    script = CHILD_SCRIPT.format(root=ROOT_PATH, path=path, plain=plain)
+    output = subprocess.run([sys.executable, "-c", script],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="CSV sizes in MB")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ask-ai-bench"))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from src.logic.ingest import convert_to_columnar, get_columnar_path
+    from src.configs.config import Settings
+    Settings.ASSETS_DIR = args.workdir
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    for size in args.sizes:
+        file_id = f"bench{size}mb"
+        csv_path = os.path.join(args.workdir, f"{file_id}.csv")
+        if not os.path.exists(csv_path):
+            print(f"Generating {size} MB CSV...")
+            make_synthetic_csv(csv_path, size)
+        columnar_path = get_columnar_path(file_id)
+        if not os.path.exists(columnar_path):
+            convert_to_columnar(csv_path, file_id)
+        raw_path = get_columnar_path(f"{file_id}_raw")
+        if not os.path.exists(raw_path):
+            convert_to_columnar(csv_path, f"{file_id}_raw", optimize=False)
+
+        size_results = {}
+        for fmt, path in (("csv_pandas", csv_path), ("csv", csv_path),
+                          ("columnar_raw", raw_path), ("columnar", columnar_path)):
+            result = {"size_mb": size, "format": fmt, "file_bytes": os.path.getsize(path),
+                      **measure(path, plain=fmt == "csv_pandas")}
+            results.append(result)
+            size_results[fmt] = result
+            print(f"{size:>6} MB  {fmt:<12} {result['seconds']:8.3f} s  "
+                  f"rss {result['rss_bytes'] / MB:9.1f} MB  "
+                  f"private {result['private_bytes'] / MB:9.1f} MB  "
+                  f"peak {result['peak_rss_bytes'] / MB:9.1f} MB  "
+                  f"frame {result['frame_bytes'] / MB:9.1f} MB")
+
+        raw, optimized = size_results["columnar_raw"], size_results["columnar"]
+        savings = {"size_mb": size, "format": "savings"}
+        for key in ("file_bytes", "rss_bytes", "private_bytes", "peak_rss_bytes", "seconds"):
+            savings[key] = raw[key] - optimized[key]
+            savings[f"{key}_ratio"] = raw[key] / optimized[key] if optimized[key] else None
+        results.append(savings)
+        print(f"{size:>6} MB  dtype optimization saves "
+              f"{savings['file_bytes'] / MB:.1f} MB on disk "
+              f"({savings['file_bytes_ratio']:.1f}x smaller), "
+              f"{savings['peak_rss_bytes'] / MB:.1f} MB peak RSS; "
+              f"load {savings['seconds_ratio']:.1f}x faster")
+        baseline, columnar = size_results["csv_pandas"], size_results["columnar"]
+        print(f"{size:>6} MB  columnar vs. pd.read_csv: "
+              f"{baseline['seconds'] / columnar['seconds']:.1f}x faster, "
+              f"frame {baseline['frame_bytes'] / columnar['frame_bytes']:.1f}x smaller")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
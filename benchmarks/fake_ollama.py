@@ -0,0 +1,150 @@
+"""
+Local stand-in for the Ollama API used by the offline benchmarks.
+
+Serves /api/tags, /api/ps, /api/generate (model loading only) and /api/chat with
+canned responses: a pandas script when the
+request looks like code generation, SQL when it asks for SQL, and a fixed
+narrative otherwise. Latency and streaming behaviour are configurable:
+
+    python -m benchmarks.fake_ollama --port 11435 --latency 0.5 --token-delay 0.02
+
+Point the app at it with OLLAMA_BASE_URL=http://localhost:11435, or start several
+on different ports and list them in OLLAMA_BASE_URLS.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_CODE = """```python
+import pandas as pd
+
+# variant {variant}
+print("Rows:", len(df))
+print(df.describe(include="all").T.head(10))
+```"""
+
+CANNED_SQL = """```sql
+-- variant {variant}
+SELECT COUNT(*) AS row_count FROM data
+```"""
+
+CANNED_ANSWER = ("The dataset contains the rows summarized above. The numeric columns are "
+                 "centred around their means with moderate spread, and no values stand out "
+                 "as anomalies in this analysis.")
+
+
+def create_app(latency: float = 0.5, token_delay: float = 0.02, tokens_per_chunk: int = 1,
+               error_rate: float = 0.0, vary_code: bool = True,
+               models: tuple = ("fake:latest",)) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    counter = itertools.count()
+    state = {"requests": 0, "in_flight": 0, "loaded": []}
+
+    def pick_content(messages: list) -> str:
+        system = messages[0]["content"] if messages else ""
+        # Vary code per request so execution memoization doesn't hide exec cost
+        variant = next(counter) if vary_code else 0
+        if "SQL" in system:
+            return CANNED_SQL.format(variant=variant)
+        if "Python" in system:
+            return CANNED_CODE.format(variant=variant)
+        return CANNED_ANSWER
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": model, "model": model} for model in models]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "model": name} for name in state["loaded"]]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        # Only the prompt-less form used to load a model is supported
+        body = await request.json()
+        await asyncio.sleep(latency)
+        if body["model"] not in state["loaded"]:
+            state["loaded"].append(body["model"])
+        return {"model": body["model"], "response": "", "done": True}
+
+    @app.get("/stats")
+    async def stats():
+        return state
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        state["requests"] += 1
+        if error_rate and (state["requests"] * error_rate) % 1 < error_rate:
+            return JSONResponse(status_code=503, content={"error": "server busy"})
+
+        messages = body.get("messages", [])
+        content = pick_content(messages)
+        words = content.split(" ")
+        chunks = [" ".join(words[i:i + tokens_per_chunk]) + " "
+                  for i in range(0, len(words), tokens_per_chunk)]
+        started = time.perf_counter()
+        stats_fields = {"eval_count": len(words), "prompt_eval_count": sum(
+            len(message["content"]) // 4 for message in messages)}
+
+        state["in_flight"] += 1
+        if not body.get("stream", True):
+            try:
+                await asyncio.sleep(latency + token_delay * len(chunks))
+            finally:
+                state["in_flight"] -= 1
+            elapsed_ns = int((time.perf_counter() - started) * 1e9)
+            return {"model": body.get("model"), "done": True,
+                    "message": {"role": "assistant", "content": content},
+                    "eval_duration": elapsed_ns, **stats_fields}
+
+        async def stream():
+            try:
+                await asyncio.sleep(latency)
+                for chunk in chunks:
+                    yield json.dumps({"message": {"role": "assistant", "content": chunk},
+                                      "done": False}) + "\n"
+                    await asyncio.sleep(token_delay)
+                elapsed_ns = int((time.perf_counter() - started) * 1e9)
+                yield json.dumps({"message": {"role": "assistant", "content": ""},
+                                  "done": True, "eval_duration": elapsed_ns,
+                                  **stats_fields}) + "\n"
+            finally:
+                state["in_flight"] -= 1
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02,
+                        help="Seconds between streamed chunks")
+    parser.add_argument("--tokens-per-chunk", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 503")
+    parser.add_argument("--model", nargs="+", default=["fake:latest"],
+                        help="Model names reported by /api/tags")
+    parser.add_argument("--fixed-code", action="store_true",
+                        help="Return identical code every time (lets memoization hit)")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.token_delay, args.tokens_per_chunk,
+                     args.error_rate, vary_code=not args.fixed_code, models=tuple(args.model))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,46 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+import json
 import logging
-from src.logic.excutions import save_uploaded_file, execute_generated_code
-from src.logic.llm_ops import generate_code, generate_final_answer
-from src.api.schemas import UploadResponse, AnswerRequest, AnswerResponse
+from src.configs.config import Settings
+from src.logic.excutions import (save_uploaded_file, execute_generated, delete_uploaded_file,
+                                 select_engine, find_file_id_by_hash, get_dataset_profile,
+                                 get_sample, UploadTooLargeError)
+from src.logic.llm_ops import generate_code, stream_final_answer
+from src.logic.pipeline import (run_answer_pipeline, run_batch_pipeline, run_session_pipeline,
+                                execute_and_cache)
+from src.logic.code_cache import code_cache
+from src.logic.result_store import result_store
+from src.logic.exec_pool import execution_pool
+from src.logic.metrics import StatsCollector
+from src.logic.single_flight import answer_flights
+from src.logic.llm_scheduler import llm_scheduler, LLMOverloadedError
+from src.logic.readiness import readiness_probe
+from src.logic.janitor import asset_janitor
+from src.logic.sessions import session_manager, SessionNotFoundError
+from src.logic.fast_path import query_planner
+from src.logic.llm_backends import backend_pool
+from src.logic.prompt_budget import answer_prompt_budget
+from src.logic.jobs import answer_jobs, JobNotFoundError
+from src.logic.sampling import label_answer
+from src.api.schemas import (UploadResponse, ProfileResponse, AnswerRequest, AnswerResponse,
+                             BatchAnswerRequest, BatchAnswerItem, BatchAnswerResponse,
+                             SessionCreateRequest, SessionResponse, SessionAnswerRequest,
+                             SessionAnswerResponse, AnswerJobRequest, AnswerJobResponse)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def get_error_detail(error_message: str) -> str:
+    """Client-facing detail for a failed answer"""
+    # Check if it's an internal error (code generation/execution issue)
+    if "Internal error:" in error_message:
+        return "Internal error: Unable to process your request. Please try rephrasing your question."
+    return f"Error: {error_message}"
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_file(file: UploadFile = File(...)):
     """Upload a CSV file and return a unique file ID"""
@@ -20,14 +53,19 @@ async def upload_file(file: UploadFile = File(...)):
                 status_code=400, detail="Only CSV files are allowed")
 
         # Save uploaded file and get ID
-        file_id = await save_uploaded_file(file)
+        file_id, duplicate = await save_uploaded_file(file)
 
         logger.info(f"File uploaded successfully with ID: {file_id}")
         return UploadResponse(
             file_id=file_id,
-            message="File uploaded successfully"
+            message="File already uploaded" if duplicate else "File uploaded successfully"
         )
 
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        logger.error(f"Upload rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -40,29 +78,307 @@ async def answer_question(request: AnswerRequest):
         f"Answer request received for file ID: {request.file_id}, question: '{request.question}'")
 
     try:
-        # Generate pandas code using LLM
-        generated_code = await generate_code(request.question, request.file_id)
-
-        # Execute the generated code
-        result = execute_generated_code(generated_code, request.file_id)
+        outcome = await run_answer_pipeline(
+            request.question, request.file_id, use_cache=not request.bypass_cache,
+            engine=request.engine, approximate=request.approximate)
 
-        # Generate final answer using LLM
-        final_answer = await generate_final_answer(request.question, generated_code, str(result))
-
-        logger.info("Answer generated successfully")
-        return AnswerResponse(answer=final_answer)
+        logger.info(f"Answer generated successfully ({outcome['path']} path)")
+        return AnswerResponse(**outcome)
 
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
     except FileNotFoundError:
         logger.error(f"File not found for ID: {request.file_id}")
         raise HTTPException(status_code=404, detail="File not found")
     except Exception as e:
         error_message = str(e)
         logger.error(f"Answer generation error: {error_message}")
+        raise HTTPException(status_code=500, detail=get_error_detail(error_message))
 
-        # Check if it's an internal error (code generation/execution issue)
-        if "Internal error:" in error_message:
-            raise HTTPException(
-                status_code=500, detail="Internal error: Unable to process your request. Please try rephrasing your question.")
+
+@router.post("/answer/batch", response_model=BatchAnswerResponse)
+async def answer_questions_batch(request: BatchAnswerRequest):
+    """Answer many questions about one uploaded file, pipelining the stages"""
+    logger.info(
+        f"Batch answer request received for file ID: {request.file_id}, {len(request.questions)} questions")
+
+    if len(request.questions) > Settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {Settings.BATCH_MAX_QUESTIONS} questions per batch are allowed")
+
+    try:
+        outcomes = await run_batch_pipeline(
+            request.questions, request.file_id,
+            use_cache=not request.bypass_cache, max_concurrency=request.max_concurrency,
+            engine=request.engine)
+    except FileNotFoundError:
+        logger.error(f"File not found for ID: {request.file_id}")
+        raise HTTPException(status_code=404, detail="File not found")
+
+    results = []
+    for question, outcome in zip(request.questions, outcomes):
+        if isinstance(outcome, LLMOverloadedError):
+            results.append(BatchAnswerItem(
+                question=question, status="rejected", error=str(outcome)))
+        elif isinstance(outcome, Exception):
+            logger.error(f"Batch question failed: '{question}': {str(outcome)}")
+            results.append(BatchAnswerItem(
+                question=question, status="error", error=get_error_detail(str(outcome))))
         else:
-            raise HTTPException(
-                status_code=500, detail=f"Error: {error_message}")
+            results.append(BatchAnswerItem(question=question, status="ok", **outcome))
+
+    logger.info("Batch answers generated successfully")
+    return BatchAnswerResponse(file_id=request.file_id, results=results)
+
+
+@router.get("/files/by-hash/{content_hash}", response_model=UploadResponse)
+async def find_file_by_hash(content_hash: str):
+    """Return the file ID of an upload with this SHA-256, so clients can skip re-uploading"""
+    file_id = find_file_id_by_hash(content_hash.lower())
+    if file_id is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return UploadResponse(file_id=file_id, message="File already uploaded")
+
+
+@router.get("/files/{file_id}/profile", response_model=ProfileResponse)
+async def get_file_profile(file_id: str):
+    """Return the upload-time profile of a file for previews"""
+    try:
+        profile = await get_dataset_profile(file_id)
+    except FileNotFoundError:
+        logger.error(f"File not found for ID: {file_id}")
+        raise HTTPException(status_code=404, detail="File not found")
+    return ProfileResponse(file_id=file_id, rows=profile["rows"],
+                           columns=profile["columns"], sample=profile["sample"])
+
+
+@router.delete("/files/{file_id}")
+async def delete_file(file_id: str):
+    """Delete an uploaded file, its derived artifacts and memoized results"""
+    logger.info(f"Delete request received for file ID: {file_id}")
+
+    try:
+        delete_uploaded_file(file_id)
+        return {"file_id": file_id, "message": "File deleted successfully"}
+    except FileNotFoundError:
+        logger.error(f"File not found for ID: {file_id}")
+        raise HTTPException(status_code=404, detail="File not found")
+
+
+@router.post("/sessions", response_model=SessionResponse)
+async def create_session(request: SessionCreateRequest):
+    """Start an analysis session that keeps the file and computed variables in memory"""
+    logger.info(f"Session request received for file ID: {request.file_id}")
+
+    try:
+        session = await session_manager.create(request.file_id)
+        return SessionResponse(session_id=session.session_id, file_id=session.file_id)
+    except FileNotFoundError:
+        logger.error(f"File not found for ID: {request.file_id}")
+        raise HTTPException(status_code=404, detail="File not found")
+    except Exception as e:
+        error_message = str(e)
+        logger.error(f"Session start error: {error_message}")
+        if "Too many active sessions" in error_message:
+            raise HTTPException(status_code=503, detail="Too many active sessions, try again later")
+        raise HTTPException(status_code=500, detail=get_error_detail(error_message))
+
+
+@router.post("/sessions/{session_id}/answer", response_model=SessionAnswerResponse)
+async def answer_session_question(session_id: str, request: SessionAnswerRequest):
+    """Answer a question in a session, building on the variables of earlier questions"""
+    logger.info(f"Session answer request received for session: {session_id}, "
+                f"question: '{request.question}'")
+
+    try:
+        outcome = await run_session_pipeline(session_id, request.question)
+        logger.info("Session answer generated successfully")
+        return SessionAnswerResponse(**outcome)
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    except SessionNotFoundError:
+        logger.error(f"Session not found: {session_id}")
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    except FileNotFoundError:
+        logger.error(f"File of session {session_id} was deleted")
+        raise HTTPException(status_code=404, detail="File not found")
+    except Exception as e:
+        error_message = str(e)
+        logger.error(f"Session answer error: {error_message}")
+        raise HTTPException(status_code=500, detail=get_error_detail(error_message))
+
+
+@router.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Close a session and free its worker"""
+    try:
+        await session_manager.close(session_id)
+        return {"session_id": session_id, "message": "Session closed"}
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+
+def get_job_response(job) -> AnswerJobResponse:
+    return AnswerJobResponse(
+        job_id=job.job_id, file_id=job.file_id, question=job.question, status=job.status,
+        answer=job.answer, path=job.path,
+        error=get_error_detail(job.error) if job.error else None)
+
+
+@router.post("/answer/jobs", response_model=AnswerJobResponse, status_code=202)
+async def submit_answer_job(request: AnswerJobRequest):
+    """Compute an exact answer on the full data in the background"""
+    logger.info(
+        f"Answer job requested for file ID: {request.file_id}, question: '{request.question}'")
+
+    try:
+        job = answer_jobs.submit(request.question, request.file_id,
+                                 use_cache=not request.bypass_cache, engine=request.engine)
+        return get_job_response(job)
+    except FileNotFoundError:
+        logger.error(f"File not found for ID: {request.file_id}")
+        raise HTTPException(status_code=404, detail="File not found")
+    except Exception as e:
+        error_message = str(e)
+        logger.error(f"Answer job error: {error_message}")
+        if "Too many pending jobs" in error_message:
+            raise HTTPException(status_code=503, detail="Too many pending jobs, try again later")
+        raise HTTPException(status_code=500, detail=get_error_detail(error_message))
+
+
+@router.get("/answer/jobs/{job_id}", response_model=AnswerJobResponse)
+async def get_answer_job(job_id: str):
+    """Poll a background answer job"""
+    try:
+        return get_job_response(answer_jobs.get(job_id))
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/answer/stream")
+async def answer_question_stream(request: AnswerRequest):
+    """Stream answer stages for a question as server-sent events"""
+    logger.info(
+        f"Streaming answer request received for file ID: {request.file_id}, question: '{request.question}'")
+
+    async def event_stream():
+        # Emit immediately so clients see progress before the first LLM call returns
+        yield format_sse("started", {"file_id": request.file_id})
+
+        try:
+            engine = select_engine(request.file_id, request.engine)
+
+            # Simple aggregates skip the LLM; the answer arrives as a single token
+            plan = query_planner.plan(request.question, await get_dataset_profile(request.file_id))
+            if plan is not None:
+                result = None
+                if plan.needs_execution:
+                    planned_code = plan.render(engine)
+                    yield format_sse("code", {"code": planned_code, "engine": engine, "path": "fast"})
+                    yield format_sse("execution_started", {})
+                    result = str(await execute_generated(planned_code, request.file_id, engine))
+                    yield format_sse("execution_finished", {"output": result})
+                final_answer = plan.format_answer(result)
+                yield format_sse("token", {"content": final_answer})
+                yield format_sse("done", {"answer": final_answer, "path": "fast"})
+                return
+
+            generated_code, code_key = await generate_code(
+                request.question, request.file_id, use_cache=not request.bypass_cache,
+                engine=engine)
+            yield format_sse("code", {"code": generated_code, "engine": engine, "path": "llm"})
+
+            sample = get_sample(request.file_id) if request.approximate else None
+            yield format_sse("execution_started", {
+                "sample_fraction": sample["fraction"] if sample else None})
+            result = await execute_and_cache(
+                generated_code, code_key, request.file_id, engine, sample)
+            yield format_sse("execution_finished", {"output": str(result)})
+
+            answer_parts = []
+            async for token in stream_final_answer(
+                    request.question, generated_code, str(result), file_id=request.file_id,
+                    engine=engine, sample=sample):
+                answer_parts.append(token)
+                yield format_sse("token", {"content": token})
+
+            final_answer = "".join(answer_parts).strip()
+            if not final_answer:
+                final_answer = "Unable to generate a proper answer for your question."
+            if sample:
+                # The label arrives as the last token, matching the non-streaming answer
+                labelled_answer = label_answer(final_answer, sample)
+                yield format_sse("token", {"content": labelled_answer[len(final_answer):]})
+                final_answer = labelled_answer
+            logger.info("Streamed answer generated successfully")
+            yield format_sse("done", {"answer": final_answer, "path": "llm",
+                                      "sample_fraction": sample["fraction"] if sample else None})
+
+        except LLMOverloadedError as e:
+            yield format_sse("error", {"status_code": 429, "detail": str(e),
+                                       "retry_after": e.retry_after})
+        except FileNotFoundError:
+            logger.error(f"File not found for ID: {request.file_id}")
+            yield format_sse("error", {"status_code": 404, "detail": "File not found"})
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Streaming answer error: {error_message}")
+            yield format_sse("error", {"status_code": 500, "detail": get_error_detail(error_message)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/health")
+async def health():
+    """Liveness: the API process is up, with the state of its dependencies"""
+    return {"status": "ok", **readiness_probe.status()}
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness: 200 once Ollama has the model loaded and workers are warm, else 503"""
+    status = readiness_probe.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503,
+                        content={"status": "ready" if status["ready"] else "starting", **status})
+
+
+# Shared by /stats and the Prometheus exporter
+stats_sources = {
+    "dataframe_cache": execution_pool.cache_stats,
+    "code_cache": code_cache.stats,
+    "result_store": result_store.stats,
+    "exec_pool": execution_pool.stats,
+    "answer_flights": answer_flights.stats,
+    "llm_scheduler": llm_scheduler.stats,
+    "asset_janitor": asset_janitor.stats,
+    "sessions": session_manager.stats,
+    "fast_path": query_planner.stats,
+    "llm_backends": backend_pool.stats,
+    "answer_prompt": answer_prompt_budget.stats,
+    "answer_jobs": answer_jobs.stats,
+}
+REGISTRY.register(StatsCollector(stats_sources))
+
+
+@router.get("/stats")
+async def get_stats():
+    """Return cache counters for monitoring"""
+    return {name: get_stats() for name, get_stats in stats_sources.items()}
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Expose stage latencies, LLM timings and cache counters to Prometheus"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
 
 
 class UploadResponse(BaseModel):
@@ -6,10 +7,100 @@ class UploadResponse(BaseModel):
     message: str
 
 
+class ColumnProfile(BaseModel):
+    name: str
+    dtype: str
+    null_count: int
+    unique_count: int
+    min: Any = None
+    max: Any = None
+    top_values: List[dict] = []
+
+
+class ProfileResponse(BaseModel):
+    file_id: str
+    rows: int
+    columns: List[ColumnProfile]
+    # Random sample of rows, column name -> value
+    sample: List[dict]
+
+
 class AnswerRequest(BaseModel):
     file_id: str
     question: str
+    # Skip the generated-code cache lookup and regenerate (the fresh code is cached)
+    bypass_cache: bool = False
+    # pandas code in a worker or DuckDB SQL over the file; defaults by file size
+    engine: Optional[Literal["pandas", "sql"]] = None
+    # Run the generated code on the file's ingest-time sample for a faster estimate
+    approximate: bool = False
 
 
 class AnswerResponse(BaseModel):
     answer: str
+    # "fast" when a simple aggregate was answered without the LLM, else "llm"
+    path: Literal["fast", "llm"]
+    # Share of rows the answer was computed on; None for exact answers
+    sample_fraction: Optional[float] = None
+
+
+class AnswerJobRequest(BaseModel):
+    file_id: str
+    question: str
+    bypass_cache: bool = False
+    engine: Optional[Literal["pandas", "sql"]] = None
+
+
+class AnswerJobResponse(BaseModel):
+    job_id: str
+    file_id: str
+    question: str
+    # "pending", "done" or "error"
+    status: str
+    answer: Optional[str] = None
+    path: Optional[Literal["fast", "llm"]] = None
+    error: Optional[str] = None
+
+
+class BatchAnswerRequest(BaseModel):
+    file_id: str
+    questions: List[str] = Field(..., min_length=1)
+    bypass_cache: bool = False
+    # Capped by Settings.BATCH_CONCURRENCY
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    engine: Optional[Literal["pandas", "sql"]] = None
+
+
+class BatchAnswerItem(BaseModel):
+    question: str
+    # "ok", "error", or "rejected" when the LLM queue couldn't take it in time
+    status: str
+    answer: Optional[str] = None
+    path: Optional[Literal["fast", "llm"]] = None
+    error: Optional[str] = None
+
+
+class BatchAnswerResponse(BaseModel):
+    file_id: str
+    results: List[BatchAnswerItem]
+
+
+class SessionCreateRequest(BaseModel):
+    file_id: str
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    file_id: str
+    # Variables kept by earlier turns, name -> short description
+    variables: Dict[str, str] = {}
+
+
+class SessionAnswerRequest(BaseModel):
+    question: str
+
+
+class SessionAnswerResponse(BaseModel):
+    answer: str
+    code: str
+    variables: Dict[str, str]
@@ -10,7 +10,7 @@ load_dotenv(os.path.join(ROOT_PATH, ".env"), override=True)
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
@@ -19,6 +19,50 @@ class Settings:
     # Ollama Configuration
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:4b")
+    # How long Ollama keeps the model loaded after a request; -1 pins it
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "-1")
+
+    # LLM Backends: comma-separated Ollama URLs, each call goes to the least loaded one.
+    # Code generation and final answers can use their own model and subset of hosts.
+    OLLAMA_BASE_URLS = os.getenv("OLLAMA_BASE_URLS", "")
+    OLLAMA_CODE_MODEL = os.getenv("OLLAMA_CODE_MODEL", "")
+    OLLAMA_CODE_URLS = os.getenv("OLLAMA_CODE_URLS", "")
+    OLLAMA_ANSWER_MODEL = os.getenv("OLLAMA_ANSWER_MODEL", "")
+    OLLAMA_ANSWER_URLS = os.getenv("OLLAMA_ANSWER_URLS", "")
+    # Consecutive failures before a backend is taken out of rotation, and for how long
+    BACKEND_FAILURE_THRESHOLD = int(os.getenv("BACKEND_FAILURE_THRESHOLD", "3"))
+    BACKEND_EJECT_SECONDS = float(os.getenv("BACKEND_EJECT_SECONDS", "30"))
+
+    # Readiness Probe (seconds)
+    READINESS_INITIAL_BACKOFF = float(os.getenv("READINESS_INITIAL_BACKOFF", "0.5"))
+    READINESS_MAX_BACKOFF = float(os.getenv("READINESS_MAX_BACKOFF", "30"))
+    READINESS_INTERVAL_SECONDS = float(os.getenv("READINESS_INTERVAL_SECONDS", "30"))
+
+    # LLM Client Configuration (seconds)
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "300"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+
+    # LLM Scheduler: generations run at once, queue bound and per-lane deadlines
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))
+    LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "32"))
+    LLM_EXPECTED_SECONDS = float(os.getenv("LLM_EXPECTED_SECONDS", "10"))
+    LLM_INTERACTIVE_DEADLINE_SECONDS = float(os.getenv("LLM_INTERACTIVE_DEADLINE_SECONDS", "120"))
+    LLM_BATCH_DEADLINE_SECONDS = float(os.getenv("LLM_BATCH_DEADLINE_SECONDS", "1800"))
+    LLM_LANE_DEADLINES = {"interactive": LLM_INTERACTIVE_DEADLINE_SECONDS,
+                          "batch": LLM_BATCH_DEADLINE_SECONDS}
+
+    # Prompt Budget: the answer prompt's code and output are cut to fit the model's
+    # context window (Ollama's num_ctx), leaving room for the answer itself
+    LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "4096"))
+    ANSWER_RESERVED_TOKENS = int(os.getenv("ANSWER_RESERVED_TOKENS", "1024"))
+    # Rough token estimate; tabular output tokenizes denser than prose
+    PROMPT_CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", "3.5"))
+
+    # Observability: fraction of LLM prompts logged in full at DEBUG level
+    PROMPT_LOG_SAMPLE_RATE = float(os.getenv("PROMPT_LOG_SAMPLE_RATE", "0.01"))
 
     # API Configuration
     API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:5599")
@@ -26,8 +70,105 @@ class Settings:
     API_PORT = int(os.getenv("API_PORT", "5599"))
 
     # Assets Directory
-    ASSETS_DIR = os.path.join(ROOT_PATH, "assets")
+    ASSETS_DIR = os.getenv("ASSETS_DIR", os.path.join(ROOT_PATH, "assets"))
+
+    # Asset Lifecycle: datasets unused for the TTL are deleted, and least recently
+    # used ones go first when the assets directory exceeds the quota (0 disables either)
+    ASSET_TTL_SECONDS = int(os.getenv("ASSET_TTL_SECONDS", str(30 * 24 * 3600)))
+    ASSET_QUOTA_BYTES = int(os.getenv("ASSET_QUOTA_BYTES", str(50 * 1024 ** 3)))
+    JANITOR_INTERVAL_SECONDS = float(os.getenv("JANITOR_INTERVAL_SECONDS", "300"))
+    # Datasets used this recently are never evicted for the quota
+    JANITOR_MIN_IDLE_SECONDS = float(os.getenv("JANITOR_MIN_IDLE_SECONDS", "300"))
+
+    # Uploads
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(2 * 1024 ** 3)))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 ** 2)))
+
+    # Dataset Profiling
+    PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", "20"))
+    PROFILE_TOP_VALUES = int(os.getenv("PROFILE_TOP_VALUES", "5"))
+
+    # Approximate Answers: uploads with more rows than this get a random sample of
+    # this many rows at ingest, which "approximate" requests run against
+    APPROX_SAMPLE_ROWS = int(os.getenv("APPROX_SAMPLE_ROWS", "100000"))
+    # Finished exact-answer jobs are kept this long for polling
+    JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "16"))
+
+    # Column Types (applied when the columnar copy is written)
+    CSV_DATE_FORMATS = [fmt for fmt in os.getenv(
+        "CSV_DATE_FORMATS", "%m/%d/%Y,%Y/%m/%d,%m/%d/%Y %H:%M:%S").split(",") if fmt]
+    # Compact types of the stored columnar file; DataFrames always load widened
+    # String columns with at most this share of distinct values are dictionary-encoded
+    CATEGORY_MAX_UNIQUE_RATIO = float(os.getenv("CATEGORY_MAX_UNIQUE_RATIO", "0.5"))
+    DOWNCAST_INTS = os.getenv("DOWNCAST_INTS", "true").lower() == "true"
+    # float64 -> float32 halves memory but keeps only ~7 significant digits
+    DOWNCAST_FLOATS = os.getenv("DOWNCAST_FLOATS", "false").lower() == "true"
+    # "object" or "pyarrow" (pandas string[pyarrow]) for remaining string columns
+    DF_STRING_DTYPE = os.getenv("DF_STRING_DTYPE", "object")
+
+    # DataFrame Cache
+    DF_CACHE_MAX_BYTES = int(os.getenv("DF_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+    # Batch Questions
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "100"))
+
+    # Code Execution Pool
+    EXEC_WORKERS = int(os.getenv("EXEC_WORKERS", str(os.cpu_count() or 1)))
+    EXEC_TIMEOUT_SECONDS = float(os.getenv("EXEC_TIMEOUT_SECONDS", "60"))
+    EXEC_MEMORY_LIMIT_BYTES = int(os.getenv("EXEC_MEMORY_LIMIT_BYTES", str(4 * 1024 ** 3)))
+    EXEC_STARTUP_TIMEOUT_SECONDS = float(os.getenv("EXEC_STARTUP_TIMEOUT_SECONDS", "60"))
+    EXEC_PRELOAD_FILES = int(os.getenv("EXEC_PRELOAD_FILES", "4"))
+    # Longest a job waits for an idle worker before failing
+    EXEC_QUEUE_TIMEOUT_SECONDS = float(os.getenv("EXEC_QUEUE_TIMEOUT_SECONDS", "120"))
+    # Printed output kept per script (head and tail); 0 keeps everything
+    EXEC_OUTPUT_MAX_CHARS = int(os.getenv("EXEC_OUTPUT_MAX_CHARS", "65536"))
+
+    # Fast Path: simple aggregate questions are answered without the LLM
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+    # Analysis Sessions: each holds a dedicated worker with its variables in memory
+    SESSION_MAX = int(os.getenv("SESSION_MAX", "8"))
+    SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_BYTES", str(4 * 1024 ** 3)))
+    SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+    # Earlier question/code pairs replayed in the prompt
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))
+
+    # SQL Engine (DuckDB)
+    # Files at least this large use SQL unless the request picks an engine
+    SQL_ENGINE_MIN_BYTES = int(os.getenv("SQL_ENGINE_MIN_BYTES", str(1024 ** 3)))
+    SQL_THREADS = int(os.getenv("SQL_THREADS", str(os.cpu_count() or 1)))
+    SQL_MEMORY_LIMIT = os.getenv("SQL_MEMORY_LIMIT", "2GB")
+    SQL_MAX_RESULT_ROWS = int(os.getenv("SQL_MAX_RESULT_ROWS", "200"))
+
+    # Generated Code Cache
+    CODE_CACHE_TTL_SECONDS = int(os.getenv("CODE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    CODE_CACHE_MAX_ENTRIES = int(os.getenv("CODE_CACHE_MAX_ENTRIES", "10000"))
+
+    @classmethod
+    def get_backend_urls(cls, role: str = None) -> list:
+        """Ollama URLs serving a role ("code" or "answer"), or all of them"""
+        urls = cls.OLLAMA_BASE_URLS
+        if role == "code" and cls.OLLAMA_CODE_URLS:
+            urls = cls.OLLAMA_CODE_URLS
+        elif role == "answer" and cls.OLLAMA_ANSWER_URLS:
+            urls = cls.OLLAMA_ANSWER_URLS
+        urls = [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+        return urls or [cls.OLLAMA_BASE_URL.rstrip("/")]
+
+    @classmethod
+    def get_model(cls, role: str = None) -> str:
+        if role == "code" and cls.OLLAMA_CODE_MODEL:
+            return cls.OLLAMA_CODE_MODEL
+        if role == "answer" and cls.OLLAMA_ANSWER_MODEL:
+            return cls.OLLAMA_ANSWER_MODEL
+        return cls.OLLAMA_MODEL
 
     @classmethod
-    def get_ollama_url(cls):
-        return f"{cls.OLLAMA_BASE_URL}/api/chat"
+    def get_keep_alive(cls):
+        # Ollama takes seconds as a number or a duration string such as "30m"
+        try:
+            return int(cls.OLLAMA_KEEP_ALIVE)
+        except ValueError:
+            return cls.OLLAMA_KEEP_ALIVE
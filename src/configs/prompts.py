@@ -1,4 +1,24 @@
-def get_code_generation_prompt(question: str, columns: list, sample_data: str) -> dict:
+def format_column_profiles(profile: dict) -> str:
+    """Render per-column stats from a dataset profile, one line per column"""
+    lines = [f"Total rows: {profile['rows']}"]
+    for column in profile["columns"]:
+        details = [column["dtype"], f"{column['null_count']} nulls",
+                   f"{column['unique_count']} unique"]
+        if column["min"] is not None:
+            details.append(f"range {column['min']} to {column['max']}")
+        # Frequent values help with categories; for ids and continuous
+        # measures the range says more and the counts are just noise
+        is_categorical = column["min"] is None or column["unique_count"] <= 20
+        if column["top_values"] and column["top_values"][0]["count"] > 1 and is_categorical:
+            top = ", ".join(f"{item['value']!r} ({item['count']})"
+                            for item in column["top_values"])
+            details.append(f"top values: {top}")
+        lines.append(f"- {column['name']}: " + "; ".join(details))
+    return "\n".join(lines)
+
+
+def get_code_generation_prompt(question: str, columns: list, sample_data: str,
+                               profile: dict = None) -> dict:
     system_prompt = """You are an expert Python data analyst. Your task is to analyze an EXISTING pandas DataFrame that is already loaded.
 
 CRITICAL RULES:
@@ -18,10 +38,17 @@ Your code should:
 
 Remember: The data is REAL and ALREADY LOADED - do not create example data!"""
 
+    column_details = ""
+    if profile:
+        column_details = f"""
+Column details (dtype, nulls, distinct values, range, most frequent values):
+{format_column_profiles(profile)}
+"""
+
     user_prompt = f"""I have a real DataFrame 'df' already loaded with the following structure:
 
 Columns: {columns}
-
+{column_details}
 Sample of the ACTUAL data:
 {sample_data}
 
@@ -51,7 +78,97 @@ print(df.head())
     }
 
 
-def get_answer_generation_prompt(question: str, code: str, result: str) -> dict:
+def get_sql_generation_prompt(question: str, columns: list, sample_data: str,
+                              profile: dict = None) -> dict:
+    system_prompt = """You are an expert data analyst who writes DuckDB SQL. The dataset is ALREADY available as a table named 'data'.
+
+CRITICAL RULES:
+- Write exactly ONE read-only SELECT statement (WITH clauses are fine)
+- Query the existing table 'data' - DO NOT create tables, insert rows or read other files
+- Wrap column names in double quotes, e.g. "Order Date"
+- Return only the rows and columns needed to answer the question; aggregate instead of listing raw rows
+- Use ORDER BY and LIMIT for rankings and top-N questions
+
+Remember: The data is REAL and ALREADY LOADED - do not create example data!"""
+
+    column_details = ""
+    if profile:
+        column_details = f"""
+Column details (dtype, nulls, distinct values, range, most frequent values):
+{format_column_profiles(profile)}
+"""
+
+    user_prompt = f"""I have a real table 'data' with the following structure:
+
+Columns: {columns}
+{column_details}
+Sample of the ACTUAL data:
+{sample_data}
+
+
+Question: {question}
+
+Write a single DuckDB SQL query over the table 'data' that answers the question.
+
+Example of what your query should look like:
+```sql
+SELECT "category", COUNT(*) AS row_count, AVG("amount") AS average_amount
+FROM data
+GROUP BY "category"
+ORDER BY row_count DESC
+LIMIT 10
+```"""
+
+    return {
+        "system": system_prompt,
+        "user": user_prompt
+    }
+
+
+def get_session_system_prompt(columns: list, sample_data: str, profile: dict = None) -> str:
+    """
+    System prompt of an analysis session. It is the same on every turn, so with the
+    earlier turns after it Ollama can reuse the cached prompt prefix.
+    """
+    column_details = ""
+    if profile:
+        column_details = f"""
+Column details (dtype, nulls, distinct values, range, most frequent values):
+{format_column_profiles(profile)}
+"""
+
+    return get_code_generation_prompt("", columns, sample_data)["system"] + f"""
+
+This is an ongoing analysis session:
+- Variables you create are kept between questions - reuse them instead of recomputing
+- Changes to 'df' are kept too, so store derived data in new variables rather than modifying 'df'
+- Give intermediate results that follow-up questions may need descriptive names
+
+The DataFrame 'df' has the following structure:
+
+Columns: {columns}
+{column_details}
+Sample of the ACTUAL data:
+{sample_data}"""
+
+
+def get_session_turn_prompt(question: str, variables: dict) -> str:
+    if variables:
+        available = "\n".join(f"- {name}: {description}"
+                               for name, description in variables.items())
+    else:
+        available = "- none yet"
+
+    return f"""Variables from earlier questions:
+{available}
+
+Question: {question}
+
+Write Python code that answers the question, reusing earlier variables where they help. Put the code in a ```python``` block."""
+
+
+def get_answer_generation_prompt(question: str, code: str, result: str,
+                                 language: str = "python", sample: dict = None) -> dict:
     system_prompt = """You are a data analyst who excels at interpreting code and results for a non-technical audience. Your task is to provide a clear, natural language answer to a user's question based on the provided script and its output.
 
 - Focus on the key findings and what they mean.
@@ -62,7 +179,7 @@ def get_answer_generation_prompt(question: str, code: str, result: str) -> dict:
 Original question: "{question}"
 
 Analysis script:
-```python
+```{language}
 {code}
 ```
 
@@ -72,6 +189,10 @@ Script execution output:
 ```
 
 Based on the script and its output, provide a clear and comprehensive answer to the original question.
+"""
+    if sample:
+        user_prompt += f"""
+The script ran on a random sample of {sample['rows']:,} of the dataset's {sample['source_rows']:,} rows ({sample['fraction']:.2%}). Averages, shares and rankings carry over to the full data; scale counts and totals by {1 / sample['fraction']:,.1f} to estimate them for the full dataset, and say that the figures are estimates.
 """
 
     return {
@@ -0,0 +1,143 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+from src.configs.config import Settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generated_code (
+    cache_key TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_generated_code_last_hit ON generated_code (last_hit_at);
+"""
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def type_family(dtype: str) -> str:
+    """Logical type of a pandas dtype name, independent of its storage width"""
+    if dtype.startswith(("int", "uint", "Int", "UInt")):
+        return "int"
+    if dtype.startswith(("float", "Float")):
+        return "float"
+    if dtype in ("bool", "boolean"):
+        return "bool"
+    if dtype.startswith("datetime64"):
+        return "datetime"
+    if dtype.startswith("timedelta64"):
+        return "timedelta"
+    if dtype in ("object", "category") or dtype.startswith("string"):
+        return "string"
+    return dtype
+
+
+def schema_fingerprint(profile: dict) -> str:
+    """
+    Stable hash of the column names and logical types of a dataset profile.
+
+    Storage types depend on the data (int8 vs int16 in the columnar file by
+    value range, object vs string[pyarrow] strings), so two exports with the
+    same schema can report different dtypes; generated code works the same for
+    both.
+    """
+    schema = "\n".join(f"{column['name']}:{type_family(column['dtype'])}"
+                       for column in profile["columns"])
+    return hashlib.sha256(schema.encode()).hexdigest()
+
+
+class CodeCache:
+    """Persistent cache of generated code keyed by schema fingerprint and question"""
+
+    def __init__(self):
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(Settings.ASSETS_DIR, exist_ok=True)
+            self._conn = sqlite3.connect(
+                os.path.join(Settings.ASSETS_DIR, "code_cache.sqlite3"),
+                check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @staticmethod
+    def make_key(fingerprint: str, question: str) -> str:
+        return hashlib.sha256(
+            f"{fingerprint}\n{normalize_question(question)}".encode()).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            row = conn.execute(
+                "SELECT code FROM generated_code WHERE cache_key = ? AND created_at >= ?",
+                (cache_key, now - Settings.CODE_CACHE_TTL_SECONDS)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE generated_code SET last_hit_at = ? WHERE cache_key = ?",
+                (now, cache_key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, cache_key: str, code: str) -> None:
+        """Store code that ran successfully; storing the same code again keeps its age"""
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "INSERT INTO generated_code (cache_key, code, created_at, last_hit_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (cache_key) DO UPDATE SET "
+                "created_at = CASE WHEN code = excluded.code THEN created_at "
+                "ELSE excluded.created_at END, code = excluded.code, "
+                "last_hit_at = excluded.last_hit_at", (cache_key, code, now, now))
+            # Expire old entries, then trim least recently used ones over the cap
+            expired = conn.execute(
+                "DELETE FROM generated_code WHERE created_at < ?",
+                (now - Settings.CODE_CACHE_TTL_SECONDS,)).rowcount
+            trimmed = conn.execute(
+                "DELETE FROM generated_code WHERE cache_key IN ("
+                "SELECT cache_key FROM generated_code ORDER BY last_hit_at DESC "
+                "LIMIT -1 OFFSET ?)", (Settings.CODE_CACHE_MAX_ENTRIES,)).rowcount
+            self.evictions += expired + trimmed
+
+    def invalidate(self, cache_key: str) -> None:
+        """Drop the code for a key, e.g. after it failed to run"""
+        with self._lock, self._connection() as conn:
+            if conn.execute("DELETE FROM generated_code WHERE cache_key = ?",
+                            (cache_key,)).rowcount:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection().execute(
+                "SELECT COUNT(*) FROM generated_code").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "max_entries": Settings.CODE_CACHE_MAX_ENTRIES,
+            }
+
+
+code_cache = CodeCache()
@@ -0,0 +1,94 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+from src.logic.ingest import read_dataframe
+
+logger = logging.getLogger(__name__)
+
+
+class DataFrameCache:
+    """
+    LRU cache of parsed DataFrames bounded by their in-memory size.
+
+    Callers get shallow copies of the cached frames, which only stay isolated
+    from each other with pandas copy-on-write enabled; the execution workers
+    turn it on at startup.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # file_id -> (signature, df, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_id: str, file_path: str) -> pd.DataFrame:
+        """Return a copy-on-write view of the DataFrame stored at file_path"""
+        stat = os.stat(file_path)
+        signature = (file_path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                self._entries.move_to_end(file_id)
+                return entry[1].copy(deep=False)
+            self.misses += 1
+
+        # Parse outside the lock so other files stay servable meanwhile
+        df = read_dataframe(file_path)
+        nbytes = int(df.memory_usage(deep=True).sum())
+        logger.info(
+            f"DataFrame cache miss for file ID: {file_id}, loaded {nbytes} bytes")
+
+        with self._lock:
+            self._remove(file_id)
+            if nbytes <= self.max_bytes:
+                self._entries[file_id] = (signature, df, nbytes)
+                self._total_bytes += nbytes
+                self._evict()
+            else:
+                logger.info(
+                    f"DataFrame for file ID: {file_id} exceeds cache budget, not cached")
+
+        return df.copy(deep=False)
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop the cached DataFrame for a file ID, if any"""
+        with self._lock:
+            self._remove(file_id)
+
+    def prune_missing(self) -> None:
+        """Drop entries whose file was deleted, releasing their memory maps"""
+        with self._lock:
+            for file_id in [file_id for file_id, (signature, _, _) in self._entries.items()
+                            if not os.path.exists(signature[0])]:
+                self._remove(file_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, file_id: str) -> None:
+        entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            file_id, (_, _, nbytes) = self._entries.popitem(last=False)
+            self._total_bytes -= nbytes
+            self.evictions += 1
+            logger.info(f"Evicted DataFrame for file ID: {file_id} from cache")
+
@@ -1,96 +1,338 @@
-import pandas as pd
+import asyncio
+import hashlib
 import os
+import shutil
 import uuid
 import logging
-import sys
-import io
-from contextlib import redirect_stdout
 from fastapi import UploadFile
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
 from src.configs.config import Settings
+from src.logic.registry import file_registry
+from src.logic.result_store import result_store, make_exec_key
+from src.logic.exec_pool import execution_pool, ExecutionTimeoutError
+from src.logic.metrics import timed_span
+
+# pandas, pyarrow and duckdb are imported where used so they stay off the
+# boot path; the readiness probe loads them in the background after startup
 
 logger = logging.getLogger(__name__)
 
 
-async def save_uploaded_file(file: UploadFile) -> str:
-    """Save uploaded CSV file and return unique file ID"""
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds Settings.MAX_UPLOAD_BYTES"""
+
+
+# New uploads whose columnar copy, sample and profile are still being built
+_preparing: Dict[str, asyncio.Task] = {}
+
+
+def find_file_id_by_hash(content_hash: str) -> Optional[str]:
+    """Return the file ID of an existing upload with the same content hash"""
+    record = file_registry.find_by_hash(content_hash)
+    if record is None or not os.path.exists(record["path"]):
+        return None
+    # A re-upload or hash lookup is a use: keep the file from looking idle to the janitor
+    file_registry.touch(record["file_id"])
+    return record["file_id"]
+
+
+async def save_uploaded_file(file: UploadFile) -> Tuple[str, bool]:
+    """Stream uploaded CSV file to disk and return (file ID, already uploaded)"""
     logger.info(f"Uploading file: {file.filename}")
 
+    if file.size is not None and file.size > Settings.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(
+            f"File exceeds the maximum upload size of {Settings.MAX_UPLOAD_BYTES} bytes")
+
     # Create assets directory if it doesn't exist
     os.makedirs(Settings.ASSETS_DIR, exist_ok=True)
 
+    # Stream to a temporary file in fixed-size chunks while hashing, so the
+    # upload is never held in memory as a whole
+    tmp_path = os.path.join(Settings.ASSETS_DIR, f".upload-{uuid.uuid4().hex}.part")
+    hasher = hashlib.sha256()
+    total_bytes = 0
+
+    try:
+        with open(tmp_path, "wb") as buffer:
+            while chunk := await file.read(Settings.UPLOAD_CHUNK_SIZE):
+                total_bytes += len(chunk)
+                if total_bytes > Settings.MAX_UPLOAD_BYTES:
+                    raise UploadTooLargeError(
+                        f"File exceeds the maximum upload size of {Settings.MAX_UPLOAD_BYTES} bytes")
+                hasher.update(chunk)
+                buffer.write(chunk)
+    except Exception as e:
+        logger.error(f"Error saving file: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    content_hash = hasher.hexdigest()
+    existing_file_id = find_file_id_by_hash(content_hash)
+    if existing_file_id is not None:
+        os.remove(tmp_path)
+        logger.info(
+            f"Duplicate upload detected, reusing file ID: {existing_file_id}")
+        return existing_file_id, True
+
     # Generate unique file ID (16 characters)
     file_id = str(uuid.uuid4()).replace('-', '')[:16]
     file_extension = os.path.splitext(file.filename)[1]
     file_path = os.path.join(Settings.ASSETS_DIR, f"{file_id}{file_extension}")
+    os.replace(tmp_path, file_path)
+    file_registry.register(file_id, file_path, file_extension.lstrip(".").lower(),
+                           total_bytes, content_hash)
+
+    logger.info(
+        f"File saved successfully with ID: {file_id} ({total_bytes} bytes)")
+
+    # Parsing a large CSV takes a while; answer with the file ID right away
+    task = asyncio.create_task(asyncio.to_thread(prepare_upload, file_id, file_path))
+    _preparing[file_id] = task
+    task.add_done_callback(lambda _: _preparing.pop(file_id, None))
+    return file_id, False
+
+
+def prepare_upload(file_id: str, file_path: str) -> None:
+    """Build the columnar copy, sample and profile of a new upload from one parse"""
+    from src.logic.ingest import (read_csv_table, optimize_table, write_columnar,
+                                  get_columnar_schema, table_to_dataframe)
+    from src.logic.profiling import save_profile
+    from src.logic.sampling import sample_table
 
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        table = read_csv_table(file_path)
+    except Exception as e:
+        logger.warning(f"Parsing failed for file ID: {file_id}: {str(e)}")
+        return
 
-        logger.info(f"File saved successfully with ID: {file_id}")
-        return file_id
+    # Store a columnar copy once; the original CSV is kept for provenance
+    stored = optimize_table(table)
+    try:
+        columnar_path = write_columnar(stored, file_id)
+        file_registry.set_columnar(
+            file_id, columnar_path, get_columnar_schema(columnar_path))
     except Exception as e:
-        logger.error(f"Error saving file: {str(e)}")
-        raise
+        logger.warning(
+            f"Columnar conversion failed for file ID: {file_id}, CSV will be used: {str(e)}")
 
+    # Sample large datasets once for approximate answers
+    try:
+        sample_table(file_id, stored)
+    except Exception as e:
+        logger.warning(f"Sampling failed for file ID: {file_id}: {str(e)}")
+    del stored
 
-def get_file_path_by_id(file_id: str) -> str:
-    """Get file path by file ID"""
-    # Look for file with the given ID (with any extension)
-    for filename in os.listdir(Settings.ASSETS_DIR):
-        if filename.startswith(file_id):
-            return os.path.join(Settings.ASSETS_DIR, filename)
+    # Profile once so prompt building never has to touch the full data
+    try:
+        save_profile(file_id, table_to_dataframe(table))
+    except Exception as e:
+        logger.warning(f"Profiling failed for file ID: {file_id}: {str(e)}")
 
-    raise FileNotFoundError(f"File with ID {file_id} not found")
 
+async def wait_until_prepared(file_id: str) -> None:
+    """Wait for the post-upload processing of a file ID, if it is still running"""
+    task = _preparing.get(file_id)
+    if task is not None:
+        # A caller that goes away must not cancel the preparation
+        await asyncio.shield(task)
 
-def execute_generated_code(code: str, file_id: str) -> Any:
-    """Execute the generated code with full Python access (educational use only)"""
-    logger.info(f"Executing code for file ID: {file_id}")
 
+def get_file_record(file_id: str) -> dict:
+    """Get the registry record for a file ID"""
+    with timed_span("file_lookup"):
+        record = file_registry.get(file_id)
+    if record is None:
+        raise FileNotFoundError(f"File with ID {file_id} not found")
+    file_registry.touch(file_id)
+    return record
+
+
+def get_data_path_by_id(file_id: str) -> str:
+    """Get the fastest loadable path for a file ID (columnar copy if present)"""
+    record = get_file_record(file_id)
+    if record["columnar_path"] and os.path.exists(record["columnar_path"]):
+        return record["columnar_path"]
+    return record["path"]
+
+
+async def get_dataset_profile(file_id: str) -> dict:
+    """Get the upload-time profile for a file ID, building it if missing"""
+    from src.logic.profiling import profile_file, read_profile
+
+    get_file_record(file_id)
+    await wait_until_prepared(file_id)
     try:
-        # Get file path from ID
-        file_path = get_file_path_by_id(file_id)
-        logger.info(f"Found file path: {file_path}")
+        return read_profile(file_id)
+    except FileNotFoundError:
+        logger.info(f"No profile for file ID: {file_id}, profiling now")
+        return await asyncio.to_thread(profile_file, file_id, get_data_path_by_id(file_id))
+
+
+def get_sample(file_id: str) -> Optional[dict]:
+    """The ingest-time sample of a file ID for approximate answers, None if it has none"""
+    from src.logic.sampling import read_sample
+
+    get_file_record(file_id)
+    return read_sample(file_id)
 
-        # Load the CSV file into a pandas DataFrame
-        df = pd.read_csv(file_path)
-        logger.info(f"Loaded DataFrame with shape: {df.shape}")
+
+def get_plots_dir(file_id: str) -> str:
+    return os.path.join(Settings.ASSETS_DIR, "plots", file_id)
+
+
+def select_engine(file_id: str, engine: Optional[str] = None) -> str:
+    """Resolve the execution engine: the requested one, else SQL for large files"""
+    if engine:
+        return engine
+    if get_file_record(file_id)["size"] >= Settings.SQL_ENGINE_MIN_BYTES:
+        return "sql"
+    return "pandas"
+
+
+def _sample_hash(content_hash: str, sample: Optional[dict]) -> str:
+    # The sample is seeded, so its content is fixed by the upload and its size
+    return f"{content_hash}:sample:{sample['rows']}" if sample else content_hash
+
+
+def get_exec_key(file_id: str, code: str, sample: Optional[dict] = None) -> str:
+    """Memoization key for running code against the content of a file ID, or its sample"""
+    return make_exec_key(_sample_hash(get_file_record(file_id)["content_hash"], sample), code)
+
+
+def delete_uploaded_file(file_id: str) -> None:
+    """Delete an upload with its derived artifacts and memoized results"""
+    from src.logic.profiling import read_profile, get_profile_path
+    from src.logic.sampling import get_sample_path
+
+    record = file_registry.get(file_id)
+    if record is None:
+        raise FileNotFoundError(f"File with ID {file_id} not found")
+
+    for path in (record["path"], record["columnar_path"], get_profile_path(file_id),
+                 get_sample_path(file_id)):
+        if path and os.path.exists(path):
+            os.remove(path)
+    read_profile.cache_clear()
+    shutil.rmtree(get_plots_dir(file_id), ignore_errors=True)
+    # Workers drop the deleted file's cached frame before their next job
+    file_registry.delete(file_id)
+
+    if file_registry.find_by_hash(record["content_hash"]) is None:
+        result_store.invalidate(record["content_hash"])
+    logger.info(f"Deleted file ID: {file_id}")
+
+
+def _snapshot_plots(plots_dir: str) -> dict:
+    return {entry.name: entry.stat().st_mtime_ns
+            for entry in os.scandir(plots_dir) if entry.is_file()}
+
+
+async def execute_generated_code(code: str, file_id: str, sample: Optional[dict] = None) -> Any:
+    """
+    Execute the generated code with full Python access (educational use only).
+
+    With a sample from get_sample, df holds the sampled rows instead of the full data.
+    """
+    logger.info(f"Executing code for file ID: {file_id}{' on its sample' if sample else ''}")
+
+    try:
+        record = get_file_record(file_id)
 
         # Create file-specific plots directory if it doesn't exist
-        plots_dir = os.path.join(Settings.ASSETS_DIR, "plots", file_id)
+        plots_dir = get_plots_dir(file_id)
         os.makedirs(plots_dir, exist_ok=True)
         logger.info(f"File-specific plots directory ensured: {plots_dir}")
 
+        # Same code on byte-identical data: reuse the output and plots
+        exec_key = make_exec_key(_sample_hash(record["content_hash"], sample), code)
+        memoized_output = result_store.get_execution(exec_key, record["path"], plots_dir)
+        if memoized_output is not None:
+            logger.info("Execution result memoized, skipping execution")
+            return memoized_output
 
-        # Create execution environment with full access
-        local_vars = {"df": df, "plots_dir": plots_dir}
-
-        # Capture print output
-        output_buffer = io.StringIO()
-
-        # Execute with full Python capabilities and capture prints
-        with redirect_stdout(output_buffer):
-            exec(code, globals(), local_vars)
+        plots_before = _snapshot_plots(plots_dir)
 
-        # Get the captured output
-        captured_output = output_buffer.getvalue().strip()
+        # Run in a pre-warmed worker process with its own stdout capture,
+        # wall-clock timeout and memory cap. Workers cache the sample as its own frame
+        if sample:
+            cache_key, data_path = f"{file_id}:sample", sample["path"]
+        else:
+            cache_key, data_path = file_id, get_data_path_by_id(file_id)
+        captured_output = (await execution_pool.run_code(
+            code, cache_key, data_path, plots_dir)).strip()
 
         if captured_output:
             logger.info(
                 f"Code executed successfully, captured output length: {len(captured_output)}")
-            return captured_output
+            result = captured_output
         else:
             logger.info("Code executed successfully, no output captured")
-            return "Code executed successfully, but no output was generated"
+            result = "Code executed successfully, but no output was generated"
+
+        plot_names = [name for name, mtime in _snapshot_plots(plots_dir).items()
+                      if plots_before.get(name) != mtime]
+        result_store.put_execution(exec_key, record["content_hash"], record["path"],
+                                   result, plots_dir, plot_names)
+        return result
 
     except SyntaxError as e:
         error_msg = f"Invalid Python syntax in generated code: {str(e)}"
         logger.error(error_msg)
         raise Exception("Internal error: Generated code has invalid syntax")
+    except ExecutionTimeoutError as e:
+        logger.error(f"Code execution timed out: {str(e)}")
+        raise Exception(f"Internal error: Code execution timed out - {str(e)}")
     except Exception as e:
         error_msg = f"Error executing code: {str(e)}"
         logger.error(error_msg)
         raise Exception(f"Internal error: Code execution failed - {str(e)}")
+
+
+async def execute_generated_sql(query: str, file_id: str, sample: Optional[dict] = None) -> str:
+    """Run a generated SQL query with DuckDB directly over the stored file, or its sample"""
+    from src.logic.sql_engine import run_query, QueryError
+
+    logger.info(f"Executing SQL for file ID: {file_id}")
+
+    try:
+        record = get_file_record(file_id)
+
+        exec_key = make_exec_key(_sample_hash(record["content_hash"], sample), query)
+        plots_dir = get_plots_dir(file_id)
+        memoized_output = result_store.get_execution(exec_key, record["path"], plots_dir)
+        if memoized_output is not None:
+            logger.info("Query result memoized, skipping execution")
+            return memoized_output
+
+        with timed_span("sql_exec"):
+            data_path = sample["path"] if sample else get_data_path_by_id(file_id)
+            result = (await run_query(query, data_path)).strip()
+        if not result:
+            result = "Query executed successfully, but returned no rows"
+        logger.info(f"Query executed successfully, output length: {len(result)}")
+
+        result_store.put_execution(exec_key, record["content_hash"], record["path"],
+                                   result, plots_dir, [])
+        return result
+
+    except QueryError as e:
+        logger.error(f"Error executing SQL: {str(e)}")
+        raise Exception(f"Internal error: Query execution failed - {str(e)}")
+    except ExecutionTimeoutError as e:
+        logger.error(f"Query execution timed out: {str(e)}")
+        raise Exception(f"Internal error: Query execution timed out - {str(e)}")
+    except Exception as e:
+        if "Internal error:" in str(e):
+            raise
+        logger.error(f"Error executing SQL: {str(e)}")
+        raise Exception(f"Internal error: Query execution failed - {str(e)}")
+
+
+async def execute_generated(code: str, file_id: str, engine: str = "pandas",
+                            sample: Optional[dict] = None) -> str:
+    """Execute generated pandas code or SQL with the matching engine"""
+    if engine == "sql":
+        return await execute_generated_sql(code, file_id, sample)
+    return await execute_generated_code(code, file_id, sample)
@@ -0,0 +1,357 @@
+import io
+import os
+import sys
+import time
+import types
+import asyncio
+import logging
+import resource
+import threading
+import multiprocessing
+from contextlib import redirect_stdout
+from typing import Optional
+from src.configs.config import Settings
+from src.logic.metrics import observe_stage
+from src.logic.output_capture import BoundedOutput
+
+logger = logging.getLogger(__name__)
+
+# DataFrame cache counters that keep counting after their worker is replaced
+CACHE_COUNTER_KEYS = ("hits", "misses", "evictions")
+# Delay between attempts to respawn a worker, doubling up to the maximum
+RESPAWN_INITIAL_BACKOFF = 1.0
+RESPAWN_MAX_BACKOFF = 60.0
+
+
+class ExecutionTimeoutError(Exception):
+    """Raised when generated code exceeds Settings.EXEC_TIMEOUT_SECONDS"""
+
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process dies while running generated code"""
+
+
+class CodeExecutionError(Exception):
+    """Raised when generated code raises inside a worker"""
+
+
+class WorkerUnavailableError(Exception):
+    """Raised when no worker becomes idle within Settings.EXEC_QUEUE_TIMEOUT_SECONDS"""
+
+
+def _run_code(cache, code: str, file_id: str, data_path: str, plots_dir: str,
+              namespace: Optional[dict] = None) -> tuple:
+    try:
+        compiled = compile(code, "<generated>", "exec")
+    except SyntaxError as e:
+        return ("syntax_error", str(e), {})
+
+    try:
+        # Copy-on-write view of the worker's cached frame
+        load_start = time.perf_counter()
+        if namespace is None:
+            # Fresh namespace per job so scripts can't leak state into each other
+            namespace = {"__builtins__": __builtins__, "df": cache.get(file_id, data_path)}
+        elif "df" not in namespace:
+            # A session keeps its df, including columns earlier scripts added
+            namespace["df"] = cache.get(file_id, data_path)
+        namespace["plots_dir"] = plots_dir
+        timings = {"data_load": time.perf_counter() - load_start}
+
+        # Each worker runs one job at a time, so redirecting stdout is safe here.
+        # Only the head and tail of huge outputs are kept
+        output_buffer = BoundedOutput(Settings.EXEC_OUTPUT_MAX_CHARS) \
+            if Settings.EXEC_OUTPUT_MAX_CHARS > 0 else io.StringIO()
+        exec_start = time.perf_counter()
+        with redirect_stdout(output_buffer):
+            exec(compiled, namespace)
+        timings["code_exec"] = time.perf_counter() - exec_start
+        return ("ok", output_buffer.getvalue(), timings)
+    except MemoryError:
+        return ("error", "Memory limit exceeded", {})
+    except Exception as e:
+        return ("error", str(e), {})
+    finally:
+        # Only scripts that plotted have pyplot loaded; the background import
+        # may still be running, in which case nothing was plotted yet
+        close_figures = getattr(sys.modules.get("matplotlib.pyplot"), "close", None)
+        if close_figures is not None:
+            close_figures("all")
+
+
+def _describe_namespace(namespace: dict) -> dict:
+    """Short descriptions of the variables session scripts left behind, by name"""
+    described = {}
+    for name, value in namespace.items():
+        if name.startswith("_") or name == "plots_dir" or isinstance(
+                value, (types.ModuleType, types.FunctionType, type)):
+            continue
+        shape = getattr(value, "shape", None)
+        if hasattr(value, "columns") and shape is not None:
+            columns = ", ".join(str(column) for column in list(value.columns)[:10])
+            if len(value.columns) > 10:
+                columns += ", ..."
+            described[name] = f"DataFrame with {shape[0]} rows, columns [{columns}]"
+        elif shape is not None:
+            described[name] = f"{type(value).__name__} of shape {shape}"
+        elif isinstance(value, (bool, int, float, str)):
+            described[name] = f"{type(value).__name__} = {repr(value)[:80]}"
+        elif isinstance(value, (list, tuple, dict, set)):
+            described[name] = f"{type(value).__name__} of {len(value)} items"
+        else:
+            described[name] = type(value).__name__
+    return described
+
+
+def _import_pyplot() -> None:
+    import matplotlib.pyplot  # noqa: F401
+
+
+def _worker_main(conn, memory_limit: int, cache_max_bytes: int) -> None:
+    """Worker process loop: pre-import heavy libraries, then serve jobs"""
+    if memory_limit:
+        # RLIMIT_DATA covers heap and anonymous mappings, including the cached
+        # frames; the columnar files they are read from map outside of it
+        resource.setrlimit(resource.RLIMIT_DATA, (memory_limit, memory_limit))
+
+    # Headless backend for scripts that plot, without importing matplotlib yet
+    os.environ["MPLBACKEND"] = "Agg"
+    import pandas as pd
+    from src.logic.df_cache import DataFrameCache
+
+    # Every job gets a shallow copy of a cached frame. With copy-on-write, an
+    # in-place change made by generated code copies the touched data first
+    # instead of corrupting the frame the next job sees. Set here, for worker
+    # processes only, rather than as a side effect of importing the cache
+    pd.set_option("mode.copy_on_write", True)
+    cache = DataFrameCache(cache_max_bytes)
+    # Variables kept between jobs when this worker is dedicated to a session
+    session_namespace = {"__builtins__": __builtins__}
+    conn.send(("ready",))
+
+    # Report ready first and import pyplot while waiting for the first job
+    threading.Thread(target=_import_pyplot, daemon=True).start()
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+
+        if message[0] == "preload":
+            for file_id, data_path in message[1]:
+                try:
+                    cache.get(file_id, data_path)
+                except Exception as e:
+                    logger.warning(f"Could not preload file ID: {file_id}: {str(e)}")
+            conn.send(("ok", cache.stats()))
+        elif message[0] == "run":
+            # Datasets evicted from disk stay mapped until dropped here
+            cache.prune_missing()
+            # The cache lives in this process, so its stats ride along with the reply
+            conn.send(_run_code(cache, *message[1:]) + (cache.stats(),))
+        elif message[0] == "session_run":
+            reply = _run_code(cache, *message[1:], namespace=session_namespace)
+            conn.send(reply + (_describe_namespace(session_namespace),))
+
+
+class _Worker:
+    def __init__(self, context, cache_max_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, Settings.EXEC_MEMORY_LIMIT_BYTES, cache_max_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        # DataFrame cache stats as of the last reply
+        self.cache_stats = {}
+
+    def call(self, message: tuple, timeout: Optional[float]) -> Optional[tuple]:
+        """Send a message and wait for the reply; None means the timeout expired"""
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def private_memory_bytes(self) -> int:
+        """Resident memory not shared with other processes, 0 where /proc is missing"""
+        try:
+            with open(f"/proc/{self.process.pid}/statm") as statm:
+                resident, shared = statm.read().split()[1:3]
+        except (OSError, ValueError):
+            return 0
+        return (int(resident) - int(shared)) * os.sysconf("SC_PAGE_SIZE")
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ExecutionPool:
+    """Pool of pre-warmed worker processes that run generated code"""
+
+    def __init__(self, size: int):
+        self.size = size
+        # spawn: forking a process with a running event loop and threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers = set()
+        self._start_lock = asyncio.Lock()
+        self.jobs = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.respawn_failures = 0
+        # Background respawns, referenced until done so they aren't collected
+        self._tasks = set()
+        self._retired_cache_counters = dict.fromkeys(CACHE_COUNTER_KEYS, 0)
+
+    def _worker_cache_bytes(self) -> int:
+        # Cached frames are private copies in each worker, so the pool splits one budget
+        return Settings.DF_CACHE_MAX_BYTES // max(self.size, 1)
+
+    def _spawn(self, preload: Optional[list] = None,
+               cache_max_bytes: Optional[int] = None) -> _Worker:
+        """Start a worker, wait for its imports and load the hot DataFrames"""
+        from src.logic.registry import file_registry
+
+        if cache_max_bytes is None:
+            cache_max_bytes = self._worker_cache_bytes()
+        worker = _Worker(self._context, cache_max_bytes)
+        if not worker.conn.poll(Settings.EXEC_STARTUP_TIMEOUT_SECONDS):
+            worker.kill()
+            raise WorkerCrashedError("Execution worker did not start in time")
+        worker.conn.recv()  # ("ready",) once imports are done
+
+        if preload is None:
+            preload = [
+                (record["file_id"], record["columnar_path"] or record["path"])
+                for record in file_registry.most_recent(Settings.EXEC_PRELOAD_FILES)
+            ]
+        if preload:
+            worker.cache_stats = worker.call(("preload", preload), None)[1]
+        return worker
+
+    def spawn_dedicated(self, file_id: str, data_path: str) -> _Worker:
+        """Start a worker outside the pool with one dataset loaded; the caller kills it"""
+        # Its one dataset gets the whole budget; SESSION_MEMORY_BUDGET_BYTES bounds sessions
+        return self._spawn([(file_id, data_path)], Settings.DF_CACHE_MAX_BYTES)
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            logger.info(f"Starting {self.size} execution workers")
+            idle = asyncio.Queue()
+            workers = await asyncio.gather(
+                *[asyncio.to_thread(self._spawn) for _ in range(self.size)])
+            for worker in workers:
+                self._workers.add(worker)
+                idle.put_nowait(worker)
+            self._idle = idle
+            logger.info("Execution workers ready")
+
+    def _replace_in_background(self, worker: _Worker) -> None:
+        task = asyncio.create_task(self._replace(worker))
+        self._tasks.add(task)
+        task.add_done_callback(self._replace_done)
+
+    def _replace_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Replacing an execution worker failed: {str(task.exception())}")
+
+    async def _replace(self, worker: _Worker) -> None:
+        """Kill a timed out or crashed worker and respawn it, retrying with backoff"""
+        self._workers.discard(worker)
+        for key in CACHE_COUNTER_KEYS:
+            self._retired_cache_counters[key] += worker.cache_stats.get(key, 0)
+        await asyncio.to_thread(worker.kill)
+        delay = RESPAWN_INITIAL_BACKOFF
+        while True:
+            try:
+                new_worker = await asyncio.to_thread(self._spawn)
+                break
+            except Exception as e:
+                self.respawn_failures += 1
+                logger.error(f"Failed to respawn execution worker, retrying in {delay:.0f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RESPAWN_MAX_BACKOFF)
+        self._workers.add(new_worker)
+        self._idle.put_nowait(new_worker)
+
+    async def run_code(self, code: str, file_id: str, data_path: str, plots_dir: str) -> str:
+        """Run generated code in an idle worker and return its captured stdout"""
+        await self.start()
+        queued_at = time.perf_counter()
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), Settings.EXEC_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise WorkerUnavailableError(
+                f"No execution worker became available within {Settings.EXEC_QUEUE_TIMEOUT_SECONDS}s "
+                f"({len(self._workers)} of {self.size} running)")
+        observe_stage("exec_queue_wait", time.perf_counter() - queued_at)
+        self.jobs += 1
+
+        try:
+            reply = await asyncio.to_thread(
+                worker.call, ("run", code, file_id, data_path, plots_dir),
+                Settings.EXEC_TIMEOUT_SECONDS)
+        except (EOFError, OSError):
+            self.crashes += 1
+            self._replace_in_background(worker)
+            raise WorkerCrashedError("Execution worker died (memory limit exceeded?)")
+        except asyncio.CancelledError:
+            # The job keeps running in the worker; kill it rather than wait
+            self._replace_in_background(worker)
+            raise
+
+        if reply is None:
+            self.timeouts += 1
+            self._replace_in_background(worker)
+            raise ExecutionTimeoutError(
+                f"Code execution exceeded {Settings.EXEC_TIMEOUT_SECONDS}s")
+
+        self._idle.put_nowait(worker)
+        status, payload, timings, worker.cache_stats = reply
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds)
+        if status == "syntax_error":
+            raise SyntaxError(payload)
+        if status == "error":
+            raise CodeExecutionError(payload)
+        return payload
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for worker in list(self._workers):
+            await asyncio.to_thread(worker.kill)
+        self._workers.clear()
+        self._idle = None
+
+    def stats(self) -> dict:
+        idle = self._idle.qsize() if self._idle is not None else 0
+        return {
+            "workers": len(self._workers),
+            "idle": idle,
+            "busy": len(self._workers) - idle,
+            "jobs": self.jobs,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "respawn_failures": self.respawn_failures,
+        }
+
+    def cache_stats(self) -> dict:
+        """DataFrame cache stats summed over the workers, as of their last reply"""
+        totals = dict(self._retired_cache_counters)
+        totals.update(entries=0, bytes=0)
+        for worker in list(self._workers):
+            for key in totals:
+                totals[key] += worker.cache_stats.get(key, 0)
+        totals["max_bytes"] = self._worker_cache_bytes() * len(self._workers)
+        return totals
+
+
+execution_pool = ExecutionPool(Settings.EXEC_WORKERS)
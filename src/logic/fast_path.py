@@ -0,0 +1,215 @@
+import re
+import logging
+from typing import Optional
+from src.configs.config import Settings
+from src.logic.code_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+AGGREGATIONS = {
+    "average": "mean", "avg": "mean", "mean": "mean",
+    "sum": "sum", "total": "sum",
+    "median": "median",
+    "maximum": "max", "max": "max", "highest": "max", "largest": "max",
+    "minimum": "min", "min": "min", "lowest": "min", "smallest": "min",
+}
+AGGREGATION_LABELS = {"mean": "average", "sum": "total", "median": "median",
+                      "max": "maximum", "min": "minimum", "count": "number of rows"}
+SQL_FUNCTIONS = {"mean": "AVG", "sum": "SUM", "median": "MEDIAN", "max": "MAX", "min": "MIN"}
+
+_AGG_WORDS = "|".join(sorted(AGGREGATIONS, key=len, reverse=True))
+_PREFIX = r"(?:(?:what is|what s|whats|show|show me|give me|find|get|compute|calculate|tell me)\s+)?(?:the\s+)?"
+_ROWS = r"(?:rows|records|entries|lines|observations)"
+_GROUP = r"\s+(?:by|per|for each|for every|grouped by|across|in each)\s+(?:the\s+)?(?P<group>.+)"
+_DATASET = r"(?:\s+(?:are there|does (?:the|this) (?:dataset|data|file|table) have|"
+_DATASET += r"(?:are )?in (?:the|this) (?:dataset|data|file|table)))?"
+
+# Tried in order against the normalized question; the first full match wins
+PATTERNS = [
+    ("rows", re.compile(rf"(?:how many|number of|count of|total number of|count the)\s+{_ROWS}{_DATASET}")),
+    ("count_by", re.compile(rf"(?:how many|number of|count of|count of the)\s+{_ROWS}{_GROUP}")),
+    ("count_by", re.compile(rf"{_PREFIX}(?:row )?counts?{_GROUP}")),
+    ("distinct", re.compile(
+        rf"(?:how many|number of|count of|count the)\s+(?:distinct|unique|different)\s+"
+        rf"(?P<column>.+?)(?:\s+values)?{_DATASET}")),
+    ("nulls", re.compile(
+        rf"(?:how many|number of|count of)\s+(?:missing|null|empty)\s+(?:values\s+)?"
+        rf"(?:in|for|of)\s+(?:the\s+)?(?P<column>.+?)(?:\s+column)?")),
+    ("aggregate_by", re.compile(
+        rf"{_PREFIX}(?P<agg>{_AGG_WORDS})(?:\s+value)?\s+(?:of\s+|for\s+)?(?:the\s+)?"
+        rf"(?P<column>.+?){_GROUP}")),
+    ("aggregate", re.compile(
+        rf"{_PREFIX}(?P<agg>{_AGG_WORDS})(?:\s+value)?\s+(?:of\s+|for\s+)?(?:the\s+)?"
+        rf"(?P<column>.+?)(?:\s+column)?{_DATASET}")),
+]
+
+
+def _normalize_name(name: str) -> str:
+    return normalize_question(str(name).replace("_", " "))
+
+
+def _is_numeric(column: dict) -> bool:
+    return column["dtype"].startswith(("int", "uint", "float", "Int", "UInt", "Float"))
+
+
+def _format_number(value) -> str:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    if float(value).is_integer() and abs(value) < 1e15:
+        return f"{int(value):,}"
+    if abs(value) >= 1:
+        return f"{value:,.2f}"
+    return f"{value:.4g}"
+
+
+def _quote_sql(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class QueryPlan:
+    """A question resolved to one aggregation over named columns of the dataset"""
+
+    def __init__(self, kind: str, aggregation: str = None, column: dict = None,
+                 group: dict = None, rows: int = 0):
+        self.kind = kind
+        self.aggregation = aggregation
+        self.column = column
+        self.group = group
+        self.rows = rows
+
+    @property
+    def needs_execution(self) -> bool:
+        """False when the upload-time profile already holds the answer"""
+        return self.kind in ("aggregate", "aggregate_by", "count_by") and not (
+            self.kind == "aggregate" and self.aggregation in ("max", "min"))
+
+    def render(self, engine: str) -> str:
+        """pandas code or SQL computing the plan, for the regular executors"""
+        limit = Settings.SQL_MAX_RESULT_ROWS
+        if engine == "sql":
+            if self.kind == "aggregate":
+                function = SQL_FUNCTIONS[self.aggregation]
+                return f"SELECT {function}({_quote_sql(self.column['name'])}) AS value FROM data"
+            group = _quote_sql(self.group["name"])
+            value = "COUNT(*)" if self.kind == "count_by" else \
+                f"{SQL_FUNCTIONS[self.aggregation]}({_quote_sql(self.column['name'])})"
+            return (f"SELECT {group}, {value} AS value FROM data "
+                    f"GROUP BY {group} ORDER BY value DESC LIMIT {limit}")
+
+        if self.kind == "aggregate":
+            return f"print(df[{self.column['name']!r}].{self.aggregation}())"
+        if self.kind == "count_by":
+            result = f"df[{self.group['name']!r}].value_counts()"
+        else:
+            result = (f"df.groupby({self.group['name']!r}, observed=True)"
+                      f"[{self.column['name']!r}].{self.aggregation}().sort_values(ascending=False)")
+        return f"result = {result}\nprint(result.head({limit}).to_string())"
+
+    def format_answer(self, output: Optional[str] = None) -> str:
+        """Answer text from a template, filled from the profile or the executor output"""
+        if self.kind == "rows":
+            return f"The dataset has {_format_number(self.rows)} rows."
+        name = self.column["name"] if self.column else None
+        if self.kind == "distinct":
+            return f"The column '{name}' has {_format_number(self.column['unique_count'])} distinct values."
+        if self.kind == "nulls":
+            return f"The column '{name}' has {_format_number(self.column['null_count'])} missing values."
+        label = AGGREGATION_LABELS[self.aggregation or "count"]
+        if self.kind == "aggregate":
+            if self.aggregation in ("max", "min"):
+                value = self.column[self.aggregation]
+            else:
+                # The value is the last line for both engines (SQL output has a header)
+                value = output.strip().splitlines()[-1].strip()
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            return f"The {label} of '{name}' is {_format_number(value)}."
+
+        group = self.group["name"]
+        title = f"The {label} by '{group}'" if self.kind == "count_by" else \
+            f"The {label} of '{name}' by '{group}'"
+        if self.group["unique_count"] > Settings.SQL_MAX_RESULT_ROWS:
+            title += f" (top {Settings.SQL_MAX_RESULT_ROWS} of {self.group['unique_count']} groups)"
+        return f"{title}, highest first:\n\n```\n{output.strip()}\n```"
+
+
+class QueryPlanner:
+    """
+    Deterministic planner for simple aggregate questions.
+
+    A question is planned only when it matches one of PATTERNS and every column
+    it mentions matches exactly one column name of the dataset, with a dtype the
+    aggregation makes sense for. Anything else returns None and goes to the LLM.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _find_column(self, text: Optional[str], profile: dict) -> Optional[dict]:
+        if not text:
+            return None
+        wanted = _normalize_name(text)
+        # "unique customers" for a column named customer
+        candidates = [wanted] + [wanted[:-len(suffix)] for suffix in ("es", "s")
+                                 if wanted.endswith(suffix)]
+        for candidate in candidates:
+            matches = [column for column in profile["columns"]
+                       if _normalize_name(column["name"]) == candidate]
+            if matches:
+                # Column names that only differ in case or separators are ambiguous
+                return matches[0] if len(matches) == 1 else None
+        return None
+
+    def _build(self, kind: str, match: re.Match, profile: dict) -> Optional[QueryPlan]:
+        groups = match.groupdict()
+        if kind == "rows":
+            return QueryPlan("rows", rows=profile["rows"])
+
+        column = self._find_column(groups.get("column"), profile)
+        group = self._find_column(groups.get("group"), profile)
+        if kind == "count_by":
+            return QueryPlan("count_by", group=group) if group else None
+        if column is None:
+            return None
+        if kind in ("distinct", "nulls"):
+            return QueryPlan(kind, column=column)
+
+        aggregation = AGGREGATIONS[groups["agg"]]
+        if aggregation in ("mean", "sum", "median") and not _is_numeric(column):
+            return None
+        if kind == "aggregate":
+            # min/max come from the profile, which only has them for ordered types
+            if aggregation in ("max", "min") and column[aggregation] is None:
+                return None
+            return QueryPlan("aggregate", aggregation, column)
+        if group is None or group is column or (
+                aggregation in ("max", "min") and not _is_numeric(column)):
+            return None
+        return QueryPlan("aggregate_by", aggregation, column, group)
+
+    def plan(self, question: str, profile: dict) -> Optional[QueryPlan]:
+        """Plan the question or return None when it should go to the LLM"""
+        if not Settings.FAST_PATH_ENABLED:
+            return None
+        normalized = normalize_question(question)
+        for kind, pattern in PATTERNS:
+            match = pattern.fullmatch(normalized)
+            if match:
+                plan = self._build(kind, match, profile)
+                if plan is not None:
+                    self.hits += 1
+                    logger.info(f"Fast path planned '{question}' as {plan.kind}")
+                    return plan
+                # A matching shape with unresolved columns is ambiguous
+                break
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+query_planner = QueryPlanner()
@@ -0,0 +1,146 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+from src.configs.config import Settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_EXTENSION = ".feather"
+
+# pandas.read_csv's default missing-value markers, applied to every column type
+CSV_NULL_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+                   "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+                   "n/a", "nan", "null"]
+
+
+def get_columnar_dir() -> str:
+    return os.path.join(Settings.ASSETS_DIR, "columnar")
+
+
+def get_columnar_path(file_id: str) -> str:
+    return os.path.join(get_columnar_dir(), f"{file_id}{COLUMNAR_EXTENSION}")
+
+
+def _optimized_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Smallest lossless integer type, optional float32, dictionary for low-cardinality strings"""
+    if pa.types.is_integer(column.type) and Settings.DOWNCAST_INTS \
+            and column.null_count < len(column):
+        bounds = pc.min_max(column).as_py()
+        for candidate in (pa.int8(), pa.int16(), pa.int32()):
+            info = np.iinfo(candidate.to_pandas_dtype())
+            if info.min <= bounds["min"] and bounds["max"] <= info.max:
+                return column.cast(candidate)
+    elif pa.types.is_float64(column.type) and Settings.DOWNCAST_FLOATS:
+        return column.cast(pa.float32())
+    elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        # Loaded as a pandas categorical: one copy of each distinct string
+        distinct = pc.count_distinct(column).as_py()
+        if len(column) and distinct <= len(column) * Settings.CATEGORY_MAX_UNIQUE_RATIO:
+            return column.dictionary_encode()
+    return column
+
+
+def optimize_table(table: pa.Table) -> pa.Table:
+    """Shrink column types so the stored table takes less disk and page cache"""
+    return pa.table([_optimized_column(column) for column in table.columns],
+                    names=table.column_names)
+
+
+def _widened_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Undo _optimized_column's integer and dictionary encodings"""
+    if pa.types.is_dictionary(column.type):
+        return column.cast(column.type.value_type)
+    if pa.types.is_integer(column.type) and column.type != pa.int64():
+        return column.cast(pa.int64())
+    return column
+
+
+def widen_table(table: pa.Table) -> pa.Table:
+    """Column types as pd.read_csv would infer them: int64 and plain strings"""
+    return pa.table([_widened_column(column) for column in table.columns],
+                    names=table.column_names)
+
+
+def read_csv_table(csv_path: str) -> pa.Table:
+    """Parse a CSV with Arrow, recognising dates in the configured formats"""
+    # Arrow keeps empty and "NA" cells of string columns as literal strings by
+    # default; match pandas so null counts and isna() agree with read_csv
+    convert_options = pa_csv.ConvertOptions(
+        timestamp_parsers=[pa_csv.ISO8601, *Settings.CSV_DATE_FORMATS],
+        null_values=CSV_NULL_VALUES, strings_can_be_null=True,
+        quoted_strings_can_be_null=True)
+    try:
+        return pa_csv.read_csv(csv_path, convert_options=convert_options)
+    except pa.ArrowInvalid as e:
+        # Arrow infers types from the first block and fails on later mismatches;
+        # pandas looks at the whole column, so fall back to it.
+        logger.warning(f"Arrow CSV parsing failed for {csv_path}, falling back to pandas: {str(e)}")
+        return pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+
+
+def convert_to_columnar(csv_path: str, file_id: str, optimize: bool = True) -> str:
+    """
+    Convert an uploaded CSV once into an uncompressed Arrow IPC (Feather v2) file.
+
+    Dates are parsed here once. Column types are shrunk in the stored file
+    only; read_dataframe widens them again on load.
+    """
+    table = read_csv_table(csv_path)
+    return write_columnar(optimize_table(table) if optimize else table, file_id)
+
+
+def write_columnar(table: pa.Table, file_id: str) -> str:
+    """Store an already parsed table as the columnar copy of a file ID"""
+    os.makedirs(get_columnar_dir(), exist_ok=True)
+    columnar_path = get_columnar_path(file_id)
+
+    # Write to a temp name first so readers never see a half-written file;
+    # no compression so the file can be memory-mapped without decoding.
+    tmp_path = f"{columnar_path}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, columnar_path)
+
+    logger.info(
+        f"Columnar copy written for file ID: {file_id} ({table.num_rows} rows)")
+    return columnar_path
+
+
+def get_columnar_schema(columnar_path: str) -> list:
+    """Column names and Arrow types of a columnar file, read from its footer only"""
+    with pa.memory_map(columnar_path) as source:
+        schema = pa.ipc.open_file(source).schema
+    return [{"name": field.name, "type": str(field.type)} for field in schema]
+
+
+def _string_types_mapper():
+    if Settings.DF_STRING_DTYPE == "pyarrow":
+        return {pa.string(): pd.StringDtype("pyarrow"),
+                pa.large_string(): pd.StringDtype("pyarrow")}.get
+    return None
+
+
+def read_dataframe(file_path: str) -> pd.DataFrame:
+    """Read a stored dataset into a writable DataFrame, memory-mapping columnar files"""
+    if file_path.endswith(COLUMNAR_EXTENSION):
+        # Generated code gets the dtypes pd.read_csv would give: int8 arithmetic
+        # wraps around silently, and categoricals reject new values in fillna()
+        # and assignments and keep unused categories in groupby()
+        table = widen_table(feather.read_table(file_path, memory_map=True))
+    else:
+        # No columnar copy: parse the CSV the same way ingest does
+        table = read_csv_table(file_path)
+    return table_to_dataframe(table)
+
+
+def table_to_dataframe(table: pa.Table) -> pd.DataFrame:
+    """Convert a parsed or widened table into a writable DataFrame"""
+    # Consolidating into blocks copies the columns out of the mapped pages.
+    # Zero-copy views (split_blocks) would be read-only numpy arrays, which
+    # copy-on-write doesn't protect: median(), values.sort() and other numpy
+    # in-place operations then fail with "assignment destination is read-only"
+    return table.to_pandas(date_as_object=False, types_mapper=_string_types_mapper())
@@ -0,0 +1,190 @@
+import os
+import time
+import shutil
+import asyncio
+import logging
+import threading
+from typing import Optional
+from src.configs.config import Settings
+from src.logic.registry import file_registry
+
+logger = logging.getLogger(__name__)
+
+# Interrupted uploads leave their temporary file behind
+STALE_UPLOAD_SECONDS = 3600
+# Artifacts this young may belong to an upload still being ingested, so they
+# are never treated as orphans
+ORPHAN_GRACE_SECONDS = 600
+
+
+def _path_size(path: str) -> int:
+    """Bytes used by a file, or by everything under a directory"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove_path(path: str) -> int:
+    size = _path_size(path)
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+    return size
+
+
+class AssetJanitor:
+    """
+    Background lifecycle manager for the assets directory.
+
+    Each sweep deletes datasets not accessed within ASSET_TTL_SECONDS, then
+    evicts least recently used datasets while the directory is over
+    ASSET_QUOTA_BYTES. Evictions go through the regular delete path, so plots,
+    the columnar copy, the profile and memoized results go with the upload.
+    Sweeps run in a thread and never hold up requests.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.ttl_evictions = 0
+        self.quota_evictions = 0
+        self.orphans_removed = 0
+        self.freed_bytes = 0
+        self.used_bytes = 0
+        self.last_sweep_seconds = 0.0
+
+    def start(self, after: Optional[asyncio.Event] = None) -> None:
+        """Sweep periodically, starting once the after event is set"""
+        if Settings.JANITOR_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run(after))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, after: Optional[asyncio.Event]) -> None:
+        if after is not None:
+            # Uploads the registry doesn't list yet would look like orphans
+            await after.wait()
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Asset sweep failed: {str(e)}")
+            await asyncio.sleep(Settings.JANITOR_INTERVAL_SECONDS)
+
+    def _dataset_bytes(self, record: dict) -> int:
+        from src.logic.excutions import get_plots_dir
+        from src.logic.profiling import get_profile_path
+        from src.logic.sampling import get_sample_path
+
+        paths = (record["path"], record["columnar_path"], get_profile_path(record["file_id"]),
+                 get_sample_path(record["file_id"]), get_plots_dir(record["file_id"]))
+        return sum(_path_size(path) for path in paths if path and os.path.exists(path))
+
+    def _evict(self, record: dict, reason: str) -> int:
+        """Delete a dataset with everything derived from it and return the bytes freed"""
+        from src.logic.excutions import delete_uploaded_file
+
+        size = self._dataset_bytes(record)
+        try:
+            delete_uploaded_file(record["file_id"])
+        except FileNotFoundError:
+            # Deleted by a request since the sweep listed it
+            return 0
+        if reason == "ttl":
+            self.ttl_evictions += 1
+        else:
+            self.quota_evictions += 1
+        self.freed_bytes += size
+        logger.info(f"Evicted file ID: {record['file_id']} ({reason}, {size} bytes)")
+        return size
+
+    def _remove_orphans(self, now: float) -> None:
+        """Remove derived artifacts whose dataset is gone and abandoned uploads"""
+        known = {record["file_id"] for record in file_registry.least_recently_used()}
+        candidates = []  # (path, file_id or None for abandoned uploads)
+        for subdir, suffix in (("plots", ""), ("columnar", ".feather"), ("profiles", ".json"),
+                               ("samples", ".feather")):
+            directory = os.path.join(Settings.ASSETS_DIR, subdir)
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                # Temporary files still being written don't carry the plain suffix
+                file_id = entry.name[:len(entry.name) - len(suffix)]
+                if (entry.name.endswith(suffix) and file_id not in known
+                        and now - entry.stat().st_mtime > ORPHAN_GRACE_SECONDS):
+                    candidates.append((entry.path, file_id))
+        for entry in os.scandir(Settings.ASSETS_DIR):
+            if (entry.name.startswith(".upload-") and entry.name.endswith(".part")
+                    and now - entry.stat().st_mtime > STALE_UPLOAD_SECONDS):
+                candidates.append((entry.path, None))
+
+        for path, file_id in candidates:
+            # An upload may have been registered since the registry was listed
+            if file_id is not None and file_registry.get(file_id) is not None:
+                continue
+            self.freed_bytes += _remove_path(path)
+            self.orphans_removed += 1
+            logger.info(f"Removed orphaned asset: {path}")
+
+    def sweep(self) -> None:
+        """Apply the TTL and disk quota once"""
+        if not os.path.isdir(Settings.ASSETS_DIR):
+            return
+        with self._lock:
+            started = time.perf_counter()
+            now = time.time()
+            self._remove_orphans(now)
+
+            records = file_registry.least_recently_used()
+            if Settings.ASSET_TTL_SECONDS > 0:
+                expired = [record for record in records
+                           if now - record["last_access_at"] > Settings.ASSET_TTL_SECONDS]
+                for record in expired:
+                    self._evict(record, "ttl")
+                records = records[len(expired):]
+
+            used = _path_size(Settings.ASSETS_DIR)
+            if Settings.ASSET_QUOTA_BYTES > 0 and used > Settings.ASSET_QUOTA_BYTES:
+                for record in records:
+                    if used <= Settings.ASSET_QUOTA_BYTES:
+                        break
+                    if now - record["last_access_at"] < Settings.JANITOR_MIN_IDLE_SECONDS:
+                        # The rest were used even more recently
+                        break
+                    used -= self._evict(record, "quota")
+                used = _path_size(Settings.ASSETS_DIR)
+                if used > Settings.ASSET_QUOTA_BYTES:
+                    logger.warning(f"Assets still use {used} bytes, over the "
+                                   f"{Settings.ASSET_QUOTA_BYTES} byte quota")
+
+            self.used_bytes = used
+            self.runs += 1
+            self.last_sweep_seconds = time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "ttl_evictions": self.ttl_evictions,
+            "quota_evictions": self.quota_evictions,
+            "orphans_removed": self.orphans_removed,
+            "freed_bytes": self.freed_bytes,
+            "used_bytes": self.used_bytes,
+            "quota_bytes": Settings.ASSET_QUOTA_BYTES,
+            "last_sweep_seconds": round(self.last_sweep_seconds, 3),
+        }
+
+
+asset_janitor = AssetJanitor()
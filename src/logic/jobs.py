@@ -0,0 +1,116 @@
+import time
+import uuid
+import asyncio
+import logging
+from typing import Dict, Optional
+from src.configs.config import Settings
+from src.logic.excutions import get_file_record
+from src.logic.llm_scheduler import current_lane
+from src.logic.pipeline import run_answer_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class JobNotFoundError(Exception):
+    """Raised for an unknown or expired job ID"""
+
+
+class AnswerJob:
+    """An exact answer being computed in the background"""
+
+    def __init__(self, job_id: str, file_id: str, question: str):
+        self.job_id = job_id
+        self.file_id = file_id
+        self.question = question
+        # "pending", "done" or "error"
+        self.status = "pending"
+        self.answer = None
+        self.path = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+
+
+class AnswerJobManager:
+    """
+    Exact answers on the full data, computed in the background.
+
+    Meant as the follow-up to an approximate answer: the job runs the regular
+    answer pipeline, usually reusing the cached generated code, in the batch
+    lane so it never delays interactive requests. Finished jobs are kept for
+    JOB_RETENTION_SECONDS, and at most JOB_MAX_PENDING run at once.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, AnswerJob] = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _prune(self) -> None:
+        cutoff = time.time() - Settings.JOB_RETENTION_SECONDS
+        for job_id in [job.job_id for job in self._jobs.values()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "pending")
+
+    def submit(self, question: str, file_id: str, use_cache: bool = True,
+               engine: Optional[str] = None) -> AnswerJob:
+        """Start answering a question exactly and return the job to poll"""
+        get_file_record(file_id)  # FileNotFoundError for unknown IDs
+        self._prune()
+        if self._pending() >= Settings.JOB_MAX_PENDING:
+            raise Exception("Internal error: Too many pending jobs, try again later")
+
+        job = AnswerJob(uuid.uuid4().hex[:16], file_id, question)
+        self._jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job, use_cache, engine))
+        self.submitted += 1
+        logger.info(f"Job {job.job_id} submitted for file ID: {file_id}")
+        return job
+
+    async def _run(self, job: AnswerJob, use_cache: bool, engine: Optional[str]) -> None:
+        current_lane.set("batch")
+        try:
+            outcome = await run_answer_pipeline(
+                job.question, job.file_id, use_cache=use_cache, engine=engine)
+            job.answer, job.path = outcome["answer"], outcome["path"]
+            job.status = "done"
+            self.completed += 1
+            logger.info(f"Job {job.job_id} finished")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}")
+            job.status, job.error = "error", str(e)
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> AnswerJob:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Job {job_id} not found")
+        return job
+
+    async def stop(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "retained": len(self._jobs),
+            "pending": self._pending(),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+answer_jobs = AnswerJobManager()
@@ -0,0 +1,144 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable
+from src.configs.config import Settings
+from src.logic.metrics import (LLM_BACKEND_DURATION, LLM_BACKEND_ERRORS, LLM_BACKEND_IN_FLIGHT,
+                               LLM_BACKEND_UP)
+
+logger = logging.getLogger(__name__)
+
+# Roles with their own model and hosts; other roles use the defaults
+ROLES = ("code", "answer")
+
+
+class Backend:
+    """One Ollama instance with its load and failure state"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.avg_seconds = 0.0
+        LLM_BACKEND_UP.labels(backend=url).set(1)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_seconds": round(self.avg_seconds, 3),
+        }
+
+
+class BackendPool:
+    """
+    Routes LLM calls across Ollama backends.
+
+    Each call goes to the backend of its role with the fewest requests in flight.
+    A backend failing BACKEND_FAILURE_THRESHOLD times in a row, or failing a
+    health check, is ejected for BACKEND_EJECT_SECONDS; after that a single
+    failure ejects it again until it succeeds once. When every backend of a
+    role is ejected, calls still go to them rather than failing outright.
+    """
+
+    def __init__(self):
+        self._backends: Dict[str, Backend] = {}
+        self.ejections = 0
+
+    def backend(self, url: str) -> Backend:
+        if url not in self._backends:
+            self._backends[url] = Backend(url)
+        return self._backends[url]
+
+    def candidates(self, role: str = None) -> list:
+        return [self.backend(url) for url in Settings.get_backend_urls(role)]
+
+    def assignments(self) -> Dict[str, set]:
+        """Models each backend has to serve, by URL"""
+        models = {}
+        for role in ROLES:
+            for url in Settings.get_backend_urls(role):
+                models.setdefault(url, set()).add(Settings.get_model(role))
+        return models
+
+    def choose(self, role: str = None, exclude: Iterable[str] = ()) -> Backend:
+        """Least loaded available backend for the role, avoiding URLs that already failed"""
+        candidates = self.candidates(role)
+        untried = [backend for backend in candidates if backend.url not in exclude] or candidates
+        available = [backend for backend in untried if backend.available] or untried
+        # Fewest total requests breaks ties, spreading idle traffic evenly
+        return min(available, key=lambda backend: (backend.in_flight, backend.requests))
+
+    def has_alternative(self, role: str, exclude: Iterable[str]) -> bool:
+        return any(backend.available and backend.url not in exclude
+                   for backend in self.candidates(role))
+
+    @contextmanager
+    def track(self, backend: Backend):
+        backend.in_flight += 1
+        LLM_BACKEND_IN_FLIGHT.labels(backend=backend.url).inc()
+        try:
+            yield
+        finally:
+            backend.in_flight -= 1
+            LLM_BACKEND_IN_FLIGHT.labels(backend=backend.url).dec()
+
+    def record_success(self, backend: Backend, seconds: float) -> None:
+        backend.requests += 1
+        backend.consecutive_failures = 0
+        backend.avg_seconds = seconds if backend.requests == 1 else \
+            0.8 * backend.avg_seconds + 0.2 * seconds
+        LLM_BACKEND_DURATION.labels(backend=backend.url).observe(seconds)
+
+    def record_failure(self, backend: Backend, reason: str, eject: bool = True) -> None:
+        """Count a failed request; backend-side failures count towards ejection"""
+        backend.requests += 1
+        backend.errors += 1
+        LLM_BACKEND_ERRORS.labels(backend=backend.url, reason=reason).inc()
+        if not eject:
+            return
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= Settings.BACKEND_FAILURE_THRESHOLD:
+            self._eject(backend, f"{backend.consecutive_failures} consecutive failures ({reason})")
+
+    def _eject(self, backend: Backend, reason: str) -> None:
+        if backend.available:
+            self.ejections += 1
+            logger.warning(f"Ejecting LLM backend {backend.url} for "
+                           f"{Settings.BACKEND_EJECT_SECONDS:.0f}s: {reason}")
+        backend.ejected_until = time.monotonic() + Settings.BACKEND_EJECT_SECONDS
+        LLM_BACKEND_UP.labels(backend=backend.url).set(0)
+
+    def mark_health(self, url: str, healthy: bool, reason: str = "health check failed") -> None:
+        """Apply a health check result: failures eject, a pass brings the backend back"""
+        backend = self.backend(url)
+        if not healthy:
+            self._eject(backend, reason)
+        elif not backend.available or backend.consecutive_failures:
+            if not backend.available:
+                logger.info(f"LLM backend {url} passed its health check, back in rotation")
+            backend.ejected_until = 0.0
+            backend.consecutive_failures = 0
+            LLM_BACKEND_UP.labels(backend=url).set(1)
+
+    def stats(self) -> dict:
+        backends = {url: self.backend(url).stats() for url in self.assignments()}
+        return {
+            "backends": len(backends),
+            "available": sum(1 for backend in backends.values() if backend["available"]),
+            "in_flight": sum(backend["in_flight"] for backend in backends.values()),
+            "ejections": self.ejections,
+            "per_backend": backends,
+        }
+
+
+backend_pool = BackendPool()
@@ -0,0 +1,171 @@
+import json
+import time
+import asyncio
+import random
+import logging
+from typing import AsyncIterator, Optional
+import httpx
+from src.configs.config import Settings
+from src.logic.metrics import LLM_IN_FLIGHT, observe_llm_response
+from src.logic.llm_backends import backend_pool
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: overloaded or restarting Ollama / proxies
+TRANSIENT_STATUS_CODES = {429, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class LLMServiceError(Exception):
+    """Raised when the LLM service returns an error response"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"LLM service returned {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared async client with a keep-alive connection pool"""
+    global _client, _client_loop
+    # Pooled connections are bound to the event loop that opened them
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client_loop = loop
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                connect=Settings.LLM_CONNECT_TIMEOUT,
+                read=Settings.LLM_READ_TIMEOUT,
+                write=Settings.LLM_CONNECT_TIMEOUT,
+                pool=Settings.LLM_READ_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=Settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=Settings.LLM_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _is_retryable(error: httpx.TransportError) -> bool:
+    # A read timeout already cost LLM_READ_TIMEOUT; retrying would multiply the
+    # wait for a request the caller has most likely given up on
+    return not isinstance(error, httpx.ReadTimeout)
+
+
+async def _backoff(attempt: int, reason: str, role: str = None, tried: set = ()) -> None:
+    if backend_pool.has_alternative(role, tried):
+        # Another backend is up: fail over right away instead of waiting
+        logger.warning(
+            f"Transient LLM error ({reason}), retrying on another backend "
+            f"(attempt {attempt + 1}/{Settings.LLM_MAX_RETRIES})")
+        return
+    delay = Settings.LLM_RETRY_BACKOFF * (2 ** attempt)
+    delay += random.uniform(0, delay / 2)
+    logger.warning(
+        f"Transient LLM error ({reason}), retrying in {delay:.2f}s "
+        f"(attempt {attempt + 1}/{Settings.LLM_MAX_RETRIES})")
+    await asyncio.sleep(delay)
+
+
+async def chat(messages: list, model: Optional[str] = None, role: str = "default") -> dict:
+    """Send a non-streaming chat request to the least loaded Ollama backend"""
+    payload = {
+        "model": model or Settings.get_model(role),
+        "messages": messages,
+        "keep_alive": Settings.get_keep_alive(),
+        "stream": False
+    }
+    tried = set()
+
+    for attempt in range(Settings.LLM_MAX_RETRIES + 1):
+        is_last_attempt = attempt == Settings.LLM_MAX_RETRIES
+        backend = backend_pool.choose(role, exclude=tried)
+        request_start = time.perf_counter()
+        try:
+            with LLM_IN_FLIGHT.track_inprogress(), backend_pool.track(backend):
+                response = await get_client().post(f"{backend.url}/api/chat", json=payload)
+        except httpx.TransportError as e:
+            backend_pool.record_failure(backend, type(e).__name__)
+            if is_last_attempt or not _is_retryable(e):
+                raise
+            tried.add(backend.url)
+            await _backoff(attempt, type(e).__name__, role, tried)
+            continue
+
+        if response.status_code == 200:
+            backend_pool.record_success(backend, time.perf_counter() - request_start)
+            response_json = response.json()
+            observe_llm_response(role, response_json)
+            return response_json
+        is_transient = response.status_code in TRANSIENT_STATUS_CODES
+        backend_pool.record_failure(backend, f"http_{response.status_code}",
+                                    eject=is_transient or response.status_code >= 500)
+        if is_transient and not is_last_attempt:
+            tried.add(backend.url)
+            await _backoff(attempt, f"HTTP {response.status_code}", role, tried)
+            continue
+        raise LLMServiceError(response.status_code, response.text)
+
+
+async def stream_chat(messages: list, model: Optional[str] = None,
+                      role: str = "default") -> AsyncIterator[dict]:
+    """Send a streaming chat request to the least loaded Ollama backend and yield each NDJSON chunk"""
+    payload = {
+        "model": model or Settings.get_model(role),
+        "messages": messages,
+        "keep_alive": Settings.get_keep_alive(),
+        "stream": True
+    }
+    tried = set()
+
+    for attempt in range(Settings.LLM_MAX_RETRIES + 1):
+        is_last_attempt = attempt == Settings.LLM_MAX_RETRIES
+        started = False
+        backend = backend_pool.choose(role, exclude=tried)
+        request_start = time.perf_counter()
+        time_to_first_token = None
+        try:
+            with LLM_IN_FLIGHT.track_inprogress(), backend_pool.track(backend):
+                async with get_client().stream("POST", f"{backend.url}/api/chat", json=payload) as response:
+                    if response.status_code != 200:
+                        text = (await response.aread()).decode(errors="replace")
+                        is_transient = response.status_code in TRANSIENT_STATUS_CODES
+                        backend_pool.record_failure(
+                            backend, f"http_{response.status_code}",
+                            eject=is_transient or response.status_code >= 500)
+                        if is_transient and not is_last_attempt:
+                            tried.add(backend.url)
+                            await _backoff(attempt, f"HTTP {response.status_code}", role, tried)
+                            continue
+                        raise LLMServiceError(response.status_code, text)
+
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        started = True
+                        chunk = json.loads(line)
+                        if time_to_first_token is None and chunk.get("message", {}).get("content"):
+                            time_to_first_token = time.perf_counter() - request_start
+                        if chunk.get("done"):
+                            # Recorded before yielding: the consumer may stop at this chunk
+                            backend_pool.record_success(backend, time.perf_counter() - request_start)
+                            observe_llm_response(role, chunk, time_to_first_token)
+                        yield chunk
+                    return
+        except httpx.TransportError as e:
+            backend_pool.record_failure(backend, type(e).__name__)
+            # Retrying after tokens were forwarded would duplicate them
+            if started or is_last_attempt or not _is_retryable(e):
+                raise
+            tried.add(backend.url)
+            await _backoff(attempt, type(e).__name__, role, tried)
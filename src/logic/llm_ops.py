@@ -1,15 +1,30 @@
-import requests
-import json
-import pandas as pd
 import re
+import random
 import logging
+from typing import AsyncIterator, Optional, Tuple
+import httpx
 from src.configs.config import Settings
-from src.configs.prompts import get_code_generation_prompt, get_answer_generation_prompt
-from src.logic.excutions import get_file_path_by_id
+from src.configs.prompts import (get_code_generation_prompt, get_sql_generation_prompt,
+                                 get_session_turn_prompt)
+from src.logic.excutions import get_dataset_profile, get_exec_key
+from src.logic.code_cache import code_cache, schema_fingerprint
+from src.logic.result_store import result_store
+from src.logic.llm_client import chat, stream_chat, LLMServiceError
+from src.logic.llm_scheduler import llm_scheduler, LLMOverloadedError
+from src.logic.metrics import timed_span
+from src.logic.prompt_budget import answer_prompt_budget
 
 logger = logging.getLogger(__name__)
 
 
+def log_prompts(label: str, prompts: dict) -> None:
+    """Log full prompts at DEBUG level for a sampled fraction of requests"""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= Settings.PROMPT_LOG_SAMPLE_RATE:
+        return
+    logger.debug(f"=== {label} SYSTEM PROMPT ===\n{prompts['system']}")
+    logger.debug(f"=== {label} USER PROMPT ===\n{prompts['user']}")
+
+
 def extract_python_code_simple(text: str) -> str:
     """
     Simple extraction of Python code from ```python ``` blocks.
@@ -28,63 +43,81 @@ def extract_python_code_simple(text: str) -> str:
         return text.strip()
 
 
-async def generate_code(question: str, file_id: str) -> str:
-    """Generate pandas code based on the user's question"""
+def extract_sql_query(text: str) -> str:
+    """Extract a SQL query from a ```sql ``` block, dropping a trailing semicolon"""
+    match = re.search(r'```(?:sql)?\s*(.*?)\s*```', text, re.DOTALL | re.IGNORECASE)
+    if match:
+        query = match.group(1)
+    else:
+        logger.warning("No ```sql``` block found, returning original text")
+        query = text
+    return query.strip().rstrip(";").strip()
+
+
+async def generate_code(question: str, file_id: str, use_cache: bool = True,
+                        engine: str = "pandas") -> Tuple[str, str]:
+    """
+    Generate pandas code, or a SQL query for the sql engine, based on the user's question.
+
+    Returns the code and its code cache key. The code is only cached once it
+    ran, see pipeline.execute_and_cache.
+    """
     logger.info(
-        f"Generating code for question: '{question}' with file ID: {file_id}")
+        f"Generating {engine} code for question: '{question}' with file ID: {file_id}")
 
     try:
-        # Get file path from ID
-        file_path = get_file_path_by_id(file_id)
-
-        # Read first few rows to understand data structure
-        df = pd.read_csv(file_path)
-        sample_data = df.head().to_string()
-        columns = list(df.columns)
+        # The upload-time profile has everything the prompt needs
+        profile = await get_dataset_profile(file_id)
+        sample_data = profile["head"]
+        columns = [column["name"] for column in profile["columns"]]
 
         logger.info(
-            f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
-
-        prompts = get_code_generation_prompt(question, columns, sample_data)
-
-        # Log the complete prompt being sent
-        logger.info("=== SYSTEM PROMPT ===")
-        logger.info(prompts["system"])
-        logger.info("=== USER PROMPT ===")
-        logger.info(prompts["user"])
-        logger.info("=== END PROMPTS ===")
-
-        response = requests.post(
-            Settings.get_ollama_url(),
-            json={
-                "model": Settings.OLLAMA_MODEL,
-                "messages": [
+            f"Dataset profile loaded: {profile['rows']} rows, {len(columns)} columns")
+
+        # Same question against the same schema: reuse the code, skip the LLM
+        fingerprint = schema_fingerprint(profile)
+        if engine == "sql":
+            fingerprint = f"sql:{fingerprint}"
+        cache_key = code_cache.make_key(fingerprint, question)
+        if use_cache:
+            cached_code = code_cache.get(cache_key)
+            if cached_code is not None:
+                logger.info("Generated code cache hit, skipping LLM call")
+                return cached_code, cache_key
+
+        build_prompt = get_sql_generation_prompt if engine == "sql" else get_code_generation_prompt
+        with timed_span("prompt_build"):
+            prompts = build_prompt(question, columns, sample_data, profile)
+        log_prompts("CODE GENERATION", prompts)
+
+        async with llm_scheduler.slot():
+            with timed_span("llm_code_generation"):
+                response_json = await chat([
                     {"role": "system", "content": prompts["system"]},
                     {"role": "user", "content": prompts["user"]}
-                ],
-                "stream": False
-            }
-        )
-
-        if response.status_code == 200:
-            response_json = response.json()
-            raw_response = response_json["message"]["content"].strip()
+                ], role="code")
+        raw_response = response_json["message"]["content"].strip()
 
-            logger.info(
-                f"Raw LLM response (length): {len(raw_response)}, content: {raw_response[:100]}...")
+        logger.info(
+            f"Raw LLM response (length): {len(raw_response)}, content: {raw_response[:100]}...")
 
-            # Extract Python code from the response
-            generated_code = extract_python_code_simple(raw_response)
-            logger.info(
-                f"Code extracted successfully: {generated_code[:100]}...")
-            return generated_code
+        # Extract the Python code or SQL query from the response
+        if engine == "sql":
+            generated_code = extract_sql_query(raw_response)
         else:
-            error_msg = f"Failed to generate code: {response.text}"
-            logger.error(error_msg)
-            raise Exception(
-                f"Internal error: LLM service failed - {error_msg}")
+            generated_code = extract_python_code_simple(raw_response)
+        logger.info(
+            f"Code extracted successfully: {generated_code[:100]}...")
+        return generated_code, cache_key
 
-    except requests.exceptions.RequestException as e:
+    except LLMOverloadedError:
+        raise
+    except LLMServiceError as e:
+        error_msg = f"Failed to generate code: {e.text}"
+        logger.error(error_msg)
+        raise Exception(
+            f"Internal error: LLM service failed - {error_msg}")
+    except httpx.HTTPError as e:
         logger.error(f"Network error in code generation: {str(e)}")
         raise Exception(f"Internal error: Cannot connect to LLM service")
     except Exception as e:
@@ -94,50 +127,93 @@ async def generate_code(question: str, file_id: str) -> str:
         raise Exception(f"Internal error: Code generation failed - {str(e)}")
 
 
-async def generate_final_answer(question: str, code: str, result: str) -> str:
+async def generate_session_code(messages: list, variables: dict, question: str) -> tuple:
+    """
+    Generate pandas code for a session turn, continuing the session's conversation.
+
+    Returns the code and the turn's messages; the caller appends them to the
+    session so the next turn's prompt starts with this one.
+    """
+    logger.info(f"Generating session code for question: '{question}'")
+
+    try:
+        turn_messages = [{"role": "user", "content": get_session_turn_prompt(question, variables)}]
+        log_prompts("SESSION CODE GENERATION", {"system": messages[0]["content"],
+                                                "user": turn_messages[0]["content"]})
+
+        async with llm_scheduler.slot():
+            with timed_span("llm_code_generation"):
+                response_json = await chat(messages + turn_messages, role="code")
+        # Kept verbatim so the replayed turn matches what the model generated
+        raw_response = response_json["message"]["content"]
+        turn_messages.append({"role": "assistant", "content": raw_response})
+
+        generated_code = extract_python_code_simple(raw_response.strip())
+        return generated_code, turn_messages
+
+    except LLMOverloadedError:
+        raise
+    except LLMServiceError as e:
+        error_msg = f"Failed to generate code: {e.text}"
+        logger.error(error_msg)
+        raise Exception(
+            f"Internal error: LLM service failed - {error_msg}")
+    except httpx.HTTPError as e:
+        logger.error(f"Network error in session code generation: {str(e)}")
+        raise Exception(f"Internal error: Cannot connect to LLM service")
+    except Exception as e:
+        logger.error(f"Error in session code generation: {str(e)}")
+        raise Exception(f"Internal error: Code generation failed - {str(e)}")
+
+
+async def generate_final_answer(question: str, code: str, result: str,
+                                file_id: Optional[str] = None, engine: str = "pandas",
+                                sample: Optional[dict] = None) -> str:
     """Generate a natural language answer based on the question, code, and result"""
     logger.info("Generating final answer")
 
     try:
-        prompts = get_answer_generation_prompt(question, code, result)
-
-        # Log the complete prompt being sent for final answer
-        logger.info("=== FINAL ANSWER SYSTEM PROMPT ===")
-        logger.info(prompts["system"])
-        logger.info("=== FINAL ANSWER USER PROMPT ===")
-        logger.info(prompts["user"])
-        logger.info("=== END FINAL ANSWER PROMPTS ===")
-
-        response = requests.post(
-            Settings.get_ollama_url(),
-            json={
-                "model": Settings.OLLAMA_MODEL,
-                "messages": [
+        # With a file ID the answer can be memoized alongside the execution result
+        exec_key = get_exec_key(file_id, code, sample) if file_id else None
+        if exec_key:
+            memoized_answer = result_store.get_answer(exec_key, question)
+            if memoized_answer is not None:
+                logger.info("Final answer memoized, skipping LLM call")
+                return memoized_answer
+
+        with timed_span("prompt_build"):
+            prompts = answer_prompt_budget.build(
+                question, code, result, language="sql" if engine == "sql" else "python",
+                sample=sample)
+        log_prompts("FINAL ANSWER", prompts)
+
+        # Code was already generated and run for this request, so don't drop it now
+        async with llm_scheduler.slot(continuation=True):
+            with timed_span("llm_answer_generation"):
+                response_json = await chat([
                     {"role": "system", "content": prompts["system"]},
                     {"role": "user", "content": prompts["user"]}
-                ],
-                "stream": False
-            }
-        )
+                ], role="answer")
+        logger.info(f"LLM response received length: {len(response_json)}")
+        final_answer = response_json["message"]["content"].strip()
 
-        if response.status_code == 200:
-            response_json = response.json()
-            logger.info(f"LLM response received length: {len(response_json)}")
-            final_answer = response_json["message"]["content"].strip()
+        logger.info("Final answer generated successfully")
 
-            logger.info("Final answer generated successfully")
+        # Ensure we have a valid answer
+        if not final_answer:
+            final_answer = "Unable to generate a proper answer for your question."
+        elif exec_key:
+            result_store.put_answer(exec_key, question, final_answer)
 
-            # Ensure we have a valid answer
-            if not final_answer:
-                final_answer = "Unable to generate a proper answer for your question."
+        return final_answer
 
-            return final_answer
-        else:
-            error_msg = f"Failed to generate answer: {response.text}"
-            logger.error(error_msg)
-            raise Exception(f"Internal error: Answer generation failed")
-
-    except requests.exceptions.RequestException as e:
+    except LLMOverloadedError:
+        raise
+    except LLMServiceError as e:
+        error_msg = f"Failed to generate answer: {e.text}"
+        logger.error(error_msg)
+        raise Exception(f"Internal error: Answer generation failed")
+    except httpx.HTTPError as e:
         logger.error(f"Network error in answer generation: {str(e)}")
         raise Exception(f"Internal error: Cannot connect to LLM service")
     except Exception as e:
@@ -145,3 +221,52 @@ async def generate_final_answer(question: str, code: str, result: str) -> str:
             raise  # Re-raise internal errors as-is
         logger.error(f"Error in answer generation: {str(e)}")
         raise Exception(f"Internal error: Answer generation failed - {str(e)}")
+
+
+async def stream_final_answer(question: str, code: str, result: str,
+                              file_id: Optional[str] = None, engine: str = "pandas",
+                              sample: Optional[dict] = None) -> AsyncIterator[str]:
+    """Yield the natural language answer token by token as Ollama produces it"""
+    logger.info("Streaming final answer")
+
+    try:
+        exec_key = get_exec_key(file_id, code, sample) if file_id else None
+        if exec_key:
+            memoized_answer = result_store.get_answer(exec_key, question)
+            if memoized_answer is not None:
+                logger.info("Final answer memoized, skipping LLM call")
+                yield memoized_answer
+                return
+
+        with timed_span("prompt_build"):
+            prompts = answer_prompt_budget.build(
+                question, code, result, language="sql" if engine == "sql" else "python",
+                sample=sample)
+        log_prompts("FINAL ANSWER", prompts)
+        answer_parts = []
+
+        async with llm_scheduler.slot(continuation=True):
+            async for chunk in stream_chat([
+                {"role": "system", "content": prompts["system"]},
+                {"role": "user", "content": prompts["user"]}
+            ], role="answer"):
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    answer_parts.append(content)
+                    yield content
+                if chunk.get("done"):
+                    break
+
+        final_answer = "".join(answer_parts).strip()
+        if exec_key and final_answer:
+            result_store.put_answer(exec_key, question, final_answer)
+        logger.info("Final answer streamed successfully")
+
+    except LLMOverloadedError:
+        raise
+    except LLMServiceError as e:
+        logger.error(f"Failed to stream answer: {e.text}")
+        raise Exception(f"Internal error: Answer generation failed")
+    except httpx.HTTPError as e:
+        logger.error(f"Network error in answer streaming: {str(e)}")
+        raise Exception(f"Internal error: Cannot connect to LLM service")
@@ -0,0 +1,137 @@
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+import contextvars
+from contextlib import asynccontextmanager
+from src.configs.config import Settings
+from src.logic.metrics import LLM_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+LANE_PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Lane of the LLM calls made in the current request; batch pipelines switch it
+current_lane = contextvars.ContextVar("llm_lane", default="interactive")
+
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call can't be admitted in time; retry_after is in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """
+    Bounded, prioritized admission in front of Ollama.
+
+    At most `concurrency` generations run at once. Further calls wait in a
+    bounded queue ordered by lane; a call is rejected up front when the queue
+    is full or its estimated wait would overrun the lane's deadline.
+    """
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._waiters = []  # heap of (priority, seq, lane, future)
+        self._seq = itertools.count()
+        self.in_flight = 0
+        # Moving average of how long a generation holds its slot
+        self.avg_seconds = Settings.LLM_EXPECTED_SECONDS
+        self.admitted = 0
+        self.rejected = 0
+
+    def _queued(self, lane: str = None) -> int:
+        return sum(1 for _, _, waiter_lane, future in self._waiters
+                   if not future.done() and (lane is None or waiter_lane == lane))
+
+    def estimated_wait(self, priority: tuple) -> float:
+        """Seconds until a new call with this priority would get a slot"""
+        ahead = sum(1 for waiter_priority, _, _, future in self._waiters
+                    if not future.done() and waiter_priority <= priority)
+        busy = self.in_flight + ahead - self.concurrency + 1
+        if busy <= 0:
+            return 0.0
+        return math.ceil(busy / self.concurrency) * self.avg_seconds
+
+    def _reject(self, lane: str, reason: str, retry_after: float) -> None:
+        self.rejected += 1
+        retry_after = max(1, math.ceil(retry_after))
+        logger.warning(f"Rejecting {lane} LLM call: {reason}, retry after {retry_after}s")
+        raise LLMOverloadedError(
+            f"LLM is overloaded ({reason}), retry in {retry_after}s", retry_after)
+
+    async def _acquire(self, lane: str, priority: tuple, continuation: bool) -> None:
+        if self.in_flight < self.concurrency and not self._queued():
+            self.in_flight += 1
+            return
+
+        if not continuation:
+            wait = self.estimated_wait(priority)
+            if self._queued() >= self.max_queue:
+                self._reject(lane, "queue is full", wait)
+            deadline = Settings.LLM_LANE_DEADLINES[lane]
+            if wait + self.avg_seconds > deadline:
+                self._reject(lane, f"estimated wait {wait:.0f}s exceeds the {deadline:.0f}s deadline",
+                             wait + self.avg_seconds - deadline)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), lane, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the cancel landed: hand the slot on
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        while self._waiters:
+            _, _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+                break
+
+    @asynccontextmanager
+    async def slot(self, continuation: bool = False):
+        """
+        Hold an LLM slot for the duration of the block.
+
+        Continuations (the answer call of a request whose code was already
+        generated) skip rejection and go ahead of new calls in their lane, so
+        admitted requests finish instead of wasting the work done so far.
+        """
+        lane = current_lane.get()
+        priority = (LANE_PRIORITIES[lane], 0 if continuation else 1)
+
+        queued_at = time.perf_counter()
+        await self._acquire(lane, priority, continuation)
+        started_at = time.perf_counter()
+        LLM_QUEUE_WAIT.labels(lane=lane).observe(started_at - queued_at)
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.perf_counter() - started_at)
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queued_interactive": self._queued("interactive"),
+            "queued_batch": self._queued("batch"),
+            "avg_generation_seconds": round(self.avg_seconds, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+llm_scheduler = LLMScheduler(Settings.LLM_CONCURRENCY, Settings.LLM_QUEUE_MAX)
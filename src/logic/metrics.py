@@ -0,0 +1,96 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_DURATION = Histogram(
+    "askai_stage_duration_seconds", "Time spent in each request stage",
+    ["stage"], buckets=LATENCY_BUCKETS)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "askai_llm_time_to_first_token_seconds", "Time until the LLM produced its first token",
+    ["role"], buckets=LATENCY_BUCKETS)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "askai_llm_tokens_per_second", "LLM generation speed",
+    ["role"], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+LLM_QUEUE_WAIT = Histogram(
+    "askai_llm_queue_wait_seconds", "Time LLM calls waited for a scheduler slot",
+    ["lane"], buckets=LATENCY_BUCKETS)
+LLM_IN_FLIGHT = Gauge(
+    "askai_llm_requests_in_flight", "LLM requests currently waiting on Ollama")
+LLM_BACKEND_DURATION = Histogram(
+    "askai_llm_backend_request_seconds", "Duration of successful requests per Ollama backend",
+    ["backend"], buckets=LATENCY_BUCKETS)
+LLM_BACKEND_ERRORS = Counter(
+    "askai_llm_backend_errors_total", "Failed requests per Ollama backend",
+    ["backend", "reason"])
+LLM_BACKEND_IN_FLIGHT = Gauge(
+    "askai_llm_backend_in_flight", "Requests currently sent to each Ollama backend", ["backend"])
+LLM_BACKEND_UP = Gauge(
+    "askai_llm_backend_up", "1 while an Ollama backend is in rotation, 0 while ejected", ["backend"])
+
+# Stats keys that only ever grow are exported as counters, the rest as gauges
+COUNTER_KEYS = {"hits", "misses", "evictions", "answer_hits", "answer_misses",
+                "jobs", "timeouts", "crashes", "started", "coalesced",
+                "admitted", "rejected", "runs", "ttl_evictions", "quota_evictions",
+                "orphans_removed", "freed_bytes", "created", "turns", "ejections",
+                "prompts", "truncated", "truncated_chars", "submitted", "completed",
+                "failed", "respawn_failures"}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_DURATION.labels(stage=stage).observe(seconds)
+    logger.debug(f"Stage {stage} took {seconds:.4f}s")
+
+
+@contextmanager
+def timed_span(stage: str):
+    """Time a block and record it in the stage duration histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def observe_llm_response(role: str, response_json: dict,
+                         time_to_first_token: Optional[float] = None) -> None:
+    """Record TTFT and tokens/sec from Ollama's timing fields (durations in ns)"""
+    if time_to_first_token is None and "prompt_eval_duration" in response_json:
+        time_to_first_token = (response_json.get("load_duration", 0)
+                               + response_json["prompt_eval_duration"]) / 1e9
+    if time_to_first_token is not None:
+        LLM_TIME_TO_FIRST_TOKEN.labels(role=role).observe(time_to_first_token)
+
+    eval_count = response_json.get("eval_count")
+    eval_duration = response_json.get("eval_duration")
+    if eval_count and eval_duration:
+        LLM_TOKENS_PER_SECOND.labels(role=role).observe(eval_count / (eval_duration / 1e9))
+
+
+class StatsCollector:
+    """Exports the stats() dicts of caches and pools at scrape time"""
+
+    def __init__(self, sources: Dict[str, Callable[[], dict]]):
+        self.sources = sources
+
+    def describe(self):
+        # Without this the registry calls collect() at registration time
+        return []
+
+    def collect(self):
+        for source, get_stats in self.sources.items():
+            for key, value in get_stats().items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                name = f"askai_{source}_{key}"
+                description = f"{source} {key.replace('_', ' ')}"
+                if key in COUNTER_KEYS:
+                    yield CounterMetricFamily(name, description, value=value)
+                else:
+                    yield GaugeMetricFamily(name, description, value=value)
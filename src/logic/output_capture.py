@@ -0,0 +1,80 @@
+import io
+from collections import deque
+
+
+def _marker(dropped: int) -> str:
+    return f"\n... [{dropped:,} characters truncated] ...\n"
+
+
+def _join(head: str, tail: str, dropped: int) -> str:
+    """Head and tail cut back to whole lines around a truncation marker"""
+    if "\n" in head:
+        cut = head.rindex("\n")
+        dropped += len(head) - cut
+        head = head[:cut]
+    if "\n" in tail:
+        cut = tail.index("\n") + 1
+        dropped += cut
+        tail = tail[cut:]
+    return head + _marker(dropped) + tail
+
+
+def truncate_middle(text: str, max_chars: int) -> str:
+    """Keep the start and end of text within max_chars, marking what was dropped"""
+    if len(text) <= max_chars:
+        return text
+    keep = max(0, max_chars - len(_marker(len(text))))
+    head_chars = keep // 2
+    tail_chars = keep - head_chars
+    tail = text[len(text) - tail_chars:] if tail_chars else ""
+    return _join(text[:head_chars], tail, len(text) - head_chars - tail_chars)
+
+
+class BoundedOutput(io.TextIOBase):
+    """
+    stdout replacement that keeps the first and last max_chars / 2 characters.
+
+    Writes past the head only go to a tail buffer trimmed as it grows, so a
+    script printing a huge frame never holds more than the cap in memory.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.head_limit = max_chars // 2
+        self.tail_limit = max_chars - self.head_limit
+        self._head = []
+        self._head_size = 0
+        self._tail = deque()
+        self._tail_size = 0
+        self.total = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        written = len(text)
+        self.total += written
+        room = self.head_limit - self._head_size
+        if room > 0:
+            self._head.append(text[:room])
+            self._head_size += min(room, written)
+            text = text[room:]
+        if text:
+            self._tail.append(text)
+            self._tail_size += len(text)
+            # Drop whole chunks that no longer reach into the last tail_limit characters
+            while self._tail_size - len(self._tail[0]) >= self.tail_limit:
+                self._tail_size -= len(self._tail.popleft())
+        return written
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.head_limit + self.tail_limit
+
+    def getvalue(self) -> str:
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if not self.truncated:
+            return head + tail
+        tail = tail[len(tail) - self.tail_limit:] if self.tail_limit else ""
+        return _join(head, tail, self.total - len(head) - len(tail))
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import List, Optional
+from src.configs.config import Settings
+from src.logic.excutions import execute_generated, get_dataset_profile, get_sample, select_engine
+from src.logic.llm_ops import generate_code, generate_final_answer, generate_session_code
+from src.logic.metrics import timed_span
+from src.logic.code_cache import code_cache, normalize_question
+from src.logic.single_flight import answer_flights
+from src.logic.llm_scheduler import current_lane
+from src.logic.sessions import session_manager
+from src.logic.fast_path import query_planner, QueryPlan
+from src.logic.sampling import label_answer
+
+logger = logging.getLogger(__name__)
+
+
+async def run_answer_pipeline(question: str, file_id: str, use_cache: bool = True,
+                              engine: Optional[str] = None, approximate: bool = False) -> dict:
+    """
+    Answer a question, returning the answer, the path taken ("fast" or "llm")
+    and the sample fraction of approximate answers.
+
+    Simple aggregates are planned and answered without the LLM. Everything else
+    generates code, executes it and turns the output into a final answer; with
+    approximate set, the code runs on the file's ingest-time sample if it has one.
+    Identical questions on the same file that arrive while one is being answered
+    share that computation instead of starting their own.
+    """
+    engine = select_engine(file_id, engine)
+    key = (file_id, normalize_question(question), engine, use_cache, approximate)
+    return await answer_flights.run(
+        key, lambda: _answer(question, file_id, use_cache, engine, approximate))
+
+
+async def answer_with_plan(plan: QueryPlan, file_id: str, engine: str) -> str:
+    """Answer from a fast path plan, running its query only when the profile can't answer"""
+    if not plan.needs_execution:
+        return plan.format_answer()
+    result = await execute_generated(plan.render(engine), file_id, engine)
+    return plan.format_answer(str(result))
+
+
+async def execute_and_cache(code: str, code_key: str, file_id: str, engine: str,
+                            sample: Optional[dict] = None) -> str:
+    """Execute generated code, caching it for the schema only if it ran"""
+    try:
+        result = await execute_generated(code, file_id, engine, sample)
+    except Exception:
+        # Replayed from the cache, failing code would fail every same-schema question
+        code_cache.invalidate(code_key)
+        raise
+    code_cache.put(code_key, code)
+    return result
+
+
+async def _answer(question: str, file_id: str, use_cache: bool, engine: str,
+                  approximate: bool = False) -> dict:
+    # Deterministic plan for simple aggregates: no LLM round trips at all, and
+    # exact even when an approximate answer was asked for
+    plan = query_planner.plan(question, await get_dataset_profile(file_id))
+    if plan is not None:
+        with timed_span("fast_path"):
+            return {"answer": await answer_with_plan(plan, file_id, engine), "path": "fast",
+                    "sample_fraction": None}
+
+    # Small files have no sample and are always answered exactly
+    sample = get_sample(file_id) if approximate else None
+
+    # Generate pandas code (or SQL) using LLM
+    with timed_span("code_generation"):
+        generated_code, code_key = await generate_code(
+            question, file_id, use_cache=use_cache, engine=engine)
+
+    # Execute the generated code
+    with timed_span("execution"):
+        result = await execute_and_cache(generated_code, code_key, file_id, engine, sample)
+
+    # Generate final answer using LLM
+    with timed_span("answer_generation"):
+        answer = await generate_final_answer(
+            question, generated_code, str(result), file_id=file_id, engine=engine, sample=sample)
+    if sample:
+        return {"answer": label_answer(answer, sample), "path": "llm",
+                "sample_fraction": sample["fraction"]}
+    return {"answer": answer, "path": "llm", "sample_fraction": None}
+
+
+async def run_batch_pipeline(questions: List[str], file_id: str, use_cache: bool = True,
+                             max_concurrency: Optional[int] = None,
+                             engine: Optional[str] = None) -> List[object]:
+    """
+    Answer many questions about one dataset, returning outcomes or exceptions in order.
+
+    Up to max_concurrency questions are in flight at once, so LLM generation for
+    one question overlaps with code execution for another.
+    """
+    # Resolve the dataset once up front; a missing file fails the whole batch
+    await get_dataset_profile(file_id)
+    engine = select_engine(file_id, engine)
+
+    concurrency = min(max_concurrency or Settings.BATCH_CONCURRENCY, Settings.BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info(
+        f"Running batch of {len(questions)} questions for file ID: {file_id} "
+        f"with concurrency {concurrency}")
+
+    async def answer_one(question: str) -> str:
+        async with semaphore:
+            return await run_answer_pipeline(
+                question, file_id, use_cache=use_cache, engine=engine)
+
+    # LLM calls of the batch yield to interactive requests
+    lane_token = current_lane.set("batch")
+    try:
+        return await asyncio.gather(
+            *[answer_one(question) for question in questions], return_exceptions=True)
+    finally:
+        current_lane.reset(lane_token)
+
+
+async def run_session_pipeline(session_id: str, question: str) -> dict:
+    """
+    Answer a follow-up question in an analysis session.
+
+    The code runs next to the variables earlier turns left behind, and the turn
+    is appended to the session's conversation only once its code ran.
+    """
+    session = session_manager.get(session_id)
+    # One question at a time: each script builds on the state left by the last
+    async with session.lock:
+        with timed_span("code_generation"):
+            generated_code, turn_messages = await generate_session_code(
+                session.messages, session.variables, question)
+
+        with timed_span("execution"):
+            result = await session_manager.run_code(session, generated_code)
+        session.record_turn(turn_messages)
+
+        # Not memoized by file: the output depends on the session's state
+        with timed_span("answer_generation"):
+            answer = await generate_final_answer(question, generated_code, result)
+
+    return {"answer": answer, "code": generated_code, "variables": session.variables}
@@ -0,0 +1,97 @@
+import os
+import json
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from src.configs.config import Settings
+from src.logic.ingest import read_dataframe
+
+logger = logging.getLogger(__name__)
+
+
+def get_profile_path(file_id: str) -> str:
+    return os.path.join(Settings.ASSETS_DIR, "profiles", f"{file_id}.json")
+
+
+def _to_json_value(value):
+    """Convert numpy/pandas scalars into JSON-friendly Python values"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return float(value)
+    if isinstance(value, (np.bool_, bool)):
+        return bool(value)
+    if isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+
+def _profile_column(series: pd.Series) -> dict:
+    non_null = series.dropna()
+    column = {
+        "name": str(series.name),
+        "dtype": str(series.dtype),
+        "null_count": int(series.isna().sum()),
+        "unique_count": int(non_null.nunique()),
+        "min": None,
+        "max": None,
+        "top_values": [],
+    }
+
+    # min/max only where ordering is meaningful (numbers, dates)
+    if len(non_null) and (pd.api.types.is_numeric_dtype(series)
+                          or pd.api.types.is_datetime64_any_dtype(series)) \
+            and not pd.api.types.is_bool_dtype(series):
+        column["min"] = _to_json_value(non_null.min())
+        column["max"] = _to_json_value(non_null.max())
+
+    counts = non_null.value_counts().head(Settings.PROFILE_TOP_VALUES)
+    column["top_values"] = [
+        {"value": _to_json_value(value), "count": int(count)}
+        for value, count in counts.items()
+    ]
+    return column
+
+
+def build_profile(df: pd.DataFrame) -> dict:
+    """Summarize a DataFrame: per-column stats plus head and a random sample"""
+    sample = df.sample(n=min(len(df), Settings.PROFILE_SAMPLE_ROWS), random_state=0)
+    return {
+        "rows": int(len(df)),
+        "columns": [_profile_column(df[name]) for name in df.columns],
+        "head": df.head().to_string(),
+        "sample": [
+            {str(key): _to_json_value(value) for key, value in row.items()}
+            for row in sample.to_dict(orient="records")
+        ],
+    }
+
+
+def profile_file(file_id: str, data_path: str) -> dict:
+    """Profile a stored dataset once and save the profile next to it"""
+    return save_profile(file_id, read_dataframe(data_path))
+
+
+def save_profile(file_id: str, df: pd.DataFrame) -> dict:
+    """Profile an already loaded dataset and save the profile"""
+    profile = build_profile(df)
+
+    profile_path = get_profile_path(file_id)
+    os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+    tmp_path = f"{profile_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, profile_path)
+
+    logger.info(f"Profile saved for file ID: {file_id}")
+    return profile
+
+
+@lru_cache(maxsize=1024)
+def read_profile(file_id: str) -> dict:
+    """Read a saved profile; raises FileNotFoundError if it was never built"""
+    with open(get_profile_path(file_id)) as f:
+        return json.load(f)
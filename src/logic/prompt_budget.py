@@ -0,0 +1,64 @@
+import math
+import logging
+from src.configs.config import Settings
+from src.configs.prompts import get_answer_generation_prompt
+from src.logic.output_capture import truncate_middle
+
+logger = logging.getLogger(__name__)
+
+# Share of the available room the code may always claim, however long the output
+CODE_MIN_SHARE = 0.25
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / Settings.PROMPT_CHARS_PER_TOKEN)
+
+
+class AnswerPromptBudget:
+    """
+    Sizes the final-answer prompt to the model's context window.
+
+    The room left after the fixed template, the question and
+    ANSWER_RESERVED_TOKENS for the answer goes to the script output first,
+    which carries the findings; the code keeps at least CODE_MIN_SHARE of it.
+    Sections over their share keep their start and end. Smaller prompts also
+    cut prefill time, the bulk of the answer call for large outputs.
+    """
+
+    def __init__(self):
+        self.prompts = 0
+        self.truncated = 0
+        self.truncated_chars = 0
+
+    def available_tokens(self, question: str, language: str, sample: dict = None) -> int:
+        template = get_answer_generation_prompt(question, "", "", language=language, sample=sample)
+        used = estimate_tokens(template["system"]) + estimate_tokens(template["user"])
+        return max(0, Settings.LLM_CONTEXT_TOKENS - Settings.ANSWER_RESERVED_TOKENS - used)
+
+    def build(self, question: str, code: str, result: str, language: str = "python",
+              sample: dict = None) -> dict:
+        """The answer prompt with code and result cut to fit the budget"""
+        self.prompts += 1
+        room = int(self.available_tokens(question, language, sample) * Settings.PROMPT_CHARS_PER_TOKEN)
+        if len(code) + len(result) > room:
+            code_chars = min(len(code), max(int(room * CODE_MIN_SHARE), room - len(result)))
+            result_chars = room - code_chars
+            removed = max(0, len(code) - code_chars) + max(0, len(result) - result_chars)
+            code = truncate_middle(code, code_chars)
+            result = truncate_middle(result, result_chars)
+            self.truncated += 1
+            self.truncated_chars += removed
+            logger.info(f"Answer prompt cut by {removed} characters to fit "
+                        f"{Settings.LLM_CONTEXT_TOKENS} context tokens")
+        return get_answer_generation_prompt(question, code, result, language=language, sample=sample)
+
+    def stats(self) -> dict:
+        return {
+            "prompts": self.prompts,
+            "truncated": self.truncated,
+            "truncated_chars": self.truncated_chars,
+            "context_tokens": Settings.LLM_CONTEXT_TOKENS,
+        }
+
+
+answer_prompt_budget = AnswerPromptBudget()
@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+import httpx
+from src.configs.config import Settings
+from src.logic.llm_client import get_client
+from src.logic.exec_pool import execution_pool
+from src.logic.llm_backends import backend_pool, ROLES
+from src.logic.registry import file_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _preload_libraries() -> None:
+    """Import the data libraries that the boot path leaves out"""
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import pyarrow.csv  # noqa: F401
+    import pyarrow.feather  # noqa: F401
+    import duckdb  # noqa: F401
+
+
+def _model_names(models: list) -> set:
+    return {name for model in models for name in (model.get("name"), model.get("model")) if name}
+
+
+class ReadinessProbe:
+    """
+    Background warm-up and monitoring of everything a question depends on.
+
+    Polls every Ollama backend with exponential backoff until one answers, checks
+    the models of its roles are pulled and loads them pinned in memory
+    (keep_alive) so the first question doesn't pay for a cold model load.
+    Results feed the backend pool: failing backends are ejected, passing ones
+    return to rotation. Execution workers and data libraries warm up alongside,
+    off the startup path, and the file registry is synced with the uploads on
+    disk.
+    """
+
+    def __init__(self):
+        self.ollama_reachable = False
+        self.model_available = False
+        self.model_loaded = False
+        self.workers_ready = False
+        self.libraries_ready = False
+        self.registry_ready = False
+        # Set once the registry lists every upload on disk
+        self.registry_rebuilt = asyncio.Event()
+        # Last check result per backend URL
+        self.backends = {}
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.warmed_at: Optional[float] = None
+        self._tasks = []
+
+    @property
+    def ready(self) -> bool:
+        return (self.model_loaded and self.workers_ready and self.libraries_ready
+                and self.registry_ready)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._rebuild_registry()),
+            asyncio.create_task(self._probe_ollama()),
+            asyncio.create_task(self._warm_workers()),
+            asyncio.create_task(self._warm_libraries()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _rebuild_registry(self) -> None:
+        # Hashes uploads missing from the registry, which takes a while for large ones
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(file_registry.rebuild_from_disk)
+        except Exception as e:
+            logger.error(f"File registry rebuild failed: {str(e)}")
+            self.last_error = f"File registry rebuild failed: {str(e)}"
+            return
+        self.registry_ready = True
+        self.registry_rebuilt.set()
+        logger.info(f"File registry rebuilt in {time.perf_counter() - started:.2f}s")
+
+    async def _warm_workers(self) -> None:
+        try:
+            await execution_pool.start()
+            self.workers_ready = True
+        except Exception as e:
+            logger.error(f"Execution workers failed to start: {str(e)}")
+            self.last_error = f"Execution workers failed to start: {str(e)}"
+
+    async def _warm_libraries(self) -> None:
+        started = time.perf_counter()
+        await asyncio.to_thread(_preload_libraries)
+        self.libraries_ready = True
+        logger.info(f"Data libraries loaded in {time.perf_counter() - started:.2f}s")
+
+    async def _probe_ollama(self) -> None:
+        delay = Settings.READINESS_INITIAL_BACKOFF
+        while True:
+            try:
+                await self._check_ollama()
+                delay = Settings.READINESS_INITIAL_BACKOFF
+                wait = Settings.READINESS_INTERVAL_SECONDS
+            except httpx.HTTPError as e:
+                if self.ollama_reachable or self.checked_at is None:
+                    logger.warning(f"Ollama is not reachable: {str(e) or type(e).__name__}")
+                self.ollama_reachable = False
+                self.model_loaded = False
+                self.last_error = f"Ollama is not reachable: {str(e) or type(e).__name__}"
+                wait = delay
+                delay = min(delay * 2, Settings.READINESS_MAX_BACKOFF)
+            self.checked_at = time.time()
+            await asyncio.sleep(wait)
+
+    async def _check_ollama(self) -> None:
+        """Check every backend; ready once each role has a backend with its model loaded"""
+        assignments = backend_pool.assignments()
+        results = await asyncio.gather(
+            *[self._check_backend(url, models) for url, models in assignments.items()],
+            return_exceptions=True)
+
+        errors = []
+        for url, result in zip(assignments, results):
+            if isinstance(result, Exception):
+                reason = str(result) or type(result).__name__
+                backend_pool.mark_health(url, False, reason)
+                self.backends[url] = {"reachable": False, "models_available": False,
+                                      "models_loaded": False, "error": reason}
+                errors.append(f"{url}: {reason}")
+            else:
+                # A backend without its models would fail every call routed to it
+                backend_pool.mark_health(url, result["models_available"], result["error"] or "")
+                self.backends[url] = result
+                if result["error"]:
+                    errors.append(f"{url}: {result['error']}")
+
+        if not any(backend["reachable"] for backend in self.backends.values()):
+            raise httpx.ConnectError("; ".join(errors))
+        if not self.ollama_reachable:
+            logger.info("✅ Ollama is running!")
+        self.ollama_reachable = True
+
+        def role_served(flag: str) -> bool:
+            return all(any(self.backends.get(url, {}).get(flag) for url in Settings.get_backend_urls(role))
+                       for role in ROLES)
+
+        self.model_available = role_served("models_available")
+        self.model_loaded = role_served("models_loaded")
+        self.last_error = "; ".join(errors) or None
+        if errors:
+            logger.warning(f"LLM backend problems: {self.last_error}")
+
+    async def _check_backend(self, url: str, models: set) -> dict:
+        """Check one Ollama instance and load the models it serves into memory"""
+        client = get_client()
+        probe_timeout = Settings.LLM_CONNECT_TIMEOUT
+
+        response = await client.get(f"{url}/api/tags", timeout=probe_timeout)
+        response.raise_for_status()
+        available = _model_names(response.json().get("models", []))
+        missing = {model for model in models if not {model, f"{model}:latest"} & available}
+        if missing:
+            return {"reachable": True, "models_available": False, "models_loaded": False,
+                    "error": f"models {sorted(missing)} are not available, pull them first"}
+
+        # Re-warm if Ollama was restarted or evicted a model
+        response = await client.get(f"{url}/api/ps", timeout=probe_timeout)
+        loaded = _model_names(response.json().get("models", [])) if response.status_code == 200 else set()
+        for model in sorted(models):
+            if {model, f"{model}:latest"} & loaded:
+                continue
+            logger.info(f"Loading model {model} into memory on {url}")
+            started = time.perf_counter()
+            # A generate request without a prompt only loads the model
+            response = await client.post(
+                f"{url}/api/generate", json={"model": model, "keep_alive": Settings.get_keep_alive()})
+            response.raise_for_status()
+            self.warmed_at = time.time()
+            logger.info(f"Model {model} loaded on {url} in {time.perf_counter() - started:.2f}s")
+        return {"reachable": True, "models_available": True, "models_loaded": True, "error": None}
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "ollama_reachable": self.ollama_reachable,
+            "models": {role: Settings.get_model(role) for role in ROLES},
+            "model_available": self.model_available,
+            "model_loaded": self.model_loaded,
+            "backends": self.backends,
+            "workers_ready": self.workers_ready,
+            "libraries_ready": self.libraries_ready,
+            "registry_ready": self.registry_ready,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+            "warmed_at": self.warmed_at,
+        }
+
+
+readiness_probe = ReadinessProbe()
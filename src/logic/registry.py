@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+from src.configs.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Only refresh last_access_at when it is older than this, so hot lookups
+# don't turn every read into a write
+TOUCH_INTERVAL_SECONDS = 60
+
+FILE_ID_PATTERN = re.compile(r"^([0-9a-f]{16})(\.[^.]+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    columnar_path TEXT,
+    schema TEXT,
+    created_at REAL NOT NULL,
+    last_access_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files (content_hash);
+"""
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file, read in upload-sized chunks"""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(Settings.UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class FileRegistry:
+    """Persistent SQLite index of uploaded files keyed by file ID"""
+
+    def __init__(self):
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(Settings.ASSETS_DIR, exist_ok=True)
+            self._conn = sqlite3.connect(
+                os.path.join(Settings.ASSETS_DIR, "registry.sqlite3"),
+                check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> dict:
+        record = dict(row)
+        record["schema"] = json.loads(record["schema"]) if record["schema"] else None
+        return record
+
+    def _fetch_one(self, query: str, params: tuple) -> Optional[dict]:
+        with self._lock:
+            row = self._connection().execute(query, params).fetchone()
+        return self._to_record(row) if row is not None else None
+
+    def register(self, file_id: str, path: str, file_format: str, size: int,
+                 content_hash: str, created_at: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (file_id, path, format, size, content_hash, "
+                "created_at, last_access_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_id, path, file_format, size, content_hash, created_at or now, now))
+
+    def set_columnar(self, file_id: str, columnar_path: str, schema: list) -> None:
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "UPDATE files SET columnar_path = ?, schema = ? WHERE file_id = ?",
+                (columnar_path, json.dumps(schema), file_id))
+
+    def get(self, file_id: str) -> Optional[dict]:
+        return self._fetch_one("SELECT * FROM files WHERE file_id = ?", (file_id,))
+
+    def find_by_hash(self, content_hash: str) -> Optional[dict]:
+        return self._fetch_one(
+            "SELECT * FROM files WHERE content_hash = ? ORDER BY created_at LIMIT 1",
+            (content_hash,))
+
+    def most_recent(self, limit: int) -> list:
+        """Records of the most recently accessed files"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM files ORDER BY last_access_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def least_recently_used(self) -> list:
+        """All records, least recently accessed first"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM files ORDER BY last_access_at ASC").fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def touch(self, file_id: str) -> None:
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "UPDATE files SET last_access_at = ? WHERE file_id = ? AND last_access_at < ?",
+                (now, file_id, now - TOUCH_INTERVAL_SECONDS))
+
+    def delete(self, file_id: str) -> None:
+        with self._lock, self._connection() as conn:
+            conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+    def rebuild_from_disk(self) -> None:
+        """Sync the registry with the uploads present in the assets directory"""
+        from src.logic.ingest import get_columnar_path, get_columnar_schema
+
+        if not os.path.isdir(Settings.ASSETS_DIR):
+            return
+
+        with self._lock:
+            rows = self._connection().execute("SELECT file_id, path FROM files").fetchall()
+        known = {row["file_id"]: row["path"] for row in rows}
+
+        # Drop entries whose upload disappeared
+        for file_id, path in known.items():
+            if not os.path.exists(path):
+                logger.info(f"Removing stale registry entry for file ID: {file_id}")
+                self.delete(file_id)
+
+        added = 0
+        for filename in os.listdir(Settings.ASSETS_DIR):
+            match = FILE_ID_PATTERN.match(filename)
+            if not match or match.group(1) in known:
+                continue
+            file_id, extension = match.groups()
+            path = os.path.join(Settings.ASSETS_DIR, filename)
+            stat = os.stat(path)
+            self.register(file_id, path, extension.lstrip(".").lower(), stat.st_size,
+                          hash_file(path), created_at=stat.st_mtime)
+            columnar_path = get_columnar_path(file_id)
+            if os.path.exists(columnar_path):
+                self.set_columnar(file_id, columnar_path,
+                                  get_columnar_schema(columnar_path))
+            added += 1
+
+        logger.info(
+            f"File registry rebuilt: {len(known)} known, {added} added from disk")
+
+
+file_registry = FileRegistry()
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+from src.configs.config import Settings
+from src.logic.code_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    exec_key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    source_size INTEGER NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    output TEXT NOT NULL,
+    plots TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_executions_content_hash ON executions (content_hash);
+CREATE TABLE IF NOT EXISTS answers (
+    exec_key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (exec_key, question)
+);
+"""
+
+
+def normalize_code(code: str) -> str:
+    """Drop trailing whitespace and blank lines so cosmetic differences share a key"""
+    return "\n".join(line.rstrip() for line in code.strip().splitlines() if line.strip())
+
+
+def make_exec_key(content_hash: str, code: str) -> str:
+    code_hash = hashlib.sha256(normalize_code(code).encode()).hexdigest()
+    return hashlib.sha256(f"{content_hash}\n{code_hash}".encode()).hexdigest()
+
+
+def get_results_dir(exec_key: str) -> str:
+    return os.path.join(Settings.ASSETS_DIR, "results", exec_key)
+
+
+class ResultStore:
+    """Memoizes execution output, plots and final answers per (dataset content, code)"""
+
+    def __init__(self):
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.answer_hits = 0
+        self.answer_misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(Settings.ASSETS_DIR, exist_ok=True)
+            self._conn = sqlite3.connect(
+                os.path.join(Settings.ASSETS_DIR, "results.sqlite3"),
+                check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get_execution(self, exec_key: str, source_path: str, plots_dir: str) -> Optional[str]:
+        """Return memoized output for exec_key, restoring its plots into plots_dir"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT * FROM executions WHERE exec_key = ?", (exec_key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        # The dataset was replaced in place: everything stored for its hash is stale
+        stat = os.stat(source_path)
+        if (stat.st_size, stat.st_mtime_ns) != (row["source_size"], row["source_mtime_ns"]):
+            logger.info(f"Dataset changed on disk, invalidating results for {row['content_hash']}")
+            self.invalidate(row["content_hash"])
+            self.misses += 1
+            return None
+
+        # Plots removed from disk can't be restored: run the code again instead
+        results_dir = get_results_dir(exec_key)
+        plot_names = json.loads(row["plots"])
+        if not all(os.path.exists(os.path.join(results_dir, name)) for name in plot_names):
+            logger.info(f"Memoized plots missing for {exec_key}, dropping the result")
+            self._delete(exec_key)
+            self.misses += 1
+            return None
+
+        os.makedirs(plots_dir, exist_ok=True)
+        for plot_name in plot_names:
+            target = os.path.join(plots_dir, plot_name)
+            if not os.path.exists(target):
+                shutil.copy2(os.path.join(results_dir, plot_name), target)
+
+        self.hits += 1
+        return row["output"]
+
+    def put_execution(self, exec_key: str, content_hash: str, source_path: str,
+                      output: str, plots_dir: str, plot_names: list) -> None:
+        results_dir = get_results_dir(exec_key)
+        if plot_names:
+            os.makedirs(results_dir, exist_ok=True)
+            for plot_name in plot_names:
+                shutil.copy2(os.path.join(plots_dir, plot_name),
+                             os.path.join(results_dir, plot_name))
+
+        stat = os.stat(source_path)
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO executions (exec_key, content_hash, source_size, "
+                "source_mtime_ns, output, plots, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (exec_key, content_hash, stat.st_size, stat.st_mtime_ns, output,
+                 json.dumps(plot_names), time.time()))
+
+    def get_answer(self, exec_key: str, question: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT answer FROM answers WHERE exec_key = ? AND question = ?",
+                (exec_key, normalize_question(question))).fetchone()
+        if row is None:
+            self.answer_misses += 1
+            return None
+        self.answer_hits += 1
+        return row["answer"]
+
+    def put_answer(self, exec_key: str, question: str, answer: str) -> None:
+        with self._lock, self._connection() as conn:
+            # Only answers for a memoized execution can be looked up again
+            if conn.execute("SELECT 1 FROM executions WHERE exec_key = ?",
+                            (exec_key,)).fetchone() is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (exec_key, question, answer, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (exec_key, normalize_question(question), answer, time.time()))
+
+    def invalidate(self, content_hash: str) -> None:
+        """Drop every memoized result computed from a dataset"""
+        with self._lock, self._connection() as conn:
+            exec_keys = [row["exec_key"] for row in conn.execute(
+                "SELECT exec_key FROM executions WHERE content_hash = ?", (content_hash,))]
+            conn.executemany("DELETE FROM answers WHERE exec_key = ?",
+                             [(key,) for key in exec_keys])
+            conn.execute("DELETE FROM executions WHERE content_hash = ?", (content_hash,))
+        for exec_key in exec_keys:
+            shutil.rmtree(get_results_dir(exec_key), ignore_errors=True)
+        if exec_keys:
+            logger.info(f"Invalidated {len(exec_keys)} memoized results for {content_hash}")
+
+    def _delete(self, exec_key: str) -> None:
+        with self._lock, self._connection() as conn:
+            conn.execute("DELETE FROM answers WHERE exec_key = ?", (exec_key,))
+            conn.execute("DELETE FROM executions WHERE exec_key = ?", (exec_key,))
+        shutil.rmtree(get_results_dir(exec_key), ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection().execute(
+                "SELECT COUNT(*) FROM executions").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "answer_hits": self.answer_hits,
+            "answer_misses": self.answer_misses,
+            "entries": entries,
+        }
+
+
+result_store = ResultStore()
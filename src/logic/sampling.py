@@ -0,0 +1,80 @@
+import os
+import logging
+from typing import Optional
+from src.configs.config import Settings
+
+# numpy and pyarrow are imported where used; answer labelling is on the boot path
+
+logger = logging.getLogger(__name__)
+
+
+def get_samples_dir() -> str:
+    return os.path.join(Settings.ASSETS_DIR, "samples")
+
+
+def get_sample_path(file_id: str) -> str:
+    return os.path.join(get_samples_dir(), f"{file_id}.feather")
+
+
+def write_sample(file_id: str, data_path: str) -> Optional[dict]:
+    """Sample a stored dataset, see sample_table"""
+    import pyarrow.feather as feather
+    from src.logic.ingest import COLUMNAR_EXTENSION, read_csv_table, optimize_table
+
+    if data_path.endswith(COLUMNAR_EXTENSION):
+        table = feather.read_table(data_path, memory_map=True)
+    else:
+        table = optimize_table(read_csv_table(data_path))
+    return sample_table(file_id, table)
+
+
+def sample_table(file_id: str, table) -> Optional[dict]:
+    """
+    Store a uniform random sample of APPROX_SAMPLE_ROWS rows for approximate answers.
+
+    Rows keep their original order and the sample is seeded, so the same upload
+    always gets the same sample and memoized sample results stay valid. Returns
+    None when the dataset isn't larger than the sample.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if table.num_rows <= Settings.APPROX_SAMPLE_ROWS:
+        return None
+
+    rng = np.random.default_rng(0)
+    indices = np.sort(rng.choice(table.num_rows, Settings.APPROX_SAMPLE_ROWS, replace=False))
+    sample = table.take(pa.array(indices)).replace_schema_metadata(
+        {"source_rows": str(table.num_rows)})
+
+    os.makedirs(get_samples_dir(), exist_ok=True)
+    sample_path = get_sample_path(file_id)
+    tmp_path = f"{sample_path}.tmp"
+    feather.write_feather(sample, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, sample_path)
+
+    logger.info(f"Sample written for file ID: {file_id} "
+                f"({sample.num_rows} of {table.num_rows} rows)")
+    return read_sample(file_id)
+
+
+def read_sample(file_id: str) -> Optional[dict]:
+    """Path, size and fraction of a file's sample, from its footer; None without one"""
+    import pyarrow as pa
+
+    sample_path = get_sample_path(file_id)
+    if not os.path.exists(sample_path):
+        return None
+    with pa.memory_map(sample_path) as source:
+        reader = pa.ipc.open_file(source)
+        rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        source_rows = int(reader.schema.metadata[b"source_rows"])
+    return {"path": sample_path, "rows": rows, "source_rows": source_rows,
+            "fraction": rows / source_rows}
+
+
+def label_answer(answer: str, sample: dict) -> str:
+    """Mark an answer as computed on a sample"""
+    return (f"{answer}\n\n_Approximate: computed on a {sample['fraction']:.2%} random sample "
+            f"({sample['rows']:,} of {sample['source_rows']:,} rows)._")
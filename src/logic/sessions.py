@@ -0,0 +1,197 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import Dict, Optional
+from src.configs.config import Settings
+from src.configs.prompts import get_session_system_prompt
+from src.logic.excutions import get_file_record, get_data_path_by_id, get_dataset_profile, get_plots_dir
+from src.logic.exec_pool import execution_pool, ExecutionTimeoutError
+from src.logic.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+class SessionNotFoundError(Exception):
+    """Raised for an unknown, closed or evicted session ID"""
+
+
+class AnalysisSession:
+    """A dataset kept loaded in a dedicated worker, with the conversation so far"""
+
+    def __init__(self, session_id: str, file_id: str, worker, system_prompt: str):
+        self.session_id = session_id
+        self.file_id = file_id
+        self.worker = worker
+        # Only ever appended to (or trimmed from the front), so each turn's prompt
+        # starts with the previous one
+        self.messages = [{"role": "system", "content": system_prompt}]
+        self.variables: Dict[str, str] = {}
+        self.lock = asyncio.Lock()
+        self.turns = 0
+        self.last_used_at = time.time()
+
+    def record_turn(self, turn_messages: list) -> None:
+        self.messages.extend(turn_messages)
+        self.turns += 1
+        # Dropping the oldest question/code pair invalidates the cached prefix
+        # once, instead of growing the prompt without bound
+        while len(self.messages) > 1 + 2 * Settings.SESSION_MAX_TURNS:
+            del self.messages[1:3]
+
+
+class SessionManager:
+    """
+    Analysis sessions with their DataFrame and variables kept warm between questions.
+
+    Each session runs its scripts in its own worker process whose namespace
+    persists, so follow-ups reuse intermediate results instead of recomputing
+    them. Sessions idle for SESSION_IDLE_SECONDS are closed, and least recently
+    used idle sessions are evicted when their workers together use more than
+    SESSION_MEMORY_BUDGET_BYTES.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, AnalysisSession] = {}
+        self._task = None
+        self.created = 0
+        self.evictions = 0
+        self.turns = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._expire_idle())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for session_id in list(self._sessions):
+            await self.close(session_id)
+
+    async def _expire_idle(self) -> None:
+        while True:
+            await asyncio.sleep(min(60, Settings.SESSION_IDLE_SECONDS))
+            now = time.time()
+            expired = [session.session_id for session in self._sessions.values()
+                       if not session.lock.locked()
+                       and now - session.last_used_at > Settings.SESSION_IDLE_SECONDS]
+            for session_id in expired:
+                logger.info(f"Closing idle session: {session_id}")
+                try:
+                    await self.close(session_id)
+                    self.evictions += 1
+                except SessionNotFoundError:
+                    pass
+
+    async def create(self, file_id: str) -> AnalysisSession:
+        """Start a session with the file loaded in a new worker"""
+        get_file_record(file_id)  # FileNotFoundError for unknown IDs
+        profile = await get_dataset_profile(file_id)
+        columns = [column["name"] for column in profile["columns"]]
+        system_prompt = get_session_system_prompt(columns, profile["head"], profile)
+
+        await self._make_room(Settings.SESSION_MAX - 1)
+        started = time.perf_counter()
+        worker = await asyncio.to_thread(
+            execution_pool.spawn_dedicated, file_id, get_data_path_by_id(file_id))
+        observe_stage("session_start", time.perf_counter() - started)
+
+        session_id = uuid.uuid4().hex[:16]
+        session = AnalysisSession(session_id, file_id, worker, system_prompt)
+        self._sessions[session_id] = session
+        self.created += 1
+        logger.info(f"Session {session_id} started for file ID: {file_id}")
+        await self._make_room(Settings.SESSION_MAX, keep=session)
+        return session
+
+    def get(self, session_id: str) -> AnalysisSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(f"Session {session_id} not found")
+        return session
+
+    async def close(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise SessionNotFoundError(f"Session {session_id} not found")
+        await asyncio.to_thread(session.worker.kill)
+        logger.info(f"Session {session_id} closed")
+
+    def _memory_bytes(self) -> int:
+        return sum(session.worker.private_memory_bytes() for session in self._sessions.values())
+
+    async def _make_room(self, max_sessions: int, keep: Optional[AnalysisSession] = None) -> None:
+        """Evict least recently used idle sessions down to the count and memory budget"""
+        while True:
+            over_count = len(self._sessions) > max_sessions
+            if not over_count and self._memory_bytes() <= Settings.SESSION_MEMORY_BUDGET_BYTES:
+                return
+            idle = [session for session in self._sessions.values()
+                    if session is not keep and not session.lock.locked()]
+            if not idle:
+                if over_count:
+                    raise Exception("Internal error: Too many active sessions, try again later")
+                return
+            victim = min(idle, key=lambda session: session.last_used_at)
+            logger.info(f"Evicting session {victim.session_id} to stay within the session budget")
+            self.evictions += 1
+            await self.close(victim.session_id)
+
+    async def run_code(self, session: AnalysisSession, code: str) -> str:
+        """Run code in the session's worker, keeping the variables it defines"""
+        plots_dir = get_plots_dir(session.file_id)
+        os.makedirs(plots_dir, exist_ok=True)
+        # Outside the try: a deleted file is the caller's 404, not a dead worker
+        data_path = get_data_path_by_id(session.file_id)
+
+        try:
+            reply = await asyncio.to_thread(
+                session.worker.call,
+                ("session_run", code, session.file_id, data_path, plots_dir),
+                Settings.EXEC_TIMEOUT_SECONDS)
+            if reply is None:
+                raise ExecutionTimeoutError(
+                    f"Code execution exceeded {Settings.EXEC_TIMEOUT_SECONDS}s")
+        except (EOFError, OSError, ExecutionTimeoutError, asyncio.CancelledError) as e:
+            # The worker is dead or still busy and its state can't be trusted
+            self._sessions.pop(session.session_id, None)
+            asyncio.create_task(asyncio.to_thread(session.worker.kill))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            logger.error(f"Session {session.session_id} closed after a failed execution: "
+                         f"{str(e) or type(e).__name__}")
+            if isinstance(e, ExecutionTimeoutError):
+                raise Exception(f"Internal error: Code execution timed out - {str(e)}")
+            raise Exception("Internal error: Code execution failed - session worker died")
+        finally:
+            session.last_used_at = time.time()
+
+        status, payload, timings, variables = reply
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds)
+        # Failed scripts can still have defined variables before raising
+        session.variables = variables
+        if status == "syntax_error":
+            logger.error(f"Invalid Python syntax in generated code: {payload}")
+            raise Exception("Internal error: Generated code has invalid syntax")
+        if status == "error":
+            logger.error(f"Error executing code: {payload}")
+            raise Exception(f"Internal error: Code execution failed - {payload}")
+
+        self.turns += 1
+        await self._make_room(Settings.SESSION_MAX, keep=session)
+        return payload.strip() or "Code executed successfully, but no output was generated"
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "memory_bytes": self._memory_bytes(),
+            "created": self.created,
+            "evictions": self.evictions,
+            "turns": self.turns,
+        }
+
+
+session_manager = SessionManager()
@@ -0,0 +1,89 @@
+import os
+import asyncio
+import logging
+import duckdb
+import pyarrow as pa
+from src.configs.config import Settings
+from src.logic.exec_pool import ExecutionTimeoutError
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "data"
+
+
+class QueryError(Exception):
+    """Raised when generated SQL is rejected or fails in DuckDB"""
+
+
+def _connect(data_path: str) -> duckdb.DuckDBPyConnection:
+    """Open an in-memory DuckDB connection with the dataset exposed as a read-only 'data' view"""
+    temp_dir = os.path.join(Settings.ASSETS_DIR, "duckdb_tmp")
+    os.makedirs(temp_dir, exist_ok=True)
+    conn = duckdb.connect(config={
+        "threads": Settings.SQL_THREADS,
+        "memory_limit": Settings.SQL_MEMORY_LIMIT,
+        "temp_directory": temp_dir,
+    })
+
+    if data_path.endswith(".feather"):
+        # Memory-mapped Arrow table: DuckDB scans the pages in place
+        table = pa.ipc.open_file(pa.memory_map(data_path, "r")).read_all()
+        conn.register(TABLE_NAME, table)
+    else:
+        conn.execute(f"SET allowed_paths = [{_quote(data_path)}]")
+        conn.execute(
+            f"CREATE VIEW {TABLE_NAME} AS SELECT * FROM read_csv_auto({_quote(data_path)})")
+
+    # Generated SQL can only see the dataset and can't undo these settings
+    conn.execute("SET enable_external_access = false")
+    conn.execute("SET lock_configuration = true")
+    return conn
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _check_statement(conn: duckdb.DuckDBPyConnection, sql: str) -> None:
+    statements = conn.extract_statements(sql)
+    if len(statements) != 1:
+        raise QueryError(f"Expected a single SQL statement, got {len(statements)}")
+    if statements[0].type != duckdb.StatementType.SELECT:
+        raise QueryError("Only SELECT queries are allowed")
+
+
+def _format_result(conn: duckdb.DuckDBPyConnection, sql: str) -> str:
+    """Run the query and render at most SQL_MAX_RESULT_ROWS rows as text"""
+    relation = conn.sql(sql)
+    df = relation.limit(Settings.SQL_MAX_RESULT_ROWS + 1).df()
+    truncated = len(df) > Settings.SQL_MAX_RESULT_ROWS
+    output = df.head(Settings.SQL_MAX_RESULT_ROWS).to_string(index=False)
+    if truncated:
+        output += f"\n... (showing first {Settings.SQL_MAX_RESULT_ROWS} rows)"
+    return output
+
+
+def _run_query(conn: duckdb.DuckDBPyConnection, sql: str) -> str:
+    try:
+        _check_statement(conn, sql)
+        return _format_result(conn, sql)
+    except duckdb.Error as e:
+        raise QueryError(str(e))
+    finally:
+        conn.close()
+
+
+async def run_query(sql: str, data_path: str) -> str:
+    """Run a generated SELECT over the stored file and return its rendered result"""
+    conn = await asyncio.to_thread(_connect, data_path)
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(_run_query, conn, sql), Settings.EXEC_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # Stops the scan in the worker thread, which then closes the connection
+        conn.interrupt()
+        raise ExecutionTimeoutError(
+            f"Query exceeded {Settings.EXEC_TIMEOUT_SECONDS}s")
+    except asyncio.CancelledError:
+        conn.interrupt()
+        raise
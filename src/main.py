@@ -1,9 +1,15 @@
-import subprocess
-import requests
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
 from src.api.endpoints import router
 from src.configs.config import Settings
+from src.logic.llm_client import close_client
+from src.logic.exec_pool import execution_pool
+from src.logic.readiness import readiness_probe
+from src.logic.janitor import asset_janitor
+from src.logic.sessions import session_manager
+from src.logic.jobs import answer_jobs
 from fastapi.middleware.cors import CORSMiddleware
 
 # Configure logging
@@ -24,6 +30,60 @@ app.add_middleware(
 )
 
 
+# Room for the multipart envelope around the file
+UPLOAD_ENVELOPE_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized uploads before the body is spooled to disk.
+
+    A declared Content-Length over the limit is refused up front, a malformed
+    one with 400. Chunked requests and clients that understate the length are
+    cut off on the receive stream once the body passes the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/upload":
+            await self.app(scope, receive, send)
+            return
+
+        limit = Settings.MAX_UPLOAD_BYTES + UPLOAD_ENVELOPE_BYTES
+        detail = f"File exceeds the maximum upload size of {Settings.MAX_UPLOAD_BYTES} bytes"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None:
+            if not content_length.isdigit():
+                logger.error(f"Upload rejected, malformed Content-Length: {content_length!r}")
+                await JSONResponse(status_code=400, content={
+                    "detail": "Invalid Content-Length header"})(scope, receive, send)
+                return
+            if int(content_length) > limit:
+                logger.error(f"Upload rejected, Content-Length: {content_length}")
+                await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.error(f"Upload rejected after {received} bytes")
+                    # Passed through by the body parser and turned into the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+
 app.include_router(router)
 
 
@@ -32,19 +92,30 @@ async def on_startup():
     """Initialize application on startup"""
     logger.info("Starting Ask AI About Your Data application...")
 
-    # Simple check and start Ollama if needed
-    try:
-        response = requests.get(
-            f"{Settings.OLLAMA_BASE_URL}/api/tags", timeout=3)
-        logger.info("✅ Ollama is running!")
-    except:
-        logger.info("Starting Ollama...")
-        subprocess.Popen(["ollama", "serve"], shell=True)
-        logger.info("✅ Ollama started!")
+    # Ollama checks, model warm-up, execution workers, data libraries and the
+    # registry sync with the uploads on disk all run in the background; /ready
+    # reports when they are done
+    readiness_probe.start()
+
+    # TTL and disk quota enforcement runs in the background once the registry
+    # lists every upload
+    asset_janitor.start(after=readiness_probe.registry_rebuilt)
+    session_manager.start()
 
     logger.info("Application startup completed")
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Release pooled connections and worker processes on shutdown"""
+    await answer_jobs.stop()
+    await session_manager.stop()
+    await asset_janitor.stop()
+    await readiness_probe.stop()
+    await close_client()
+    await execution_pool.shutdown()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -55,6 +126,20 @@ async def root():
         "version": "2.0.0",
         "endpoints": {
             "upload_file": "/upload",
-            "ask_question": "/answer"
+            "find_file_by_hash": "/files/by-hash/{content_hash}",
+            "file_profile": "/files/{file_id}/profile",
+            "delete_file": "/files/{file_id}",
+            "ask_question": "/answer",
+            "ask_questions_batch": "/answer/batch",
+            "ask_question_stream": "/answer/stream",
+            "answer_jobs": "/answer/jobs",
+            "answer_job_status": "/answer/jobs/{job_id}",
+            "sessions": "/sessions",
+            "ask_in_session": "/sessions/{session_id}/answer",
+            "close_session": "/sessions/{session_id}",
+            "health": "/health",
+            "ready": "/ready",
+            "stats": "/stats",
+            "metrics": "/metrics"
         }
     }
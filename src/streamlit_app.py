@@ -1,5 +1,7 @@
 import streamlit as st
 import requests
+import hashlib
+import json
 import pandas as pd
 import os
 from dotenv import load_dotenv
@@ -32,16 +34,11 @@ def main():
     st.subheader("📁 Upload Your CSV File")
     uploaded_file = st.file_uploader("Choose a CSV file", type=['csv'])
 
-    # Display file preview if uploaded
+    # Send the file to the backend once and preview it from the server-side profile
     if uploaded_file is not None:
-        try:
-            df = pd.read_csv(uploaded_file)
-            st.success(
-                f"✅ File uploaded successfully! ({df.shape[0]} rows, {df.shape[1]} columns)")
-            st.subheader("📊 Data Preview")
-            st.dataframe(df.head())
-        except Exception as e:
-            st.error(f"❌ Error reading file: {str(e)}")
+        file_id = ensure_file_on_backend(uploaded_file)
+        if file_id:
+            display_preview(file_id)
 
     # Question input
     st.subheader("🤔 Ask Your Question")
@@ -50,6 +47,8 @@ def main():
         placeholder="e.g., What is the average sales amount?",
         height=100
     )
+    approximate = st.checkbox(
+        "Quick estimate", help="Large files only: analyze a random sample of the rows")
 
     # Submit button
     if st.button("🚀 Ask AI", type="primary"):
@@ -58,13 +57,14 @@ def main():
         elif not question.strip():
             st.error("❌ Please enter a question!")
         else:
-            with st.spinner("🤖 AI is analyzing your data..."):
-                result = send_request_to_backend(uploaded_file, question)
+            file_id = ensure_file_on_backend(uploaded_file)
+            result = send_request_to_backend(
+                uploaded_file, file_id, question, approximate) if file_id else None
 
-                if result:
-                    display_results(result)
-                else:
-                    st.error("❌ Failed to get response from backend.")
+            if result:
+                display_results(result)
+            else:
+                st.error("❌ Failed to get response from backend.")
 
 
 def check_backend_status():
@@ -76,43 +76,156 @@ def check_backend_status():
         return False
 
 
-def send_request_to_backend(uploaded_file, question):
-    """Send request to FastAPI backend"""
-    try:
-        # Step 1: Upload the file first
-        uploaded_file.seek(0)
-        files = {"file": (uploaded_file.name, uploaded_file, "text/csv")}
+def read_sse_events(response):
+    """Yield (event, data) pairs from a server-sent events response"""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:") and event:
+            yield event, json.loads(line[len("data:"):].strip())
+            event = None
+
+
+def get_content_hash(uploaded_file):
+    """SHA-256 of the uploaded bytes, computed once per upload in this session"""
+    hashes = st.session_state.setdefault("content_hashes", {})
+    # Streamlit gives every upload its own file_id; name and size alone would
+    # match a re-uploaded, edited file of the same length
+    key = uploaded_file.file_id
+    if key not in hashes:
+        hashes[key] = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    return hashes[key]
+
 
-        upload_response = requests.post(
-            f"{FASTAPI_URL}/upload",
-            files=files,
-            timeout=30
-        )
+def ensure_file_on_backend(uploaded_file):
+    """Return the backend file_id for this file, uploading only if the backend lacks it"""
+    content_hash = get_content_hash(uploaded_file)
+    file_ids = st.session_state.setdefault("file_ids", {})
+    if content_hash in file_ids:
+        return file_ids[content_hash]
+
+    try:
+        # The backend may already have these bytes from another session
+        lookup_response = requests.get(
+            f"{FASTAPI_URL}/files/by-hash/{content_hash}", timeout=10)
+        if lookup_response.status_code == 200:
+            file_ids[content_hash] = lookup_response.json()["file_id"]
+            return file_ids[content_hash]
+
+        with st.spinner("📤 Uploading file..."):
+            uploaded_file.seek(0)
+            files = {"file": (uploaded_file.name, uploaded_file, "text/csv")}
+            upload_response = requests.post(
+                f"{FASTAPI_URL}/upload",
+                files=files,
+                # (connect, read) - large files take a while to stream and convert
+                timeout=(10, 600)
+            )
 
         if upload_response.status_code != 200:
             st.error(
                 f"Upload failed: {upload_response.status_code} - {upload_response.text}")
             return None
 
-        upload_result = upload_response.json()
-        file_id = upload_result["file_id"]
+        file_ids[content_hash] = upload_response.json()["file_id"]
+        return file_ids[content_hash]
+
+    except requests.exceptions.ConnectionError:
+        st.error(
+            f"❌ Cannot connect to backend. Make sure FastAPI server is running on {FASTAPI_URL}")
+        return None
+    except requests.exceptions.Timeout:
+        st.error("❌ Upload timeout. The file is taking too long to upload.")
+        return None
+
+
+def forget_file(uploaded_file):
+    """Drop the cached file_id so the next request uploads the file again"""
+    st.session_state.get("file_ids", {}).pop(get_content_hash(uploaded_file), None)
+
+
+def display_preview(file_id):
+    """Show row/column counts, column summary and sample rows from the server-side profile"""
+    try:
+        response = requests.get(f"{FASTAPI_URL}/files/{file_id}/profile", timeout=10)
+    except requests.exceptions.RequestException as e:
+        st.error(f"❌ Error loading preview: {str(e)}")
+        return
+    if response.status_code != 200:
+        st.error(f"❌ Error loading preview: {response.status_code} - {response.text}")
+        return
 
-        # Step 2: Ask the question with the file_id
-        question_response = requests.post(
-            f"{FASTAPI_URL}/answer",
+    profile = response.json()
+    st.success(
+        f"✅ File uploaded successfully! ({profile['rows']} rows, {len(profile['columns'])} columns)")
+    st.subheader("📊 Data Preview")
+    st.dataframe(pd.DataFrame(profile["sample"]).head(5))
+    with st.expander("Column summary"):
+        st.dataframe(pd.DataFrame([
+            {"column": column["name"], "dtype": column["dtype"],
+             "nulls": column["null_count"], "unique": column["unique_count"],
+             "min": column["min"], "max": column["max"]}
+            for column in profile["columns"]
+        ]))
+
+
+def send_request_to_backend(uploaded_file, file_id, question, approximate=False):
+    """Send request to FastAPI backend, rendering answer stages as they stream in"""
+    try:
+        # Ask the question with the file_id and stream the stages
+        st.subheader("🎯 AI Analysis Results")
+        status = st.status("🤖 AI is writing analysis code...", expanded=False)
+        st.write("**Answer:**")
+        answer_placeholder = st.empty()
+        answer = ""
+
+        with requests.post(
+            f"{FASTAPI_URL}/answer/stream",
             json={
                 "file_id": file_id,
-                "question": question
+                "question": question,
+                "approximate": approximate
             },
-            timeout=300
-        )
+            stream=True,
+            # (connect, read) - read timeout applies between streamed events
+            timeout=(10, 300)
+        ) as question_response:
+            if question_response.status_code != 200:
+                status.update(label="❌ Request failed", state="error")
+                st.error(
+                    f"Backend error: {question_response.status_code} - {question_response.text}")
+                return None
+
+            for event, data in read_sse_events(question_response):
+                if event == "code":
+                    status.code(data["code"], language="sql" if data.get("engine") == "sql" else "python")
+                elif event == "execution_started":
+                    status.update(label="⚙️ Running analysis code...")
+                elif event == "execution_finished":
+                    status.text(data["output"])
+                    status.update(label="✍️ Writing the answer...")
+                elif event == "token":
+                    answer += data["content"]
+                    answer_placeholder.info(answer)
+                elif event == "done":
+                    label = "⚡ Answered directly from the data" if data.get("path") == "fast" \
+                        else "✅ Analysis complete"
+                    if data.get("sample_fraction"):
+                        label = f"🎲 Estimated from a {data['sample_fraction']:.1%} sample"
+                    status.update(label=label, state="complete")
+                    answer_placeholder.empty()
+                    return {"answer": data["answer"]}
+                elif event == "error":
+                    status.update(label="❌ Analysis failed", state="error")
+                    if data["status_code"] == 404:
+                        # Removed on the server; the next click uploads it again
+                        forget_file(uploaded_file)
+                    st.error(
+                        f"Backend error: {data['status_code']} - {data['detail']}")
+                    return None
 
-        if question_response.status_code == 200:
-            return question_response.json()
-        else:
-            st.error(
-                f"Backend error: {question_response.status_code} - {question_response.text}")
-            return None
+        return None
 
     except requests.exceptions.ConnectionError:
         st.error(
@@ -127,11 +240,7 @@ def send_request_to_backend(uploaded_file, question):
 
 
 def display_results(result):
-    """Display the results from the backend"""
-    st.subheader("🎯 AI Analysis Results")
-
-    # Main answer
-    st.write("**Answer:**")
+    """Display the final answer once streaming has finished"""
     st.info(result.get("answer", "No answer provided"))
 
 
@@ -0,0 +1,34 @@
+import os
+import sys
+import pytest
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.insert(0, ROOT_PATH)
+
+from src.configs.config import Settings  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def copy_on_write():
+    """Run in-process cache and worker code with the option the workers set"""
+    import pandas as pd
+    with pd.option_context("mode.copy_on_write", True):
+        yield
+
+
+@pytest.fixture
+def assets_dir(tmp_path, monkeypatch):
+    """Point Settings.ASSETS_DIR at a fresh temporary directory"""
+    monkeypatch.setattr(Settings, "ASSETS_DIR", str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Write CSV text to a file and return its path"""
+    def write(text: str, name: str = "data.csv") -> str:
+        path = tmp_path / name
+        path.write_text(text)
+        return str(path)
+    return write
@@ -0,0 +1,11 @@
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from src.main import app
+
+
+def test_root_lists_every_endpoint():
+    listed = set(TestClient(app).get("/").json()["endpoints"].values())
+
+    routes = {route.path for route in app.routes
+              if isinstance(route, APIRoute) and route.path != "/"}
+    assert routes <= listed
@@ -0,0 +1,85 @@
+import time
+import asyncio
+import pytest
+from src.configs.config import Settings
+from src.logic import pipeline
+from src.logic.code_cache import CodeCache, code_cache, schema_fingerprint
+
+
+def test_fingerprint_ignores_storage_types():
+    def profile(id_dtype: str, region_dtype: str) -> dict:
+        return {"columns": [{"name": "id", "dtype": id_dtype},
+                            {"name": "region", "dtype": region_dtype},
+                            {"name": "amount", "dtype": "float64"}]}
+
+    fingerprint = schema_fingerprint(profile("int64", "object"))
+    assert schema_fingerprint(profile("int8", "category")) == fingerprint
+    assert schema_fingerprint(profile("Int64", "string[pyarrow]")) == fingerprint
+
+
+def test_fingerprint_changes_with_names_and_type_families():
+    base = {"columns": [{"name": "id", "dtype": "int8"}, {"name": "amount", "dtype": "float64"}]}
+    renamed = {"columns": [{"name": "key", "dtype": "int8"}, {"name": "amount", "dtype": "float64"}]}
+    retyped = {"columns": [{"name": "id", "dtype": "object"}, {"name": "amount", "dtype": "float64"}]}
+
+    assert schema_fingerprint(base) != schema_fingerprint(renamed)
+    assert schema_fingerprint(base) != schema_fingerprint(retyped)
+
+
+def test_code_is_keyed_by_fingerprint_and_normalized_question(assets_dir):
+    cache = CodeCache()
+    fingerprint = schema_fingerprint({"columns": [{"name": "amount", "dtype": "float64"}]})
+    other = schema_fingerprint({"columns": [{"name": "price", "dtype": "float64"}]})
+    cache.put(CodeCache.make_key(fingerprint, "What is the average amount?"), "print(1)")
+
+    assert cache.get(CodeCache.make_key(fingerprint, "what is the  average amount")) == "print(1)"
+    assert cache.get(CodeCache.make_key(fingerprint, "What is the total amount?")) is None
+    assert cache.get(CodeCache.make_key(other, "What is the average amount?")) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_expired_and_least_recently_used_entries_are_dropped(assets_dir, monkeypatch):
+    monkeypatch.setattr(Settings, "CODE_CACHE_MAX_ENTRIES", 2)
+    cache = CodeCache()
+    for question in ("first", "second", "third"):
+        cache.put(CodeCache.make_key("schema", question), question)
+
+    assert cache.get(CodeCache.make_key("schema", "first")) is None
+    assert cache.get(CodeCache.make_key("schema", "third")) == "third"
+
+    monkeypatch.setattr(Settings, "CODE_CACHE_TTL_SECONDS", -1)
+    assert cache.get(CodeCache.make_key("schema", "third")) is None
+
+
+def test_code_is_cached_only_after_it_ran(assets_dir, monkeypatch):
+    monkeypatch.setattr(code_cache, "_conn", None)
+    outcomes = [Exception("Internal error: Code execution failed - KeyError"), "42"]
+
+    async def execute_generated(code, file_id, engine, sample):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(pipeline, "execute_generated", execute_generated)
+    key = CodeCache.make_key("schema", "question")
+    code_cache.put(key, "print(df['missing'])")
+
+    with pytest.raises(Exception, match="KeyError"):
+        asyncio.run(pipeline.execute_and_cache("print(df['missing'])", key, "file", "pandas"))
+    assert code_cache.get(key) is None
+
+    assert asyncio.run(pipeline.execute_and_cache("print(42)", key, "file", "pandas")) == "42"
+    assert code_cache.get(key) == "print(42)"
+
+
+def test_storing_the_same_code_keeps_its_age(assets_dir, monkeypatch):
+    cache = CodeCache()
+    key = CodeCache.make_key("schema", "question")
+    cache.put(key, "print(1)")
+    monkeypatch.setattr(Settings, "CODE_CACHE_TTL_SECONDS", 0.2)
+    time.sleep(0.1)
+    cache.put(key, "print(1)")
+    time.sleep(0.15)
+
+    assert cache.get(key) is None
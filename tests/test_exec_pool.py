@@ -0,0 +1,145 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from src.configs.config import Settings
+from src.logic import exec_pool
+from src.logic.exec_pool import (CodeExecutionError, ExecutionPool, ExecutionTimeoutError,
+                                 WorkerCrashedError, WorkerUnavailableError)
+from src.logic.ingest import convert_to_columnar
+from src.logic.registry import file_registry
+
+
+@pytest.fixture
+def columnar_path(assets_dir, write_csv, monkeypatch):
+    # Workers start without preloading anything from the real registry
+    monkeypatch.setattr(file_registry, "most_recent", lambda limit: [])
+    df = pd.DataFrame({"amount": np.arange(1000, dtype="float64")})
+    return convert_to_columnar(write_csv(df.to_csv(index=False)), "pool")
+
+
+def run_jobs(pool: ExecutionPool, *jobs):
+    async def main():
+        try:
+            return [await job(pool) for job in jobs]
+        finally:
+            await pool.shutdown()
+    return asyncio.run(main())
+
+
+def test_cache_stats_come_from_the_workers(columnar_path):
+    async def job(pool):
+        return await pool.run_code("print(df['amount'].sum())", "pool", columnar_path, "")
+
+    async def stats(pool):
+        return pool.cache_stats()
+
+    outputs = run_jobs(ExecutionPool(1), job, job, stats)
+
+    assert outputs[0].strip() == outputs[1].strip() == "499500.0"
+    assert outputs[2]["misses"] == 1
+    assert outputs[2]["hits"] == 1
+    assert outputs[2]["entries"] == 1
+    assert outputs[2]["bytes"] > 0
+
+
+def test_workers_split_the_cache_budget(columnar_path, monkeypatch):
+    monkeypatch.setattr(Settings, "DF_CACHE_MAX_BYTES", 10 * 1024 ** 2)
+
+    async def job(pool):
+        return await pool.run_code("print(len(df))", "pool", columnar_path, "")
+
+    async def stats(pool):
+        return pool.cache_stats(), [worker.cache_stats for worker in pool._workers]
+
+    _, (totals, per_worker) = run_jobs(ExecutionPool(2), job, stats)
+
+    assert totals["max_bytes"] == 10 * 1024 ** 2 and totals["entries"] == 1
+    assert [stats["max_bytes"] for stats in per_worker if stats] == [5 * 1024 ** 2]
+
+
+def test_timed_out_job_is_killed_and_the_worker_replaced(columnar_path, monkeypatch):
+    monkeypatch.setattr(Settings, "EXEC_TIMEOUT_SECONDS", 1.0)
+
+    async def hang(pool):
+        with pytest.raises(ExecutionTimeoutError):
+            await pool.run_code("while True:\n    pass", "pool", columnar_path, "")
+
+    async def job(pool):
+        return await pool.run_code("print(len(df))", "pool", columnar_path, "")
+
+    async def stats(pool):
+        return pool.stats()
+
+    _, output, stats = run_jobs(ExecutionPool(1), hang, job, stats)
+
+    assert output.strip() == "1000"
+    assert stats["timeouts"] == 1 and stats["workers"] == 1
+
+
+def test_memory_cap_fails_the_job_not_the_worker(columnar_path, monkeypatch):
+    monkeypatch.setattr(Settings, "EXEC_MEMORY_LIMIT_BYTES", 2 * 1024 ** 3)
+
+    async def allocate(pool):
+        with pytest.raises(CodeExecutionError, match="Memory limit exceeded"):
+            await pool.run_code("data = bytearray(4 * 1024 ** 3)", "pool", columnar_path, "")
+
+    async def job(pool):
+        return await pool.run_code("print(len(df))", "pool", columnar_path, "")
+
+    _, output = run_jobs(ExecutionPool(1), allocate, job)
+
+    assert output.strip() == "1000"
+
+
+def failing_spawns(pool: ExecutionPool, failures: int):
+    """Make the next respawns of the pool fail, then spawn normally again"""
+    spawn = pool._spawn
+
+    def flaky_spawn(preload=None):
+        if pool.respawn_failures < failures:
+            raise WorkerCrashedError("Execution worker did not start in time")
+        return spawn(preload)
+    return flaky_spawn
+
+
+def test_failed_respawns_are_retried(columnar_path, monkeypatch):
+    monkeypatch.setattr(Settings, "EXEC_TIMEOUT_SECONDS", 1.0)
+    monkeypatch.setattr(exec_pool, "RESPAWN_INITIAL_BACKOFF", 0.05)
+    pool = ExecutionPool(1)
+
+    async def hang(pool):
+        await pool.start()
+        monkeypatch.setattr(pool, "_spawn", failing_spawns(pool, 2))
+        with pytest.raises(ExecutionTimeoutError):
+            await pool.run_code("while True:\n    pass", "pool", columnar_path, "")
+
+    async def job(pool):
+        return await pool.run_code("print(len(df))", "pool", columnar_path, "")
+
+    _, output = run_jobs(pool, hang, job)
+
+    assert output.strip() == "1000"
+    assert pool.respawn_failures == 2
+
+
+def test_waiting_for_a_worker_is_bounded(columnar_path, monkeypatch):
+    monkeypatch.setattr(Settings, "EXEC_TIMEOUT_SECONDS", 1.0)
+    monkeypatch.setattr(Settings, "EXEC_QUEUE_TIMEOUT_SECONDS", 0.5)
+    monkeypatch.setattr(exec_pool, "RESPAWN_INITIAL_BACKOFF", 0.05)
+    pool = ExecutionPool(1)
+
+    async def hang(pool):
+        await pool.start()
+        monkeypatch.setattr(pool, "_spawn", failing_spawns(pool, 1000))
+        with pytest.raises(ExecutionTimeoutError):
+            await pool.run_code("while True:\n    pass", "pool", columnar_path, "")
+
+    async def job(pool):
+        with pytest.raises(WorkerUnavailableError, match="0 of 1 running"):
+            await pool.run_code("print(len(df))", "pool", columnar_path, "")
+        return pool.stats()
+
+    _, stats = run_jobs(pool, hang, job)
+
+    assert stats["respawn_failures"] > 0
@@ -0,0 +1,86 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from src.logic.df_cache import DataFrameCache
+from src.logic.exec_pool import _run_code
+from src.logic.fast_path import QueryPlanner
+from src.logic.ingest import convert_to_columnar
+from src.logic.profiling import build_profile
+from src.logic.sql_engine import run_query
+from benchmarks.bench_fast_path import CORPUS
+
+
+@pytest.fixture
+def dataset(assets_dir, write_csv):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(400),
+        "region": rng.choice(["north", "south", "east", "west"], 400),
+        "amount": rng.normal(100, 25, 400).round(2),
+        "quantity": rng.integers(1, 50, 400),
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, 400), unit="D"),
+        "score": rng.random(400),
+    })
+    columnar_path = convert_to_columnar(write_csv(df.to_csv(index=False)), "fast")
+    cache = DataFrameCache(1024 ** 3)
+    return {"path": columnar_path, "cache": cache,
+            "profile": build_profile(cache.get("fast", columnar_path)), "expected": df}
+
+
+def answer(plan, dataset, engine: str) -> str:
+    code = plan.render(engine)
+    if engine == "sql":
+        return plan.format_answer(asyncio.run(run_query(code, dataset["path"])))
+    status, output, _ = _run_code(dataset["cache"], code, "fast", dataset["path"], "")
+    assert status == "ok", output
+    return plan.format_answer(output)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "sql"])
+def test_median(dataset, engine):
+    plan = QueryPlanner().plan("What is the median amount?", dataset["profile"])
+
+    assert plan.kind == "aggregate" and plan.aggregation == "median"
+    expected = dataset["expected"]["amount"].median()
+    assert answer(plan, dataset, engine) == f"The median of 'amount' is {expected:,.2f}."
+
+
+@pytest.mark.parametrize("engine", ["pandas", "sql"])
+def test_median_by_group(dataset, engine):
+    plan = QueryPlanner().plan("median amount by region", dataset["profile"])
+
+    assert plan.kind == "aggregate_by"
+    text = answer(plan, dataset, engine)
+    for region, value in dataset["expected"].groupby("region")["amount"].median().items():
+        assert region in text
+        assert f"{value:.2f}".rstrip("0").rstrip(".") in text
+
+
+def grouped_values(text: str) -> dict:
+    """Group name to value from the table of a grouped answer"""
+    values = {}
+    for line in text.split("```")[1].splitlines():
+        fields = line.split()
+        try:
+            values[fields[0]] = float(fields[-1])
+        except (IndexError, ValueError):
+            pass  # blank or header line
+    return values
+
+
+@pytest.mark.parametrize("item", CORPUS, ids=[item["question"] for item in CORPUS])
+def test_corpus_routing_and_engine_agreement(dataset, item):
+    plan = QueryPlanner().plan(item["question"], dataset["profile"])
+
+    assert ("fast" if plan is not None else "llm") == item["expected"]
+    if plan is None or not plan.needs_execution:
+        return
+    pandas_answer, sql_answer = answer(plan, dataset, "pandas"), answer(plan, dataset, "sql")
+    if plan.kind == "aggregate":
+        assert pandas_answer == sql_answer
+    else:
+        # The engines lay out the table differently
+        pandas_values = grouped_values(pandas_answer)
+        assert len(pandas_values) == 4
+        assert pandas_values == pytest.approx(grouped_values(sql_answer))
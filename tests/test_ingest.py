@@ -0,0 +1,115 @@
+import asyncio
+import io
+import numpy as np
+import pandas as pd
+from fastapi import UploadFile
+from src.configs.config import Settings
+from src.logic import excutions, ingest
+from src.logic.ingest import (convert_to_columnar, get_columnar_schema, read_csv_table,
+                               read_dataframe)
+from src.logic.df_cache import DataFrameCache
+from src.logic.registry import file_registry
+
+
+def make_csv(write_csv) -> str:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "amount": rng.normal(100, 25, 500).round(2),
+        "quantity": rng.integers(1, 50, 500),
+        "region": rng.choice(["north", "south", "east"], 500),
+        "date": pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365, 500), unit="D"),
+    })
+    return write_csv(df.to_csv(index=False))
+
+
+def test_columnar_round_trip(assets_dir, write_csv):
+    csv_path = make_csv(write_csv)
+    expected = pd.read_csv(csv_path, parse_dates=["date"])
+
+    df = read_dataframe(convert_to_columnar(csv_path, "roundtrip"))
+
+    assert list(df.columns) == list(expected.columns)
+    assert len(df) == len(expected)
+    np.testing.assert_allclose(df["amount"].astype("float64"), expected["amount"], rtol=1e-6)
+    assert (df["quantity"].astype("int64") == expected["quantity"]).all()
+    assert (df["region"].astype(str) == expected["region"]).all()
+    assert (df["date"] == expected["date"]).all()
+
+
+def test_cached_frame_supports_in_place_numpy_operations(assets_dir, write_csv):
+    # Regression: zero-copy views of the mapped file were read-only, so median
+    # and sorting failed with "assignment destination is read-only"
+    columnar_path = convert_to_columnar(make_csv(write_csv), "writable")
+    expected = pd.read_feather(columnar_path)
+    cache = DataFrameCache(1024 ** 3)
+    cache.get("writable", columnar_path)
+    df = cache.get("writable", columnar_path)
+
+    assert df["amount"].median() == expected["amount"].median()
+    assert df["quantity"].median() == expected["quantity"].median()
+    assert (np.diff(np.sort(df["amount"].values)) >= 0).all()
+    assert df["date"].sort_values().is_monotonic_increasing
+    df.sort_values("amount", inplace=True)
+    df["amount"] = df["amount"] * 2
+
+    # In-place changes by one job never reach the cached frame
+    cached = cache.get("writable", columnar_path)
+    assert (cached["amount"] == expected["amount"]).all()
+
+
+def test_null_counts_match_pandas(assets_dir, write_csv):
+    csv_path = write_csv(
+        'name,city,amount,flag\n'
+        'alice,paris,1.5,yes\n'
+        ',NA,,no\n'
+        'NA,"",2.5,\n'
+        'bob,n/a,NaN,yes\n'
+        'null,berlin,3.0,None\n'
+        '"",rome,4.0,no\n')
+    expected = pd.read_csv(csv_path).isna().sum()
+
+    table = read_csv_table(csv_path)
+    assert {name: table.column(name).null_count for name in table.column_names} \
+        == expected.to_dict()
+    df = read_dataframe(convert_to_columnar(csv_path, "nulls"))
+    assert df.isna().sum().to_dict() == expected.to_dict()
+
+
+def test_frames_load_with_read_csv_dtypes(assets_dir, write_csv):
+    csv_path = write_csv("qty,region\n" + "".join(
+        f"{qty},{region}\n" for qty, region in zip(range(1, 120), ["north", "south"] * 60)))
+    columnar_path = convert_to_columnar(csv_path, "dtypes")
+    expected = pd.read_csv(csv_path)
+    stored = {column["name"]: column["type"] for column in get_columnar_schema(columnar_path)}
+    assert stored["qty"] == "int8" and stored["region"].startswith("dictionary")
+
+    df = read_dataframe(columnar_path)
+
+    assert dict(df.dtypes) == dict(expected.dtypes)
+    assert (df["qty"] * 10).max() == 1190
+    df["region"] = df["region"].fillna("Unknown")
+    df.loc[df["qty"] > 100, "region"] = "east"
+    assert list(df[df["region"] == "north"].groupby("region").size().index) == ["north"]
+
+
+def test_upload_is_prepared_in_the_background_from_one_parse(assets_dir, write_csv, monkeypatch):
+    monkeypatch.setattr(file_registry, "_conn", None)
+    monkeypatch.setattr(Settings, "APPROX_SAMPLE_ROWS", 100)
+    parses = []
+    monkeypatch.setattr(ingest, "read_csv_table",
+                        lambda path: parses.append(path) or read_csv_table(path))
+    with open(make_csv(write_csv), "rb") as f:
+        upload = UploadFile(io.BytesIO(f.read()), filename="sales.csv")
+
+    async def main():
+        file_id, duplicate = await excutions.save_uploaded_file(upload)
+        # Answered before the dataset was parsed
+        assert not duplicate and file_id in excutions._preparing
+        return file_id, await excutions.get_dataset_profile(file_id)
+
+    file_id, profile = asyncio.run(main())
+
+    assert len(parses) == 1
+    assert profile["rows"] == 500
+    assert file_registry.get(file_id)["columnar_path"].endswith(".feather")
+    assert excutions.get_sample(file_id)["rows"] == 100
@@ -0,0 +1,66 @@
+import os
+import time
+import pytest
+from src.logic import janitor as janitor_module
+from src.logic.excutions import find_file_id_by_hash
+from src.logic.janitor import AssetJanitor, ORPHAN_GRACE_SECONDS
+from src.logic.registry import file_registry
+
+
+@pytest.fixture
+def registry(assets_dir, monkeypatch):
+    monkeypatch.setattr(file_registry, "_conn", None)
+    return file_registry
+
+
+def write_profile(assets_dir: str, file_id: str, age: float) -> str:
+    path = os.path.join(assets_dir, "profiles", f"{file_id}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("{}")
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_orphans_are_removed_after_the_grace_period(registry, assets_dir):
+    old = write_profile(assets_dir, "aaaaaaaaaaaaaaaa", ORPHAN_GRACE_SECONDS + 60)
+    fresh = write_profile(assets_dir, "bbbbbbbbbbbbbbbb", 0)
+
+    AssetJanitor()._remove_orphans(time.time())
+
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
+
+
+def test_upload_registered_during_the_sweep_keeps_its_artifacts(registry, assets_dir, monkeypatch):
+    file_id = "cccccccccccccccc"
+    profile = write_profile(assets_dir, file_id, ORPHAN_GRACE_SECONDS + 60)
+    upload = os.path.join(assets_dir, f"{file_id}.csv")
+    list_records = registry.least_recently_used
+
+    def list_then_register():
+        # The upload lands right after the janitor listed the registry
+        records = list_records()
+        registry.register(file_id, upload, "csv", 0, "hash")
+        return records
+
+    monkeypatch.setattr(janitor_module.file_registry, "least_recently_used", list_then_register)
+
+    AssetJanitor()._remove_orphans(time.time())
+
+    assert os.path.exists(profile)
+
+
+
+def test_duplicate_upload_counts_as_an_access(registry, assets_dir):
+    file_id = "dddddddddddddddd"
+    upload = os.path.join(assets_dir, f"{file_id}.csv")
+    with open(upload, "w") as f:
+        f.write("value\n1\n")
+    registry.register(file_id, upload, "csv", 8, "hash")
+    with registry._connection() as conn:
+        conn.execute("UPDATE files SET last_access_at = ?", (time.time() - 86400,))
+
+    assert find_file_id_by_hash("hash") == file_id
+    assert registry.get(file_id)["last_access_at"] > time.time() - 60
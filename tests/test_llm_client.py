@@ -0,0 +1,76 @@
+import json
+import asyncio
+import httpx
+import pytest
+from src.configs.config import Settings
+from src.logic import llm_client
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Answer LLM requests with queued responses or errors, recording each request"""
+    calls = []
+    responses = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        outcome = responses.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(llm_client, "get_client", lambda: client)
+    monkeypatch.setattr(Settings, "LLM_RETRY_BACKOFF", 0.0)
+    return calls, responses
+
+
+def reply(content: str, stream: bool = False) -> httpx.Response:
+    body = {"message": {"role": "assistant", "content": content}, "done": True}
+    if stream:
+        return httpx.Response(200, content=json.dumps(body) + "\n")
+    return httpx.Response(200, json=body)
+
+
+def collect(messages: list) -> list:
+    async def main():
+        return [chunk async for chunk in llm_client.stream_chat(messages)]
+    return asyncio.run(main())
+
+
+def test_chat_retries_connection_errors(ollama):
+    calls, responses = ollama
+    responses.extend([httpx.ConnectError("refused"), reply("42")])
+
+    response = asyncio.run(llm_client.chat([{"role": "user", "content": "hi"}]))
+
+    assert response["message"]["content"] == "42"
+    assert len(calls) == 2
+
+
+def test_chat_does_not_retry_read_timeouts(ollama):
+    calls, responses = ollama
+    responses.extend([httpx.ReadTimeout("slow"), reply("42")])
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(llm_client.chat([{"role": "user", "content": "hi"}]))
+    assert len(calls) == 1
+
+
+def test_stream_chat_does_not_retry_read_timeouts(ollama):
+    calls, responses = ollama
+    responses.extend([httpx.ReadTimeout("slow"), reply("42", stream=True)])
+
+    with pytest.raises(httpx.ReadTimeout):
+        collect([{"role": "user", "content": "hi"}])
+    assert len(calls) == 1
+
+
+def test_stream_chat_retries_connection_errors(ollama):
+    calls, responses = ollama
+    responses.extend([httpx.ConnectError("refused"), reply("42", stream=True)])
+
+    chunks = collect([{"role": "user", "content": "hi"}])
+
+    assert chunks[-1]["message"]["content"] == "42"
+    assert len(calls) == 2
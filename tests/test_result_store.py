@@ -0,0 +1,24 @@
+import os
+import shutil
+from src.logic.result_store import ResultStore, get_results_dir, make_exec_key
+
+
+def test_missing_plot_is_a_cache_miss(assets_dir, write_csv, tmp_path):
+    store = ResultStore()
+    source_path = write_csv("value\n1\n")
+    plots_dir = str(tmp_path / "plots")
+    os.makedirs(plots_dir)
+    with open(os.path.join(plots_dir, "chart.png"), "wb") as f:
+        f.write(b"png")
+    exec_key = make_exec_key("hash", "plot()")
+    store.put_execution(exec_key, "hash", source_path, "done", plots_dir, ["chart.png"])
+    store.put_answer(exec_key, "Plot it", "Here is the plot")
+
+    shutil.rmtree(plots_dir)
+    assert store.get_execution(exec_key, source_path, plots_dir) == "done"
+    assert os.path.exists(os.path.join(plots_dir, "chart.png"))
+
+    os.remove(os.path.join(get_results_dir(exec_key), "chart.png"))
+    assert store.get_execution(exec_key, source_path, plots_dir) is None
+    assert store.get_answer(exec_key, "Plot it") is None
+    assert store.stats()["entries"] == 0
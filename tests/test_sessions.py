@@ -0,0 +1,26 @@
+import asyncio
+import pytest
+from src.logic.registry import file_registry
+from src.logic.sessions import AnalysisSession, SessionManager
+
+
+class IdleWorker:
+    """Stands in for a session worker; never expected to run anything"""
+
+    def call(self, message, timeout):
+        raise AssertionError("the worker should not be called")
+
+    def kill(self):
+        raise AssertionError("the worker should not be killed")
+
+
+def test_deleted_file_does_not_close_the_session(assets_dir, monkeypatch):
+    monkeypatch.setattr(file_registry, "_conn", None)
+    manager = SessionManager()
+    session = AnalysisSession("s1", "0123456789abcdef", IdleWorker(), "system")
+    manager._sessions[session.session_id] = session
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(manager.run_code(session, "print(len(df))"))
+
+    assert manager.get("s1") is session
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import pytest
+from src.configs.config import Settings
+from src.logic.janitor import AssetJanitor
+from src.logic.readiness import ReadinessProbe
+from src.logic.registry import file_registry
+
+
+@pytest.fixture
+def registry(assets_dir, monkeypatch):
+    monkeypatch.setattr(file_registry, "_conn", None)
+    return file_registry
+
+
+def test_registry_rebuild_gates_readiness(registry, assets_dir):
+    upload = os.path.join(assets_dir, "0123456789abcdef.csv")
+    with open(upload, "w") as f:
+        f.write("value\n1\n")
+    probe = ReadinessProbe()
+
+    async def main():
+        task = asyncio.create_task(probe._rebuild_registry())
+        assert not probe.registry_ready
+        await task
+
+    asyncio.run(main())
+
+    assert probe.registry_ready and probe.registry_rebuilt.is_set()
+    assert probe.status()["registry_ready"]
+    assert registry.get("0123456789abcdef")["path"] == upload
+
+
+def test_janitor_waits_for_the_registry(assets_dir, monkeypatch):
+    monkeypatch.setattr(Settings, "JANITOR_INTERVAL_SECONDS", 0.01)
+    janitor = AssetJanitor()
+    sweeps = []
+    monkeypatch.setattr(janitor, "sweep", lambda: sweeps.append(True))
+
+    async def main():
+        rebuilt = asyncio.Event()
+        janitor.start(after=rebuilt)
+        await asyncio.sleep(0.05)
+        swept_before = len(sweeps)
+        rebuilt.set()
+        await asyncio.sleep(0.05)
+        await janitor.stop()
+        return swept_before
+
+    assert asyncio.run(main()) == 0
+    assert sweeps
@@ -0,0 +1,78 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.api import endpoints
+from src.configs.config import Settings
+from src.logic.registry import file_registry
+from src.main import UPLOAD_ENVELOPE_BYTES, app
+
+LIMIT = 1024
+
+
+@pytest.fixture
+def client(assets_dir, monkeypatch):
+    monkeypatch.setattr(Settings, "MAX_UPLOAD_BYTES", LIMIT)
+    # A registry connection of its own, in the temporary assets directory
+    monkeypatch.setattr(file_registry, "_conn", None)
+    return TestClient(app)
+
+
+def multipart(size: int) -> tuple:
+    """A multipart body with a CSV file of size bytes, and its content type"""
+    rows = "\n".join(str(value) for value in range(size))
+    csv = f"value\n{rows}\n".encode()[:size]
+    boundary = "limit-test"
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+            f"filename=\"data.csv\"\r\nContent-Type: text/csv\r\n\r\n").encode() \
+        + csv + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def test_upload_under_the_limit_is_accepted(client):
+    body, content_type = multipart(LIMIT // 2)
+
+    response = client.post("/upload", content=body, headers={"Content-Type": content_type})
+
+    assert response.status_code == 200
+    assert response.json()["file_id"]
+
+
+def test_declared_oversized_upload_is_rejected(client):
+    body, content_type = multipart(LIMIT + UPLOAD_ENVELOPE_BYTES + 1)
+
+    response = client.post("/upload", content=body, headers={"Content-Type": content_type})
+
+    assert response.status_code == 413
+
+
+def test_malformed_content_length_is_a_bad_request(client):
+    body, content_type = multipart(LIMIT // 2)
+
+    response = client.post("/upload", content=body, headers={
+        "Content-Type": content_type, "Content-Length": "lots"})
+
+    assert response.status_code == 400
+
+
+def test_chunked_oversized_upload_is_cut_off(client, monkeypatch):
+    body, content_type = multipart(LIMIT + UPLOAD_ENVELOPE_BYTES + 1)
+    saved = []
+    monkeypatch.setattr(endpoints, "save_uploaded_file", lambda file: saved.append(file))
+
+    def chunks():
+        for start in range(0, len(body), 8192):
+            yield body[start:start + 8192]
+
+    # A generator body is sent without Content-Length
+    response = client.post("/upload", content=chunks(), headers={"Content-Type": content_type})
+
+    assert response.status_code == 413
+    # Cut off while the body was parsed, before the endpoint ran
+    assert not saved
+
+
+def test_file_over_the_limit_within_the_envelope_is_rejected(client):
+    body, content_type = multipart(LIMIT + 100)
+
+    response = client.post("/upload", content=body, headers={"Content-Type": content_type})
+
+    assert response.status_code == 413